@@ -28,6 +28,10 @@ from database.database import (
 from dms_core import DmsManager, RequestStatus
 from dms_core.init_dms import init_dms_database, init_dms_templates
 from dms_core.models import DocumentTemplate, SessionLocal
+from dms_core.decision_jobs import resume_pending_decisions
+from dms_core.mail_dispatcher import start_dispatcher
+from dms_core.notification_retention import start_retention_job
+from dms_core.sla_scheduler import start_sla_scheduler
 from dms_core.notifications import list_notifications, mark_all_read, unread_count
 from municipality_utils import get_all_municipalities, validate_municipality
 from pages.admin_panel import admin_dashboard
@@ -196,15 +200,36 @@ def clear_session(clear_all_tokens: bool = True) -> None:
     st.session_state.prefill_request_type = None
 
 
-def bootstrap_data() -> None:
-    init_db()
+@st.cache_resource(show_spinner=False)
+def bootstrap_data() -> bool:
+    """Jednokratna inicijalizacija po procesu (keširano preko st.cache_resource).
+
+    Rerun-ovi skripte ne plaćaju ništa; šema se primjenjuje samo ako je
+    zabilježena verzija u bazi starija od verzije u kodu.
+    """
+    if init_db():
+        logger.info("Main database schema applied")
     deleted_sessions = cleanup_expired_sessions()
     if deleted_sessions:
         logger.info("Cleaned up %s expired sessions", deleted_sessions)
+    if start_dispatcher():
+        logger.info("Mail dispatcher started")
+    start_retention_job()
 
     db = SessionLocal()
     try:
-        init_dms_database(db)
+        if init_dms_database(db):
+            logger.info("DMS database schema applied")
+        resumed = resume_pending_decisions()
+        if resumed:
+            logger.info("Resumed %s pending decision jobs", resumed)
+        # Čitanje inbox-a ne računa score; poslije migracije v7 (ili sa
+        # isključenim SLA scheduler-om) bi inbox inače ostao prazan.
+        refreshed = DmsManager(db).refresh_inbox_scores()
+        if refreshed:
+            logger.info("Refreshed inbox scores for %s requests", refreshed)
+        if start_sla_scheduler():
+            logger.info("SLA scheduler started")
         has_templates = db.query(DocumentTemplate).count() > 0
         if not has_templates:
             init_dms_templates(
@@ -214,6 +239,7 @@ def bootstrap_data() -> None:
             )
     finally:
         db.close()
+    return True
 
 
 def _render_eid_login() -> None:
@@ -487,7 +513,7 @@ def render_dashboard() -> None:
 
 
 def render_help_assistant() -> None:
-    from dms_core.dms_ai import get_dms_aware_response_with_source
+    from dms_core.dms_ai import get_dms_aware_response_stream
 
     st.title("Pomoc i FAQ")
     st.caption("AI chatbot za DMS pravila, dokumenta, takse i statuse")
@@ -525,27 +551,28 @@ def render_help_assistant() -> None:
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner("Analiziram pitanje..."):
-            db = SessionLocal()
-            try:
-                answer, source = get_dms_aware_response_with_source(
+        db = SessionLocal()
+        try:
+            # Spinner samo do prvog tokena; ostatak odgovora se prikazuje kako stiže
+            with st.spinner("Analiziram pitanje..."):
+                chunks, source = get_dms_aware_response_stream(
                     prompt.strip(),
                     db,
                     chat_history=st.session_state.faq_chat_history[:-1],
                 )
-                st.markdown(answer)
-                source_label = "LLM" if source == "llm" else "DMS fallback"
-                st.caption(f"Izvor odgovora: {source_label}")
-                st.session_state.faq_chat_history.append(
-                    {"role": "assistant", "content": answer, "source": source}
-                )
-            except Exception:
-                logger.exception("FAQ assistant failed")
-                fallback = "Trenutno nije moguce dobiti odgovor. Pokusajte ponovo."
-                st.error(fallback)
-                st.session_state.faq_chat_history.append({"role": "assistant", "content": fallback})
-            finally:
-                db.close()
+            answer = st.write_stream(chunks)
+            source_label = "LLM" if source == "llm" else "DMS fallback"
+            st.caption(f"Izvor odgovora: {source_label}")
+            st.session_state.faq_chat_history.append(
+                {"role": "assistant", "content": answer, "source": source}
+            )
+        except Exception:
+            logger.exception("FAQ assistant failed")
+            fallback = "Trenutno nije moguce dobiti odgovor. Pokusajte ponovo."
+            st.error(fallback)
+            st.session_state.faq_chat_history.append({"role": "assistant", "content": fallback})
+        finally:
+            db.close()
 
 
 def render_sidebar() -> None:
@@ -597,17 +624,32 @@ def render_sidebar() -> None:
             st.rerun()
 
 
+INBOX_PAGE_SIZE = 50
+
+
 def render_inbox() -> None:
     st.title("Obavještenja")
     if st.button("Označi sve kao pročitano"):
         mark_all_read(st.session_state.user)
+        st.session_state.inbox_older = []
         st.rerun()
 
-    items = list_notifications(st.session_state.user, only_unread=False, limit=50)
+    items = list_notifications(st.session_state.user, only_unread=False, limit=INBOX_PAGE_SIZE)
     if not items:
         st.info("Nemate obavještenja.")
         return
 
+    # Starije stranice (keyset: sve starije od zadnje stavke prve stranice).
+    # `inbox_older_cursor` pamti zadnji id prve stranice u trenutku učitavanja;
+    # ako se prva stranica pomjerila (nove ili obrisane notifikacije), starije
+    # stavke se ponovo čitaju od novog kraja, pa nema ni preklapanja ni rupa.
+    older = st.session_state.setdefault("inbox_older", [])
+    first_page_end = items[-1]["id"]
+    if older and st.session_state.get("inbox_older_cursor") != first_page_end:
+        older[:] = list_notifications(st.session_state.user, limit=len(older), after_id=first_page_end)
+    st.session_state.inbox_older_cursor = first_page_end
+    items = items + older
+
     for item in items:
         is_unread = item.get("read_at") is None
         container = st.container(border=True)
@@ -620,6 +662,12 @@ def render_inbox() -> None:
             if item.get("request_id"):
                 st.caption(f"Predmet #{item['request_id']}")
 
+    if len(items) % INBOX_PAGE_SIZE == 0 and st.button("Učitaj starije"):
+        older.extend(
+            list_notifications(st.session_state.user, limit=INBOX_PAGE_SIZE, after_id=items[-1]["id"])
+        )
+        st.rerun()
+
 
 def render_main_router() -> None:
     view = st.session_state.current_view
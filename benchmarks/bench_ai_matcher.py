@@ -0,0 +1,96 @@
+"""Micro-benchmark: original request-type scoring loop vs RequestTypeMatcher.
+
+Usage:
+  python -m benchmarks.bench_ai_matcher [--templates 300] [--queries 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from dms_core.dms_ai import normalize_text
+from dms_core.keyword_matcher import RequestTypeMatcher
+
+
+VOCABULARY = [
+    "pasos", "licna", "karta", "vozacka", "dozvola", "turizam", "stan", "kuca", "vila",
+    "registracija", "licenca", "izgubljena", "nova", "produzenje", "taksa", "boravak",
+    "prebivaliste", "promjena", "adresa", "vozilo", "oruzje", "dijete", "maloljetno",
+]
+
+
+def legacy_best_match(templates, normalized_query):
+    query_tokens = set(normalized_query.split())
+    best_match, best_score = None, 0.0
+    for request_type, keywords in templates.items():
+        score = 0.0
+        request_name = normalize_text(request_type.replace("_", " "))
+        if request_name and request_name in normalized_query:
+            score += 2.0
+        for keyword in keywords:
+            if keyword and keyword in normalized_query:
+                score += min(2.0, 1.0 + len(keyword.split()) * 0.3)
+        for token in query_tokens:
+            if token in request_name.split():
+                score += 0.4
+        if score > best_score:
+            best_score, best_match = score, request_type
+    return best_match, best_score
+
+
+def build_templates(rng, count):
+    templates = {}
+    for idx in range(count):
+        name_tokens = rng.sample(VOCABULARY, rng.randint(1, 3))
+        keywords = {" ".join(rng.sample(VOCABULARY, rng.randint(1, 3))) for _ in range(rng.randint(4, 12))}
+        keywords.update(name_tokens)
+        templates["_".join(name_tokens) + f"_{idx}"] = sorted(keywords)
+    return templates
+
+
+def build_queries(rng, count):
+    filler = ["sta", "mi", "treba", "za", "kako", "da", "koliko", "kosta"]
+    queries = []
+    for _ in range(count):
+        words = [rng.choice(VOCABULARY + filler) for _ in range(rng.randint(3, 12))]
+        queries.append(normalize_text(" ".join(words)))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    templates = build_templates(rng, args.templates)
+    queries = build_queries(rng, args.queries)
+
+    started = time.perf_counter()
+    matcher = RequestTypeMatcher(templates, normalize_text)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    legacy = [legacy_best_match(templates, query) for query in queries]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = [matcher.best_match(query) for query in queries]
+    indexed_s = time.perf_counter() - started
+
+    assert legacy == indexed, "matcher scores differ from the original loop"
+
+    per_query = lambda seconds: seconds / len(queries) * 1e6
+    print(f"templates={args.templates} queries={args.queries}")
+    print(f"matcher build:  {build_s * 1000:.1f} ms (once per template load)")
+    print(f"original loop:  {per_query(legacy_s):.1f} us/query")
+    print(f"matcher:        {per_query(indexed_s):.1f} us/query")
+    print(f"speedup:        {legacy_s / indexed_s:.1f}x (identical results)")
+
+
+if __name__ == "__main__":
+    main()
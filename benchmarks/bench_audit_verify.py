@@ -0,0 +1,140 @@
+"""Benchmark: whole-archive audit chain verification.
+
+Builds a temporary DMS database with N request_status_history rows (valid
+hash chains, `--per-request` entries each), then times:
+  * per-request  - DmsManager.verify_audit_chain for every request (ORM, one query each)
+  * full serial  - verify_audit_archive(workers=0, full=True)
+  * full pool    - verify_audit_archive(workers=N, full=True)
+  * incremental  - a second run after appending 1% new entries (checkpoints in place)
+
+The per-request baseline is measured on a sample and extrapolated, since
+running it over 1M rows takes minutes. The pool only pays off with more
+than one CPU.
+
+Usage:
+  python -m benchmarks.bench_audit_verify [--rows 1000000] [--per-request 5] [--workers N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from dms_core.audit_verify import verify_audit_archive
+from dms_core.manager import DmsManager, _hash_history_entry
+from dms_core.models import Base, RequestStatus
+
+
+STEPS = [
+    RequestStatus.DRAFT,
+    RequestStatus.SUBMITTED,
+    RequestStatus.UNDER_REVIEW,
+    RequestStatus.PENDING_USER,
+    RequestStatus.UNDER_REVIEW,
+    RequestStatus.APPROVED,
+    RequestStatus.COMPLETED,
+]
+
+
+def history_rows(request_ids, per_request, start=datetime(2025, 1, 1), last_hashes=None, offset=0):
+    """Valid chained rows; `last_hashes` (request_id -> hash) continues existing chains."""
+    for request_id in request_ids:
+        prev = (last_hashes or {}).get(request_id, "")
+        for step in range(offset, offset + per_request):
+            from_status = STEPS[step % len(STEPS)]
+            to_status = STEPS[(step + 1) % len(STEPS)]
+            changed_at = start + timedelta(minutes=request_id * 10 + step)
+            entry_hash = _hash_history_entry(
+                prev, request_id, from_status.value, to_status.value, "bench", changed_at.isoformat(), "bench"
+            )
+            yield (
+                request_id, from_status.name, to_status.name, "bench",
+                changed_at.strftime("%Y-%m-%d %H:%M:%S.%f"), "bench", prev, entry_hash,
+            )
+            prev = entry_hash
+        if last_hashes is not None:
+            last_hashes[request_id] = prev
+
+
+def insert_rows(engine, rows):
+    conn = engine.raw_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO request_status_history "
+            "(request_id, from_status, to_status, changed_by, changed_at, reason, prev_hash, entry_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def timed(label, func, entries):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    rate = entries / elapsed if elapsed else float("inf")
+    print(f"{label:<14} {elapsed:8.2f} s ({rate:,.0f} entries/s)")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--per-request", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sample", type=int, default=2000, help="requests for the per-request baseline")
+    args = parser.parse_args()
+
+    requests = max(1, args.rows // args.per_request)
+    rows = requests * args.per_request
+    print(f"rows={rows} requests={requests} workers={args.workers}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'dms.db'}")
+        Base.metadata.create_all(engine)
+        last_hashes = {}
+        started = time.perf_counter()
+        insert_rows(engine, history_rows(range(1, requests + 1), args.per_request, last_hashes=last_hashes))
+        print(f"{'setup:':<14} {time.perf_counter() - started:8.2f} s")
+
+        sample = min(args.sample, requests)
+        session = sessionmaker(bind=engine)()
+        manager = DmsManager(session)
+        _, sample_s = timed(
+            "per-request*:",
+            lambda: [manager.verify_audit_chain(request_id) for request_id in range(1, sample + 1)],
+            sample * args.per_request,
+        )
+        session.close()
+        print(f"{'':<14} extrapolated to all rows: {sample_s * requests / sample:8.2f} s")
+
+        serial, serial_s = timed(
+            "full serial:", lambda: verify_audit_archive(engine, workers=0, full=True), rows
+        )
+        pool, pool_s = timed(
+            "full pool:", lambda: verify_audit_archive(engine, workers=args.workers, full=True), rows
+        )
+        assert serial["entries"] == pool["entries"] == rows and not serial["broken"] and not pool["broken"]
+
+        touched = range(1, requests + 1, 100)
+        insert_rows(engine, history_rows(touched, 1, last_hashes=last_hashes, offset=args.per_request))
+        incremental, _ = timed(
+            "incremental:", lambda: verify_audit_archive(engine, workers=args.workers), len(touched)
+        )
+        assert incremental["entries"] == len(touched) and not incremental["broken"]
+        engine.dispose()
+
+    print(f"speedup pool/serial: {serial_s / pool_s:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: per-request transition loop vs batched bulk_manage_requests.
+
+Both paths move the same number of SUBMITTED requests to UNDER_REVIEW on a
+temporary file-backed DMS database. In-app notifications go to the main
+database (data/mup_data.db); benchmark rows are deleted at the end.
+
+Usage:
+  python -m benchmarks.bench_bulk_manage [--requests 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.database import get_conn
+from dms_core.manager import DmsManager
+from dms_core.models import Base, RequestStatus, RequestType
+
+
+USER_PREFIX = "bench_bulk_"
+
+
+def build_session(path: Path, count: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    manager = DmsManager(session)
+    ids = []
+    for idx in range(count):
+        request = manager.create_request(
+            request_type=RequestType.PASOS,
+            user_id=f"{USER_PREFIX}{idx}",
+            user_email=f"{USER_PREFIX}{idx}@example.com",
+            user_city="Podgorica",
+        )
+        manager._change_status(request.id, RequestStatus.SUBMITTED, changed_by=request.user_id)
+        ids.append(request.id)
+    return engine, session, manager, ids
+
+
+def legacy_loop(manager: DmsManager, ids):
+    """The pre-batching path: one transition_request (commit + notify) per id."""
+    results = []
+    for request_id in ids:
+        try:
+            manager.transition_request(
+                request_id=request_id,
+                new_status=RequestStatus.UNDER_REVIEW,
+                changed_by="bench_officer",
+                actor_role="admin",
+                reason="Bulk status promjena",
+            )
+            results.append(True)
+        except Exception:
+            results.append(False)
+    return results
+
+
+def cleanup_notifications():
+    conn = get_conn()
+    try:
+        with conn:
+            conn.execute("DELETE FROM notifications WHERE username LIKE ?", (f"{USER_PREFIX}%",))
+            conn.execute("DELETE FROM notification_counters WHERE username LIKE ?", (f"{USER_PREFIX}%",))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _, _, legacy_manager, legacy_ids = build_session(Path(tmp) / "legacy.db", args.requests)
+        _, _, bulk_manager, bulk_ids = build_session(Path(tmp) / "bulk.db", args.requests)
+
+        try:
+            started = time.perf_counter()
+            legacy_results = legacy_loop(legacy_manager, legacy_ids)
+            legacy_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            result = bulk_manager.bulk_manage_requests(
+                bulk_ids, changed_by="bench_officer", new_status=RequestStatus.UNDER_REVIEW
+            )
+            bulk_s = time.perf_counter() - started
+        finally:
+            cleanup_notifications()
+
+        assert all(legacy_results) and result["transitioned"] == args.requests and not result["failed"]
+        assert all(bulk_manager.verify_audit_chain(request_id)["valid"] for request_id in bulk_ids)
+
+    print(f"requests={args.requests}")
+    print(f"per-request loop: {legacy_s * 1000:.0f} ms ({legacy_s / args.requests * 1000:.2f} ms/request)")
+    print(f"bulk path:        {bulk_s * 1000:.0f} ms ({bulk_s / args.requests * 1000:.2f} ms/request)")
+    print(f"speedup:          {legacy_s / bulk_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
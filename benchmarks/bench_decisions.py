@@ -0,0 +1,88 @@
+"""Benchmark: per-call decision rendering vs the batched renderer.
+
+Three runs over the same N decisions, each into its own temporary directory:
+  * cold serial  - styles rebuilt for every document (the previous behaviour)
+  * warm serial  - one process, styles built once (`generate_signed_decisions(workers=0)`)
+  * batched pool - `generate_signed_decisions` across a spawn process pool
+
+The pool only pays off with more than one CPU; on a single core it mostly
+measures process start-up and IPC overhead.
+
+Usage:
+  python -m benchmarks.bench_decisions [--decisions 1000] [--workers N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from dms_core import signature
+
+
+def payloads(count: int, output_dir: Path):
+    return [
+        dict(
+            request_id=idx,
+            request_type="Turizam Registracija",
+            citizen_name=f"bench_citizen_{idx}",
+            officer_name="Bench Officer",
+            decision_text="Zahtjev je odobren.\nKorisnik je ovlašćen da otpočne sa pružanjem usluge.",
+            output_dir=output_dir,
+        )
+        for idx in range(count)
+    ]
+
+
+def cold_serial(items):
+    results = []
+    for item in items:
+        signature._pdf_kit.cache_clear()
+        results.append(signature.generate_signed_decision(**item))
+    return results
+
+
+def timed(label, func, count):
+    started = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - started
+    assert len(results) == count and all(results)
+    print(f"{label:<14} {elapsed * 1000:8.0f} ms ({elapsed / count * 1000:.2f} ms/decision)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--decisions", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"decisions={args.decisions} workers={args.workers}")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for name in ("cold", "warm", "pool"):
+            (root / name).mkdir()
+
+        cold_s = timed("cold serial:", lambda: cold_serial(payloads(args.decisions, root / "cold")), args.decisions)
+        warm_s = timed(
+            "warm serial:",
+            lambda: signature.generate_signed_decisions(payloads(args.decisions, root / "warm"), workers=0),
+            args.decisions,
+        )
+        pool_s = timed(
+            "batched pool:",
+            lambda: signature.generate_signed_decisions(
+                payloads(args.decisions, root / "pool"), workers=args.workers
+            ),
+            args.decisions,
+        )
+
+    print(f"speedup warm/cold: {cold_s / warm_s:.2f}x")
+    print(f"speedup pool/cold: {cold_s / pool_s:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
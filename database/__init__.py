@@ -4,7 +4,8 @@ from .database import (
     create_user,
     authenticate_user,
     get_user_email,
-    get_conn
+    get_conn,
+    get_pool
 )
 
 __all__ = [
@@ -12,5 +13,6 @@ __all__ = [
     'create_user',
     'authenticate_user',
     'get_user_email',
-    'get_conn'
+    'get_conn',
+    'get_pool'
 ]
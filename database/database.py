@@ -9,6 +9,9 @@ from datetime import datetime, timedelta
 import os
 from typing import Optional
 
+from database.migrations import CORE_COMPONENT, CORE_MIGRATIONS, migrate, read_schema_version
+from database.pool import ConnectionPool
+
 # Get the directory where this file is located
 BASE_DIR = Path(__file__).parent.parent
 DB_PATH = BASE_DIR / "data" / "mup_data.db"
@@ -16,133 +19,50 @@ DB_PATH = BASE_DIR / "data" / "mup_data.db"
 # Ensure data directory exists
 os.makedirs(BASE_DIR / "data", exist_ok=True)
 
-def get_conn():
-    return sqlite3.connect(str(DB_PATH))
+# Thread-local pool: jedna WAL konekcija po thread-u za sve helper funkcije
+_POOL = ConnectionPool(DB_PATH)
 
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
 
-    # Tabela za korisnike
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        username TEXT PRIMARY KEY,
-        password_hash TEXT NOT NULL,
-        email TEXT,
-        city TEXT,
-        id_card_number TEXT,
-        role TEXT DEFAULT 'citizen',
-        is_admin INTEGER DEFAULT 0
-    );
-    """)
-    
-    # Dodaj kolonu city ako ne postoji (za postojeće baze)
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN city TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # kolona već postoji
-    
-    # Dodaj kolonu id_card_number ako ne postoji
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN id_card_number TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # kolona već postoji
+def get_pool() -> ConnectionPool:
+    return _POOL
 
-    # Dodaj kolonu role ako ne postoji
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'citizen'")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass
 
-    # Dodaj kolonu is_admin ako ne postoji
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN is_admin INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass
+def get_conn():
+    """Vraća pool konekciju tekućeg thread-a; `close()` je vraća u pool."""
+    return _POOL.acquire()
 
-    # Tabela za servise (npr. licna karta)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS services (
-        name TEXT PRIMARY KEY,
-        documents TEXT,
-        fee_eur REAL,
-        payment_info TEXT,
-        processing_days INTEGER
-    );
-    """)
 
-    # Tabela za MUP centre
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS centers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        working_hours TEXT,
-        lat REAL,
-        lon REAL
-    );
-    """)
+# Verzija šeme glavne baze = zadnja migracija u CORE_MIGRATIONS.
+SCHEMA_VERSION = CORE_MIGRATIONS[-1].version
+SCHEMA_COMPONENT = CORE_COMPONENT
 
-    # Tabela za istoriju upita
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS queries (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT,
-        query TEXT,
-        service TEXT,
-        created_at TEXT
-    );
-    """)
 
-    # Tabela za podnesene DMS zahtjeve (audit log u glavnoj bazi)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS request_submissions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        request_id INTEGER,
-        username TEXT NOT NULL,
-        request_type TEXT NOT NULL,
-        status TEXT NOT NULL,
-        created_at TEXT NOT NULL
-    );
-    """)
-
-    # Tabela za persistent sesije (remember me)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS user_sessions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL,
-        token_hash TEXT NOT NULL,
-        expires_at TEXT NOT NULL,
-        created_at TEXT NOT NULL,
-        revoked INTEGER DEFAULT 0
-    );
-    """)
+def get_schema_version(component: str = SCHEMA_COMPONENT) -> int:
+    """Vraća zabilježenu verziju šeme (0 ako baza još nije inicijalizovana)."""
+    conn = get_conn()
+    try:
+        return read_schema_version(conn, component)
+    finally:
+        conn.close()
 
-    # Evidencija neuspjelih prijava (anti brute-force)
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS login_attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        );
-        """
-    )
 
-    # Indeksi za najčešće upite
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_queries_username ON queries(username)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_queries_created_at ON queries(created_at)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_request_submissions_username ON request_submissions(username)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_request_submissions_created_at ON request_submissions(created_at)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_username ON user_sessions(username)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions(expires_at)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_login_attempts_username_created_at ON login_attempts(username, created_at)")
+def init_db(force: bool = False, dry_run: bool = False):
+    """Primijeni pending migracije glavne baze (vidi database/migrations.py).
 
-    conn.commit()
-    conn.close()
+    Ako je zabilježena verzija šeme jednaka SCHEMA_VERSION, ne radi ništa
+    (jedan SELECT). Vraća True ako su migracije pokrenute; sa dry_run=True
+    vraća plan pending migracija bez izmjena.
+    """
+    conn = get_conn()
+    try:
+        if dry_run:
+            return migrate(conn, CORE_COMPONENT, CORE_MIGRATIONS, dry_run=True)
+        if not force and read_schema_version(conn, CORE_COMPONENT) >= SCHEMA_VERSION:
+            return False
+        migrate(conn, CORE_COMPONENT, CORE_MIGRATIONS)
+        return True
+    finally:
+        conn.close()
 
 
 def _hash_session_token(token: str) -> str:
@@ -394,33 +314,32 @@ def save_query(username, query, service):
 
 def save_request_submission(username, request_id, request_type, status):
     """Sačuvaj podneseni zahtjev korisnika u glavnu bazu (audit log)."""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS request_submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            request_id INTEGER,
-            username TEXT NOT NULL,
-            request_type TEXT NOT NULL,
-            status TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        );
-        """
-    )
-    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    with conn:
-        cur.execute(
-            """
-            INSERT INTO request_submissions (request_id, username, request_type, status, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (request_id, username, request_type, status, created_at)
-        )
-    conn.close()
+    save_request_submissions([(request_id, username, request_type, status)])
     return True
 
 
+def save_request_submissions(rows):
+    """Grupni upis u `request_submissions`: (request_id, username, request_type, status).
+
+    Jedna transakcija za sve redove; tabelu kreira core migracija.
+    """
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_conn()
+    try:
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO request_submissions (request_id, username, request_type, status, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [(request_id, username, request_type, status, created_at)
+                 for request_id, username, request_type, status in rows],
+            )
+    finally:
+        conn.close()
+    return len(rows)
+
+
 def create_user_session(username: str, token: str, expires_at: str) -> bool:
     conn = get_conn()
     cur = conn.cursor()
@@ -0,0 +1,496 @@
+"""Verzionisane migracije šeme za SQLite baze portala.
+
+Svaka baza (komponenta) ima uređenu listu `Migration` zapisa. Primijenjene
+verzije se bilježe u tabeli `schema_migrations` zajedno sa SHA-256 checksum-om
+koraka, a tabela `schema_version` čuva zadnju verziju za brzu provjeru pri
+pokretanju aplikacije.
+
+Sve pending migracije se primjenjuju u JEDNOJ transakciji (BEGIN IMMEDIATE):
+ili prođu sve ili nijedna. `dry_run=True` vraća plan bez izvršavanja.
+
+Komponente:
+  - core : data/mup_data.db  (CORE_MIGRATIONS, ovaj modul)
+  - dms  : instance/dms.db   (dms_core.migrations.DMS_MIGRATIONS)
+
+Pokretanje iz komandne linije:
+  python -m database.migrations [--dry-run]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger("dms_portal.migrations")
+
+
+class MigrationError(RuntimeError):
+    """Registar migracija se ne slaže sa stanjem baze."""
+
+
+# ============= KORACI =============
+
+@dataclass(frozen=True)
+class Sql:
+    """Jedna SQL naredba (DDL ili DML)."""
+
+    statement: str
+
+    def describe(self) -> str:
+        return " ".join(self.statement.split())
+
+    def plan(self, conn: sqlite3.Connection) -> Optional[str]:
+        return self.describe()
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        conn.execute(self.statement)
+
+
+@dataclass(frozen=True)
+class AddColumn:
+    """ALTER TABLE ADD COLUMN koji se preskače ako kolona već postoji.
+
+    Postojanje se provjerava preko PRAGMA table_info (čitanje), pa pokušaj
+    ne troši write transakciju kao stari try/except ALTER pristup.
+    """
+
+    table: str
+    column: str
+    ddl: str
+
+    def describe(self) -> str:
+        return f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.ddl}"
+
+    def _exists(self, conn: sqlite3.Connection) -> bool:
+        rows = conn.execute(f"PRAGMA table_info({self.table})").fetchall()
+        return any(row[1] == self.column for row in rows)
+
+    def plan(self, conn: sqlite3.Connection) -> Optional[str]:
+        return None if self._exists(conn) else self.describe()
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        if not self._exists(conn):
+            conn.execute(self.describe())
+
+
+@dataclass(frozen=True)
+class Backfill:
+    """Python korak za popunjavanje/prepravku podataka.
+
+    `revision` ulazi u checksum — povećaj ga kad se promijeni logika funkcije.
+    """
+
+    name: str
+    func: Callable[[sqlite3.Connection], None]
+    revision: int = 1
+
+    def describe(self) -> str:
+        return f"-- python: {self.name} (rev {self.revision})"
+
+    def plan(self, conn: sqlite3.Connection) -> Optional[str]:
+        return self.describe()
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        self.func(conn)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: Tuple = field(default_factory=tuple)
+
+    @property
+    def checksum(self) -> str:
+        payload = "\n".join([f"{self.version}:{self.name}"] + [step.describe() for step in self.steps])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ============= EVIDENCIJA VERZIJA =============
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def read_schema_version(conn: sqlite3.Connection, component: str) -> int:
+    """Zadnja zabilježena verzija (0 ako baza još nije inicijalizovana)."""
+    if not _table_exists(conn, "schema_version"):
+        return 0
+    row = conn.execute(
+        "SELECT version FROM schema_version WHERE component = ?", (component,)
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _ensure_ledger(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            component TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            component TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            PRIMARY KEY (component, version)
+        )
+        """
+    )
+
+
+def applied_migrations(conn: sqlite3.Connection, component: str) -> Dict[int, str]:
+    """Vraća {version: checksum} za primijenjene migracije komponente."""
+    if not _table_exists(conn, "schema_migrations"):
+        return {}
+    rows = conn.execute(
+        "SELECT version, checksum FROM schema_migrations WHERE component = ?", (component,)
+    ).fetchall()
+    return {int(version): checksum for version, checksum in rows}
+
+
+def _validate_registry(migrations: Sequence[Migration]) -> None:
+    versions = [migration.version for migration in migrations]
+    if versions != sorted(set(versions)):
+        raise MigrationError("Verzije migracija moraju biti jedinstvene i rastuće.")
+
+
+def pending_migrations(
+    conn: sqlite3.Connection,
+    component: str,
+    migrations: Sequence[Migration],
+) -> List[Migration]:
+    """Migracije iz registra koje nisu zabilježene; provjerava checksum primijenjenih."""
+    _validate_registry(migrations)
+    applied = applied_migrations(conn, component)
+    pending = []
+    for migration in migrations:
+        stored = applied.get(migration.version)
+        if stored is None:
+            pending.append(migration)
+        elif stored != migration.checksum:
+            raise MigrationError(
+                f"Checksum migracije {component}:{migration.version} ({migration.name}) "
+                "se ne slaže sa bazom — primijenjena migracija je naknadno izmijenjena."
+            )
+    return pending
+
+
+def _plan(conn: sqlite3.Connection, pending: Sequence[Migration]) -> List[Dict]:
+    return [
+        {
+            "version": migration.version,
+            "name": migration.name,
+            "checksum": migration.checksum,
+            "statements": [
+                statement
+                for statement in (step.plan(conn) for step in migration.steps)
+                if statement
+            ],
+        }
+        for migration in pending
+    ]
+
+
+def migrate(
+    conn: sqlite3.Connection,
+    component: str,
+    migrations: Sequence[Migration],
+    dry_run: bool = False,
+) -> List[Dict]:
+    """Primijeni sve pending migracije u jednoj transakciji.
+
+    Vraća listu {version, name, checksum, statements} za pending migracije.
+    Sa dry_run=True ništa se ne mijenja; iz `statements` su izostavljeni
+    AddColumn koraci za kolone koje već postoje.
+    """
+    if dry_run:
+        return _plan(conn, pending_migrations(conn, component, migrations))
+
+    if conn.in_transaction:
+        conn.commit()
+
+    latest = migrations[-1].version if migrations else 0
+    now = datetime.now().isoformat()
+
+    # Pending se računa tek pod write lock-om, pa dva procesa koja se
+    # pokrenu istovremeno ne primjenjuju iste migracije dvaput.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        pending = pending_migrations(conn, component, migrations)
+        plan = _plan(conn, pending)
+        if pending or read_schema_version(conn, component) < latest:
+            _ensure_ledger(conn)
+            for migration in pending:
+                for step in migration.steps:
+                    step.apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (component, version, name, checksum, applied_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (component, migration.version, migration.name, migration.checksum, now),
+                )
+            conn.execute(
+                "INSERT INTO schema_version (component, version, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(component) DO UPDATE SET "
+                "version = excluded.version, updated_at = excluded.updated_at",
+                (component, latest, now),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    for migration in pending:
+        logger.info("Migration applied %s:%s %s", component, migration.version, migration.name)
+    return plan
+
+
+# ============= CORE (data/mup_data.db) =============
+
+CORE_COMPONENT = "core"
+
+CORE_MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        name="baseline",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password_hash TEXT NOT NULL,
+                    email TEXT,
+                    city TEXT,
+                    id_card_number TEXT,
+                    role TEXT DEFAULT 'citizen',
+                    is_admin INTEGER DEFAULT 0
+                )
+                """
+            ),
+            AddColumn("users", "city", "TEXT"),
+            AddColumn("users", "id_card_number", "TEXT"),
+            AddColumn("users", "role", "TEXT DEFAULT 'citizen'"),
+            AddColumn("users", "is_admin", "INTEGER DEFAULT 0"),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS services (
+                    name TEXT PRIMARY KEY,
+                    documents TEXT,
+                    fee_eur REAL,
+                    payment_info TEXT,
+                    processing_days INTEGER
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS centers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    working_hours TEXT,
+                    lat REAL,
+                    lon REAL
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS queries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    query TEXT,
+                    service TEXT,
+                    created_at TEXT
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS request_submissions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    request_id INTEGER,
+                    username TEXT NOT NULL,
+                    request_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS user_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    token_hash TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    revoked INTEGER DEFAULT 0
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS login_attempts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            ),
+            Sql("CREATE INDEX IF NOT EXISTS idx_queries_username ON queries(username)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_queries_created_at ON queries(created_at)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_request_submissions_username ON request_submissions(username)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_request_submissions_created_at ON request_submissions(created_at)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_user_sessions_username ON user_sessions(username)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions(expires_at)"),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_login_attempts_username_created_at "
+                "ON login_attempts(username, created_at)"
+            ),
+        ),
+    ),
+    Migration(
+        version=2,
+        name="notifications",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS notifications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    request_id INTEGER,
+                    title TEXT NOT NULL,
+                    body TEXT,
+                    created_at TEXT NOT NULL,
+                    read_at TEXT
+                )
+                """
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_notifications_username_read "
+                "ON notifications(username, read_at)"
+            ),
+        ),
+    ),
+    Migration(
+        version=3,
+        name="email_outbox",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    notification_id INTEGER,
+                    to_email TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    lease_token TEXT,
+                    lease_until REAL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL,
+                    sent_at TEXT
+                )
+                """
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_email_outbox_due "
+                "ON email_outbox(status, next_attempt_at)"
+            ),
+        ),
+    ),
+    Migration(
+        version=4,
+        name="notification_counters",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS notification_counters (
+                    username TEXT PRIMARY KEY,
+                    unread INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            ),
+            Sql(
+                "INSERT OR REPLACE INTO notification_counters (username, unread) "
+                "SELECT username, SUM(read_at IS NULL) FROM notifications GROUP BY username"
+            ),
+        ),
+    ),
+    Migration(
+        version=5,
+        name="notification_retention",
+        steps=(
+            # Feed (keyset po id-u) i nepročitane; broj nepročitanih je u notification_counters
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_notifications_username_id "
+                "ON notifications(username, id DESC)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_notifications_unread "
+                "ON notifications(username, id DESC) WHERE read_at IS NULL"
+            ),
+            Sql("DROP INDEX IF EXISTS idx_notifications_username_read"),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS notifications_archive (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    first_id INTEGER NOT NULL,
+                    last_id INTEGER NOT NULL,
+                    item_count INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    archived_at TEXT NOT NULL
+                )
+                """
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_notifications_archive_username "
+                "ON notifications_archive(username, last_id)"
+            ),
+        ),
+    ),
+]
+
+
+def _print_plan(component: str, plan: List[Dict]) -> None:
+    if not plan:
+        print(f"[OK] {component}: nema pending migracija")
+        return
+    for item in plan:
+        print(f"[{component}] v{item['version']} {item['name']} ({item['checksum'][:12]})")
+        for statement in item["statements"]:
+            print(f"    {statement}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database.database import get_conn
+
+    parser = argparse.ArgumentParser(description="Migracije glavne baze (mup_data.db)")
+    parser.add_argument("--dry-run", action="store_true", help="samo prikaži plan")
+    args = parser.parse_args()
+
+    conn = get_conn()
+    try:
+        _print_plan(CORE_COMPONENT, migrate(conn, CORE_COMPONENT, CORE_MIGRATIONS, dry_run=args.dry_run))
+    finally:
+        conn.close()
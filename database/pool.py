@@ -0,0 +1,151 @@
+"""Thread-local pool SQLite konekcija za glavnu bazu (mup_data.db).
+
+Svaki thread (Streamlit script runner, pozadinski worker) dobija jednu
+trajnu konekciju koja se ponovo koristi za sve helper funkcije, umjesto
+da se za svaki upit otvara i zatvara nova `sqlite3.connect`.
+
+Konekcija se otvara sa:
+  - PRAGMA journal_mode=WAL   (čitaoci ne blokiraju pisca)
+  - PRAGMA synchronous=NORMAL (bezbjedno uz WAL, manje fsync poziva)
+  - PRAGMA busy_timeout       (čekanje na lock umjesto `database is locked`)
+  - keš pripremljenih naredbi (`cached_statements`)
+
+Podešavanja preko env varijabli:
+  DB_BUSY_TIMEOUT_MS (default 5000), DB_CACHED_STATEMENTS (default 256)
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_CACHED_STATEMENTS = 256
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+class PooledConnection:
+    """Tanki omotač oko pool konekcije.
+
+    Ponaša se kao `sqlite3.Connection`, ali `close()` ne zatvara fizičku
+    konekciju — samo poništava nezavršenu transakciju i vraća je u pool.
+    """
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+
+class ConnectionPool:
+    """Jedna konekcija po thread-u, lijeno otvorena i podešena pragmama.
+
+    Streamlit pokreće svaki rerun u novom thread-u, pa se konekcije thread-ova
+    koji su završili vraćaju u listu slobodnih i preuzimaju ih novi thread-ovi.
+    U svakom trenutku konekciju koristi najviše jedan živ thread.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        busy_timeout_ms: Optional[int] = None,
+        cached_statements: Optional[int] = None,
+    ):
+        self.db_path = Path(db_path)
+        self.busy_timeout_ms = (
+            busy_timeout_ms
+            if busy_timeout_ms is not None
+            else _env_int("DB_BUSY_TIMEOUT_MS", DEFAULT_BUSY_TIMEOUT_MS)
+        )
+        self.cached_statements = (
+            cached_statements
+            if cached_statements is not None
+            else _env_int("DB_CACHED_STATEMENTS", DEFAULT_CACHED_STATEMENTS)
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle: List[sqlite3.Connection] = []
+        self._owned: Dict[int, Tuple["weakref.ref[threading.Thread]", sqlite3.Connection]] = {}
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _reclaim_dead_owners(self) -> None:
+        for key, (owner_ref, conn) in list(self._owned.items()):
+            owner = owner_ref()
+            if owner is not None and owner.is_alive():
+                continue
+            del self._owned[key]
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+
+    def acquire(self) -> PooledConnection:
+        """Vrati konekciju tekućeg thread-a (preuzima slobodnu ili otvara novu)."""
+        if os.getpid() != self._pid:
+            # Nakon fork-a ne smijemo dijeliti konekcije roditelja.
+            self._local = threading.local()
+            self._idle = []
+            self._owned = {}
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                self._reclaim_dead_owners()
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+            with self._lock:
+                self._owned[id(conn)] = (weakref.ref(threading.current_thread()), conn)
+            self._local.conn = conn
+        return PooledConnection(conn)
+
+    def close_all(self) -> None:
+        """Zatvori sve konekcije (npr. prije brisanja baze u testovima)."""
+        with self._lock:
+            connections = self._idle + [conn for _, conn in self._owned.values()]
+            self._idle = []
+            self._owned = {}
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,229 @@
+"""Answer cache for the FAQ assistant.
+
+Keyed on (normalized query, intent, request_type, template knowledge version),
+so a template reseed produces new keys. Two tiers:
+- an in-process LRU with TTL
+- an optional SQLite tier that survives restarts (shared by all workers)
+
+Only LLM answers are cached; rule-based fallbacks are cheap to recompute and
+should not pin a degraded answer while the LLM endpoint is down.
+
+Environment:
+  AI_ANSWER_CACHE_SIZE (512), AI_ANSWER_CACHE_TTL_S (21600)
+  AI_ANSWER_CACHE_DB ($XDG_CACHE_HOME/dms_portal/answer_cache.db, falling back
+    to ~/.cache; "off" disables the SQLite tier). The default lives outside the
+    checkout so running the app or the tests never touches tracked files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from database.migrations import Migration, Sql, migrate
+from database.pool import ConnectionPool
+
+
+logger = logging.getLogger("dms_portal.ai.cache")
+
+ANSWER_CACHE_COMPONENT = "answer_cache"
+ANSWER_CACHE_MIGRATIONS = [
+    Migration(
+        version=1,
+        name="answers",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS assistant_answers (
+                    cache_key TEXT PRIMARY KEY,
+                    answer TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            ),
+            Sql("CREATE INDEX IF NOT EXISTS idx_assistant_answers_created_at ON assistant_answers (created_at)"),
+        ),
+    ),
+]
+
+_PRUNE_EVERY = 100
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def make_cache_key(normalized_query: str, intent: str, request_type: Optional[str], template_version: str) -> str:
+    payload = "\x1f".join([normalized_query, intent, request_type or "", template_version])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int = 512, ttl_s: float = 21600, db_path: Optional[Path] = None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        self._pool: Optional[ConnectionPool] = None
+        if db_path is not None:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._pool = ConnectionPool(db_path)
+                conn = self._pool.acquire()
+                try:
+                    migrate(conn, ANSWER_CACHE_COMPONENT, ANSWER_CACHE_MIGRATIONS)
+                finally:
+                    conn.close()
+            except Exception:
+                logger.exception("Answer cache SQLite tier disabled (%s)", db_path)
+                self._pool = None
+
+    @property
+    def persistent(self) -> bool:
+        return self._pool is not None
+
+    def _fresh(self, created_at: float) -> bool:
+        return self._clock() - created_at < self.ttl_s
+
+    def _remember(self, key: str, value: Tuple[str, str, float]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """(answer, source) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry[2]):
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry[0], entry[1]
+            if entry:
+                del self._entries[key]
+
+        row = None
+        if self._pool is not None:
+            conn = self._pool.acquire()
+            try:
+                row = conn.execute(
+                    "SELECT answer, source, created_at FROM assistant_answers WHERE cache_key = ? AND created_at > ?",
+                    (key, self._clock() - self.ttl_s),
+                ).fetchone()
+            except Exception:
+                logger.exception("Answer cache read failed")
+            finally:
+                conn.close()
+
+        with self._lock:
+            if row:
+                self._remember(key, (row[0], row[1], row[2]))
+                self._counters["disk_hits"] += 1
+                return row[0], row[1]
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, answer: str, source: str) -> None:
+        created_at = self._clock()
+        with self._lock:
+            self._remember(key, (answer, source, created_at))
+            self._counters["stores"] += 1
+            prune = self._counters["stores"] % _PRUNE_EVERY == 0
+
+        if self._pool is None:
+            return
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO assistant_answers (cache_key, answer, source, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, answer, source, created_at),
+                )
+                if prune:
+                    conn.execute("DELETE FROM assistant_answers WHERE created_at <= ?", (created_at - self.ttl_s,))
+        except Exception:
+            logger.exception("Answer cache write failed")
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._pool is None:
+            return
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                conn.execute("DELETE FROM assistant_answers")
+        except Exception:
+            logger.exception("Answer cache clear failed")
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate_percent"] = (
+            round((stats["memory_hits"] + stats["disk_hits"]) / lookups * 100, 2) if lookups else 0
+        )
+        stats["persistent"] = self.persistent
+        return stats
+
+
+_CACHE_LOCK = threading.Lock()
+_CACHE: Optional[AnswerCache] = None
+
+
+def _default_db_path() -> Path:
+    cache_home = os.getenv("XDG_CACHE_HOME", "").strip()
+    return (Path(cache_home) if cache_home else Path.home() / ".cache") / "dms_portal" / "answer_cache.db"
+
+
+def _db_path_from_env() -> Optional[Path]:
+    raw = os.getenv("AI_ANSWER_CACHE_DB", "").strip()
+    if raw.lower() in {"off", "0", "false", "none"}:
+        return None
+    return Path(raw) if raw else _default_db_path()
+
+
+def get_answer_cache() -> AnswerCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = AnswerCache(
+                max_entries=_env_int("AI_ANSWER_CACHE_SIZE", 512),
+                ttl_s=_env_int("AI_ANSWER_CACHE_TTL_S", 21600),
+                db_path=_db_path_from_env(),
+            )
+        return _CACHE
+
+
+def reset_answer_cache() -> None:
+    """Forget the shared cache instance so env settings are re-read (tests)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
+
+
+def invalidate_answer_cache() -> None:
+    """Drop all cached answers (called when templates are reseeded)."""
+    get_answer_cache().clear()
+
+
+def answer_cache_stats() -> Dict:
+    return get_answer_cache().stats()
@@ -0,0 +1,260 @@
+"""Auto-dodjela predmeta službenicima po opterećenju, kapacitetu i vještinama.
+
+`officer_load` čuva broj aktivnih predmeta (SUBMITTED/UNDER_REVIEW/
+PENDING_USER) po službeniku. Brojač se ne računa posebno: izvodi se iz
+rollup razlike (`status:*` ključevi) koju `record_request_change` ionako
+računa pri svakoj dodjeli i promjeni statusa, i upisuje u ISTOJ transakciji.
+
+`OfficerBalancer` drži min-heap (opterećenje, službenik) po tipu zahtjeva
+u memoriji procesa, pa je izbor službenika O(log n) bez upita po
+službeniku. Heap se sinhronizuje sa `officer_load` i listom osoblja
+najviše jednom u SYNC_INTERVAL_S; commit-ovana dodjela lokalno povećava
+opterećenje (`record_assignment`), a oslobađanja (završeni predmeti)
+stižu sa sljedećom sinhronizacijom.
+
+Pokretanje iz komandne linije:
+  python -m dms_core.assignment --reconcile   # preračunaj brojače iz dms_requests
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database.database import get_staff_usernames
+from dms_core.models import OfficerLoad, RequestStatus, RequestType
+
+
+logger = logging.getLogger("dms_portal.assignment")
+
+SYNC_INTERVAL_S = 30.0
+ACTIVE_STATUS_NAMES = (
+    RequestStatus.SUBMITTED.name,
+    RequestStatus.UNDER_REVIEW.name,
+    RequestStatus.PENDING_USER.name,
+)
+
+# Radi i na DB-API konekciji (migracija) i kroz SQLAlchemy text() (CLI, testovi).
+RECONCILE_SQL = (
+    "UPDATE officer_load SET active = 0, updated_at = :now WHERE active != 0",
+    """
+    INSERT INTO officer_load (officer, active, updated_at)
+    SELECT TRIM(assigned_to), COUNT(*), :now
+    FROM dms_requests
+    WHERE status IN ('SUBMITTED', 'UNDER_REVIEW', 'PENDING_USER')
+      AND assigned_to IS NOT NULL AND TRIM(assigned_to) != ''
+    GROUP BY TRIM(assigned_to)
+    ON CONFLICT(officer) DO UPDATE SET active = excluded.active, updated_at = excluded.updated_at
+    """,
+)
+
+
+# ============= PERSISTENTNI BROJAČ =============
+
+def apply_load_delta(db, delta: Dict[str, int]) -> None:
+    """Dodaj razlike aktivnih predmeta po službeniku (bez commit-a)."""
+    delta = {officer: change for officer, change in delta.items() if officer and change}
+    if not delta:
+        return
+    table = OfficerLoad.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.officer],
+        set_={"active": table.c.active + stmt.excluded.active, "updated_at": stmt.excluded.updated_at},
+    )
+    now = datetime.now()
+    db.execute(stmt, [{"officer": officer, "active": change, "updated_at": now} for officer, change in delta.items()])
+
+
+def reconcile_officer_load(db) -> Dict[str, Tuple[int, int]]:
+    """Preračunaj brojače iz dms_requests; vraća {officer: (bilo, sada)} za razlike. Commit-uje."""
+    before = {row.officer: row.active for row in db.query(OfficerLoad).all()}
+    now = datetime.now()
+    for sql in RECONCILE_SQL:
+        db.execute(text(sql), {"now": now})
+    db.commit()
+    after = {row.officer: row.active for row in db.query(OfficerLoad).all()}
+    drift = {
+        officer: (before.get(officer, 0), active)
+        for officer, active in after.items()
+        if before.get(officer, 0) != active
+    }
+    if drift:
+        logger.warning("Officer load reconciled: %s", drift)
+        for balancer in list(_BALANCERS.values()):
+            balancer.invalidate()
+    return drift
+
+
+def reconcile_officer_load_conn(conn) -> None:
+    """Backfill varijanta za migraciju (DB-API konekcija, bez commit-a)."""
+    params = {"now": datetime.now().isoformat(sep=" ")}
+    for sql in RECONCILE_SQL:
+        conn.execute(sql, params)
+
+
+def get_officer_profiles(db) -> Dict[str, Dict]:
+    """{officer: {"active", "capacity", "skills"}} za prikaz u admin panelu."""
+    return {
+        row.officer: {"active": row.active, "capacity": row.capacity, "skills": row.skills or []}
+        for row in db.query(OfficerLoad).all()
+    }
+
+
+def set_officer_profile(
+    db,
+    officer: str,
+    capacity: Optional[int] = None,
+    skills: Optional[Iterable[str]] = None,
+) -> None:
+    """Postavi kapacitet (None = neograničeno) i vještine (None = svi tipovi)."""
+    row = db.get(OfficerLoad, officer)
+    if row is None:
+        row = OfficerLoad(officer=officer, active=0)
+        db.add(row)
+    row.capacity = capacity if capacity and capacity > 0 else None
+    row.skills = sorted(skills) if skills else None
+    row.updated_at = datetime.now()
+    db.commit()
+    for balancer in list(_BALANCERS.values()):
+        balancer.invalidate()
+
+
+# ============= HEAP U MEMORIJI =============
+
+class OfficerBalancer:
+    """Min-heap po tipu zahtjeva sa lijenim brisanjem zastarjelih unosa."""
+
+    def __init__(self, staff_loader=None, sync_interval_s: float = SYNC_INTERVAL_S, clock=time.monotonic):
+        self._staff_loader = staff_loader
+        self.sync_interval_s = sync_interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._synced_at: Optional[float] = None
+        self._load: Dict[str, int] = {}
+        self._capacity: Dict[str, Optional[int]] = {}
+        self._skills: Dict[str, Optional[frozenset]] = {}
+        self._order: Dict[str, int] = {}
+        self._heaps: Dict[str, List[Tuple[int, int, str]]] = {}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._synced_at = None
+
+    def _sync(self, db) -> None:
+        staff = (self._staff_loader or get_staff_usernames)()
+        profiles = {row.officer: row for row in db.query(OfficerLoad).all()}
+        self._order = {officer: idx for idx, officer in enumerate(staff)}
+        self._load = {officer: profiles[officer].active if officer in profiles else 0 for officer in staff}
+        self._capacity = {officer: profiles[officer].capacity if officer in profiles else None for officer in staff}
+        self._skills = {
+            officer: frozenset(profiles[officer].skills) if officer in profiles and profiles[officer].skills else None
+            for officer in staff
+        }
+        self._heaps = {}
+        self._synced_at = self._clock()
+
+    def _heap(self, request_type: str) -> List[Tuple[int, int, str]]:
+        heap = self._heaps.get(request_type)
+        if heap is None:
+            heap = [
+                (load, self._order[officer], officer)
+                for officer, load in self._load.items()
+                if self._skills[officer] is None or request_type in self._skills[officer]
+            ]
+            heapq.heapify(heap)
+            self._heaps[request_type] = heap
+        return heap
+
+    def _has_room(self, officer: str) -> bool:
+        capacity = self._capacity.get(officer)
+        return capacity is None or self._load[officer] < capacity
+
+    def _push(self, officer: str) -> None:
+        entry = (self._load[officer], self._order[officer], officer)
+        for request_type, heap in self._heaps.items():
+            skills = self._skills[officer]
+            if skills is None or request_type in skills:
+                heapq.heappush(heap, entry)
+
+    def pick(self, db, request_type: RequestType, exclude: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """Najmanje opterećen službenik sa slobodnim kapacitetom i vještinom za tip.
+
+        Vraća (službenik, aktivnih prije dodjele) ili None. `exclude`
+        (podnosilac) se bira samo ako nema nikog drugog, kao i ranije.
+        Opterećenje se ne mijenja dok pozivalac ne commit-uje dodjelu i
+        javi je preko `record_assignment` (rollback ne ostavlja tragove).
+        """
+        with self._lock:
+            if self._synced_at is None or self._clock() - self._synced_at > self.sync_interval_s:
+                self._sync(db)
+            heap = self._heap(request_type.name)
+
+            skipped = []
+            chosen = None
+            while heap:
+                load, order, officer = heap[0]
+                if load != self._load.get(officer) or not self._has_room(officer):
+                    heapq.heappop(heap)  # zastarjelo ili pun kapacitet (vraća ga sync)
+                    continue
+                if officer == exclude:
+                    skipped.append(heapq.heappop(heap))
+                    continue
+                chosen = officer
+                break
+            if chosen is None and skipped:
+                chosen = skipped[0][2]
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            if chosen is None:
+                return None
+            return chosen, self._load[chosen]
+
+    def record_assignment(self, officer: str) -> None:
+        """Commit-ovana dodjela: povećaj lokalno opterećenje do sljedećeg sync-a."""
+        with self._lock:
+            if officer not in self._load:
+                return
+            self._load[officer] += 1
+            self._push(officer)
+
+
+# id(engine) nije stabilan nakon GC-a; ključ je sam engine (weakref)
+_BALANCERS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_BALANCERS_LOCK = threading.Lock()
+
+
+def get_balancer(db) -> OfficerBalancer:
+    bind = db.get_bind()
+    with _BALANCERS_LOCK:
+        balancer = _BALANCERS.get(bind)
+        if balancer is None:
+            balancer = _BALANCERS[bind] = OfficerBalancer()
+        return balancer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dms_core.models import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Brojači opterećenja službenika")
+    parser.add_argument("--reconcile", action="store_true", help="preračunaj iz dms_requests")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        if args.reconcile:
+            print(reconcile_officer_load(session) or "Brojači su usklađeni.")
+        for row in session.query(OfficerLoad).order_by(OfficerLoad.officer):
+            print(f"{row.officer}: active={row.active} capacity={row.capacity or '-'} skills={row.skills or 'svi'}")
+    finally:
+        session.close()
@@ -0,0 +1,250 @@
+"""Provjera hash chain-a za cijelu arhivu `request_status_history`.
+
+`DmsManager.verify_audit_chain` provjerava jedan predmet; ovdje se istorija
+čita redom po (request_id, id) u serijama (keyset, idx_status_history_request),
+grupiše po predmetu i grupe se šalju ProcessPoolExecutor-u na ponovni
+SHA-256 izračun. Pravila su ista kao u `verify_audit_chain`: legacy unosi
+bez hash-a se preskaču bez prekida lanca, prvo neslaganje prekida provjeru
+predmeta.
+
+`audit_checkpoints` čuva po predmetu id zadnjeg provjerenog unosa i njegov
+hash, pa sljedeće pokretanje hešira samo nove unose. Kod prekinutog lanca
+checkpoint ostaje na zadnjem ispravnom unosu, a `broken_at` pamti mjesto
+prekida — predmet se prijavljuje u svakom sljedećem pokretanju dok se ne
+riješi.
+
+Podešavanja preko env varijabli:
+  DMS_AUDIT_WORKERS (broj CPU-a, 0 na jednom jezgru; 0 = provjera u pozivajućem procesu)
+  DMS_AUDIT_CHUNK (5000) — redova istorije po čitanju
+
+Pokretanje iz komandne linije (npr. noćni cron):
+  python -m dms_core.audit_verify [--full] [--workers N]
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dms_core.manager import _hash_history_entry
+from dms_core.models import RequestStatus, engine as dms_engine
+
+
+logger = logging.getLogger("dms_portal.audit")
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# (id, from_status, to_status, changed_by, changed_at, reason, prev_hash, entry_hash)
+HistoryRow = Tuple[int, Optional[str], Optional[str], Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+# (request_id, checkpoint id, checkpoint hash, novi unosi)
+RequestGroup = Tuple[int, int, str, List[HistoryRow]]
+# (request_id, verified_up_to, last_hash, broken_at, provjerenih unosa)
+GroupResult = Tuple[int, int, str, Optional[int], int]
+
+# Enum se u bazi čuva po imenu, a u hash ulazi .value
+_STATUS_VALUES = {status.name: status.value for status in RequestStatus}
+
+_FETCH_SQL = """
+    SELECT h.request_id, h.id, h.from_status, h.to_status, h.changed_by, h.changed_at,
+           h.reason, h.prev_hash, h.entry_hash, COALESCE(c.verified_up_to, 0), COALESCE(c.last_hash, '')
+    FROM request_status_history h
+    LEFT JOIN audit_checkpoints c ON c.request_id = h.request_id
+    WHERE (h.request_id, h.id) > (?, ?) AND h.id > COALESCE(c.verified_up_to, 0)
+    ORDER BY h.request_id, h.id
+    LIMIT ?
+"""
+
+_SAVE_SQL = """
+    INSERT INTO audit_checkpoints (request_id, verified_up_to, last_hash, broken_at, verified_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(request_id) DO UPDATE SET
+        verified_up_to = excluded.verified_up_to,
+        last_hash = excluded.last_hash,
+        broken_at = excluded.broken_at,
+        verified_at = excluded.verified_at
+"""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _iso(value: Optional[str]) -> str:
+    # isto kao row.changed_at.isoformat() nad ORM datetime-om
+    return datetime.fromisoformat(value).isoformat() if value else ""
+
+
+def verify_group(group: RequestGroup) -> GroupResult:
+    """Provjeri nove unose jednog predmeta nastavljajući od checkpoint hash-a."""
+    request_id, verified_up_to, expected_prev, rows = group
+    checked = 0
+    for row_id, from_status, to_status, changed_by, changed_at, reason, prev_hash, entry_hash in rows:
+        if entry_hash is None:
+            verified_up_to = row_id
+            checked += 1
+            continue
+        if (prev_hash or "") != expected_prev:
+            return request_id, verified_up_to, expected_prev, row_id, checked
+        recomputed = _hash_history_entry(
+            prev_hash=expected_prev,
+            request_id=request_id,
+            from_status=_STATUS_VALUES.get(from_status, ""),
+            to_status=_STATUS_VALUES.get(to_status, ""),
+            changed_by=changed_by or "",
+            changed_at=_iso(changed_at),
+            reason=reason or "",
+        )
+        if recomputed != entry_hash:
+            return request_id, verified_up_to, expected_prev, row_id, checked
+        expected_prev = entry_hash
+        verified_up_to = row_id
+        checked += 1
+    return request_id, verified_up_to, expected_prev, None, checked
+
+
+def verify_groups(groups: List[RequestGroup]) -> List[GroupResult]:
+    """Jedinica posla za process pool: serija predmeta."""
+    return [verify_group(group) for group in groups]
+
+
+def _read_groups(conn, chunk_size: int) -> Iterator[List[RequestGroup]]:
+    """Serije kompletnih grupa; zadnja (možda nepotpuna) grupa prelazi u sljedeću seriju."""
+    after = (0, 0)
+    pending: Optional[RequestGroup] = None
+    while True:
+        rows = conn.execute(_FETCH_SQL, (*after, chunk_size)).fetchall()
+        groups: List[RequestGroup] = []
+        if pending is not None:
+            groups.append(pending)
+            pending = None
+        for request_id, *entry, start_id, start_hash in rows:
+            if not groups or groups[-1][0] != request_id:
+                groups.append((request_id, start_id, start_hash, []))
+            groups[-1][3].append(tuple(entry))
+        if len(rows) < chunk_size:
+            if groups:
+                yield groups
+            return
+        after = (rows[-1][0], rows[-1][1])
+        pending = groups.pop()
+        if groups:
+            yield groups
+
+
+def _checkpoint(conn, results: List[GroupResult], report: Dict) -> None:
+    verified_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    rows = []
+    for request_id, verified_up_to, last_hash, broken_at, checked in results:
+        report["requests"] += 1
+        report["entries"] += checked
+        if broken_at is not None:
+            report["broken"].append({"request_id": request_id, "broken_at": broken_at})
+        rows.append((request_id, verified_up_to, last_hash, broken_at, verified_at))
+    conn.executemany(_SAVE_SQL, rows)
+    conn.commit()
+
+
+def verify_audit_archive(
+    bind=None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    full: bool = False,
+) -> Dict:
+    """Provjeri sve nove unose istorije i ažuriraj checkpoint-e.
+
+    `full=True` briše checkpoint-e i provjerava cijelu arhivu ispočetka.
+    Vraća {"requests", "entries", "broken": [{"request_id", "broken_at"}], "seconds"}.
+    """
+    bind = bind if bind is not None else dms_engine
+    if workers is None:
+        # Na jednom jezgru pool samo dodaje start procesa i IPC
+        cpus = os.cpu_count() or 1
+        workers = _env_int("DMS_AUDIT_WORKERS", cpus if cpus > 1 else 0)
+    chunk_size = chunk_size or _env_int("DMS_AUDIT_CHUNK", DEFAULT_CHUNK_SIZE) or DEFAULT_CHUNK_SIZE
+    report: Dict = {"requests": 0, "entries": 0, "broken": []}
+    started = time.perf_counter()
+
+    conn = bind.raw_connection()
+    executor = None
+    try:
+        if full:
+            conn.execute("DELETE FROM audit_checkpoints")
+            conn.commit()
+        # Čitanje i upis checkpoint-a su u ovom procesu (jedna konekcija);
+        # pool samo hešira.
+        batches = _read_groups(conn, chunk_size)
+        first = next(batches, None)
+        second = next(batches, None) if first is not None else None
+        if workers == 0 or second is None:
+            # Jedna serija (tipično inkrementalni krug) ne plaća start pool-a
+            for groups in itertools.chain(filter(None, (first, second)), batches):
+                _checkpoint(conn, verify_groups(groups), report)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            in_flight = deque()
+            for groups in itertools.chain((first, second), batches):
+                in_flight.append(executor.submit(verify_groups, groups))
+                # Ograniči memoriju: najviše dvije serije po radniku u letu
+                while len(in_flight) >= workers * 2:
+                    _checkpoint(conn, in_flight.popleft().result(), report)
+            while in_flight:
+                _checkpoint(conn, in_flight.popleft().result(), report)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        conn.close()
+
+    report["broken"].sort(key=lambda item: item["request_id"])
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    if report["broken"]:
+        logger.error("Audit chain prekinut u %s predmeta: %s", len(report["broken"]), report["broken"][:20])
+    logger.info(
+        "Audit verifikacija: predmeta=%s unosa=%s prekida=%s (%.1fs)",
+        report["requests"], report["entries"], len(report["broken"]), report["seconds"],
+    )
+    return report
+
+
+def list_broken_chains(bind=None) -> List[Dict]:
+    """Predmeti čiji je lanac prekinut pri zadnjoj provjeri."""
+    bind = bind if bind is not None else dms_engine
+    conn = bind.raw_connection()
+    try:
+        rows = conn.execute(
+            "SELECT request_id, broken_at, verified_at FROM audit_checkpoints "
+            "WHERE broken_at IS NOT NULL ORDER BY request_id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{"request_id": r[0], "broken_at": r[1], "verified_at": r[2]} for r in rows]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Provjera hash chain-a cijele istorije statusa")
+    parser.add_argument("--full", action="store_true", help="zanemari checkpoint-e i provjeri sve")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = verify_audit_archive(workers=args.workers, chunk_size=args.chunk_size, full=args.full)
+    print(
+        f"Predmeta: {result['requests']} · unosa: {result['entries']} · "
+        f"prekinutih lanaca: {len(result['broken'])} · {result['seconds']}s"
+    )
+    for item in result["broken"]:
+        print(f"  request_id={item['request_id']} broken_at={item['broken_at']}")
+    sys.exit(1 if result["broken"] else 0)
@@ -0,0 +1,339 @@
+"""Red poslova za generisanje potpisanih rješenja van klika službenika.
+
+Odobravanje samo upiše `decision_jobs` red i postavi
+`dms_requests.decision_status = 'queued'` u istoj transakciji kao promjenu
+statusa. Render (reportlab + hash) radi ProcessPoolExecutor u zasebnom
+procesu, pa latencija službenika ne zavisi od veličine PDF-a.
+
+Statusi: queued → rendering → ready | failed.
+
+Više poslova odjednom (bulk odobravanje) ide na pool u serijama
+(`render_decision_chunk`), pa svaki proces stilove gradi jednom i IPC
+ide po seriji, ne po dokumentu.
+
+Posao preuzima samo jedan proces (uslovni UPDATE queued → rendering).
+Queued poslovi i rendering poslovi stariji od timeout-a (proces je pao)
+ponovo se šalju u red pri pokretanju aplikacije (`resume_pending_decisions`).
+
+Podešavanja preko env varijabli:
+  DMS_DECISION_WORKERS (1; 0 = render u pozivajućem thread-u, npr. testovi)
+  DMS_DECISION_CHUNK (20) — najviše rješenja po seriji
+  DMS_DECISION_TIMEOUT_S (600) — kad se rendering posao smatra napuštenim
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_, update
+
+from dms_core.models import DecisionJob, DmsRequest, RequestType, SessionLocal
+from dms_core.signature import render_decision_chunk
+
+
+logger = logging.getLogger("dms_portal.decisions")
+
+STATUS_QUEUED = "queued"
+STATUS_RENDERING = "rendering"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+PENDING_STATUSES = (STATUS_QUEUED, STATUS_RENDERING)
+DEFAULT_RENDER_TIMEOUT_S = 600
+
+_TOURISM_TYPES = {
+    RequestType.TURIZAM_REGISTRACIJA,
+    RequestType.TURIZAM_LICENCA,
+    RequestType.TURIZAM_DOZVOLA_GRADNJE,
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+def request_type_label(request: DmsRequest) -> str:
+    return request.request_type.value.replace("_", " ").title()
+
+
+def build_decision_text(request: DmsRequest, reason: Optional[str]) -> str:
+    lines = [f"Zahtjev za uslugu '{request_type_label(request)}' je odobren."]
+    if reason:
+        lines.append(f"Obrazloženje: {reason}")
+    if request.request_type in _TOURISM_TYPES:
+        lines.append("Korisnik je ovlašćen da otpočne sa pružanjem usluge u skladu sa registracijom.")
+    else:
+        lines.append("Za preuzimanje fizičkog dokumenta očekujte instrukcije u sekciji 'Moji zahtjevi'.")
+    return "\n".join(lines)
+
+
+def enqueue_decision(db, request: DmsRequest, officer_name: Optional[str], reason: Optional[str]) -> DecisionJob:
+    """Upiše (ili obnovi) posao za rješenje; bez commit-a."""
+    job = db.get(DecisionJob, request.id)
+    if job is None:
+        job = DecisionJob(request_id=request.id, attempts=0)
+        db.add(job)
+    job.officer_name = officer_name or "Sistem"
+    job.reason = reason
+    job.status = STATUS_QUEUED
+    job.error = None
+    job.queued_at = datetime.now()
+    job.started_at = None
+    job.finished_at = None
+    request.decision_status = STATUS_QUEUED
+    return job
+
+
+def get_decision_status(db, request_id: int) -> Optional[str]:
+    row = db.query(DmsRequest.decision_status).filter(DmsRequest.id == request_id).first()
+    return row[0] if row else None
+
+
+class DecisionWorker:
+    """Šalje poslove u process pool i upisuje rezultat kad render završi."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        session_factory: Callable = SessionLocal,
+        output_dir: Optional[Path] = None,
+    ):
+        self.workers = _env_int("DMS_DECISION_WORKERS", 1) if workers is None else workers
+        self.chunk_size = _env_int("DMS_DECISION_CHUNK", 20) or 20
+        self.session_factory = session_factory
+        self.output_dir = output_dir
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._futures: Dict[int, Future] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: ne fork-ujemo proces sa Streamlit/SQLite thread-ovima
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _start(self, request_ids: Iterable[int]) -> List[Dict]:
+        """queued → rendering za cijelu seriju; vraća argumente za render.
+
+        Poslovi se preuzimaju jednim uslovnim UPDATE-om (RETURNING), pa ga
+        od više procesa koji pošalju isti posao (npr. `resume_pending_decisions`
+        u svakom) renderuje samo onaj kome je UPDATE promijenio red. Jedna
+        transakcija po seriji, ne po rješenju.
+        """
+        ids = list(dict.fromkeys(request_ids))
+        if not ids:
+            return []
+        db = self.session_factory()
+        try:
+            claimed = set(
+                db.execute(
+                    update(DecisionJob)
+                    .where(DecisionJob.request_id.in_(ids), DecisionJob.status == STATUS_QUEUED)
+                    .values(
+                        status=STATUS_RENDERING,
+                        started_at=datetime.now(),
+                        attempts=func.coalesce(DecisionJob.attempts, 0) + 1,
+                    )
+                    .returning(DecisionJob.request_id)
+                ).scalars()
+            )
+            if not claimed:
+                db.rollback()
+                return []
+            rows = (
+                db.query(DecisionJob, DmsRequest)
+                .join(DmsRequest, DmsRequest.id == DecisionJob.request_id)
+                .filter(DecisionJob.request_id.in_(claimed))
+                .all()
+            )
+            by_id = {job.request_id: (job, request) for job, request in rows}
+            payloads = []
+            for request_id in ids:
+                if request_id not in by_id:
+                    continue
+                job, request = by_id[request_id]
+                request.decision_status = STATUS_RENDERING
+                payloads.append({
+                    "request_id": request.id,
+                    "request_type": request_type_label(request),
+                    "citizen_name": request.user_id,
+                    "officer_name": job.officer_name,
+                    "decision_text": build_decision_text(request, job.reason),
+                    "output_dir": self.output_dir,
+                })
+            db.commit()
+            return payloads
+        finally:
+            db.close()
+
+    def _finish(self, outcomes: List[Tuple[int, Optional[Tuple[str, str]], Optional[str]]]) -> None:
+        """Upiše rezultate serije (request_id, rezultat, greška) jednim commit-om."""
+        db = self.session_factory()
+        try:
+            ids = [request_id for request_id, _, _ in outcomes]
+            rows = {
+                job.request_id: (job, request)
+                for job, request in db.query(DecisionJob, DmsRequest)
+                .join(DmsRequest, DmsRequest.id == DecisionJob.request_id)
+                .filter(DecisionJob.request_id.in_(ids))
+            }
+            finished_at = datetime.now()
+            for request_id, result, error in outcomes:
+                job, request = rows.get(request_id, (None, None))
+                # Posao koji više nije rendering je u međuvremenu preuzet ponovo
+                if job is None or job.status != STATUS_RENDERING:
+                    continue
+                job.finished_at = finished_at
+                if result is None:
+                    job.status = STATUS_FAILED
+                    job.error = error or "nepoznata greška"
+                    request.decision_status = STATUS_FAILED
+                    logger.error("Generisanje rješenja neuspjelo request_id=%s: %s", request_id, job.error)
+                else:
+                    file_path, sig_hash = result
+                    job.status = STATUS_READY
+                    job.error = None
+                    request.signed_pdf_path = file_path
+                    request.signature_hash = sig_hash
+                    request.decision_status = STATUS_READY
+                    logger.info(
+                        "Decision document generated request_id=%s path=%s hash=%s",
+                        request_id, file_path, sig_hash[:16],
+                    )
+            db.commit()
+        except Exception:
+            logger.exception("Upis rezultata rješenja neuspio request_ids=%s", ids)
+        finally:
+            db.close()
+
+    def _finish_chunk(self, request_ids: List[int], future: Future) -> None:
+        try:
+            outcomes = future.result()
+        except Exception as exc:
+            outcomes = [(None, str(exc) or exc.__class__.__name__)] * len(request_ids)
+        self._finish([
+            (request_id, result, error) for request_id, (result, error) in zip(request_ids, outcomes)
+        ])
+        with self._lock:
+            for request_id in request_ids:
+                self._futures.pop(request_id, None)
+            self._idle.notify_all()
+
+    def submit(self, request_ids: Iterable[int]) -> List[int]:
+        """Pošalji queued poslove na render; vraća id-eve koji su poslati."""
+        payloads = self._start(request_ids)
+        submitted = [payload["request_id"] for payload in payloads]
+        if not payloads:
+            return submitted
+
+        if self.workers == 0:
+            outcomes = render_decision_chunk(payloads)
+            self._finish([
+                (request_id, result, error) for request_id, (result, error) in zip(submitted, outcomes)
+            ])
+            return submitted
+
+        # Serije ravnomjerno na radnike, ali ne veće od chunk_size (da status
+        # u UI-ju napreduje i kod velikih bulk odobravanja).
+        size = max(1, min(self.chunk_size, math.ceil(len(payloads) / self.workers)))
+        for offset in range(0, len(payloads), size):
+            chunk = payloads[offset:offset + size]
+            ids = submitted[offset:offset + size]
+            try:
+                future = self._pool().submit(render_decision_chunk, chunk)
+            except Exception as exc:
+                future = Future()
+                future.set_exception(exc)
+                self._finish_chunk(ids, future)
+                continue
+            with self._lock:
+                for request_id in ids:
+                    self._futures[request_id] = future
+            future.add_done_callback(partial(self._finish_chunk, ids))
+        return submitted
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sačekaj poslove u toku i upis rezultata; True ako su svi završeni."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._futures, timeout=timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_WORKER_LOCK = threading.Lock()
+_WORKER: Optional[DecisionWorker] = None
+
+
+def get_decision_worker() -> DecisionWorker:
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            _WORKER = DecisionWorker()
+        return _WORKER
+
+
+def requeue_decision(request_id: int, worker: Optional[DecisionWorker] = None) -> bool:
+    """Ponovo pošalji neuspjeli posao u red."""
+    worker = worker or get_decision_worker()
+    db = worker.session_factory()
+    try:
+        job = db.get(DecisionJob, request_id)
+        request = db.get(DmsRequest, request_id)
+        if job is None or request is None or job.status != STATUS_FAILED:
+            return False
+        enqueue_decision(db, request, job.officer_name, job.reason)
+        db.commit()
+    finally:
+        db.close()
+    return bool(worker.submit([request_id]))
+
+
+def resume_pending_decisions(worker: Optional[DecisionWorker] = None, now: Optional[datetime] = None) -> int:
+    """Pri pokretanju: queued poslovi i rendering poslovi stariji od
+    DMS_DECISION_TIMEOUT_S (proces koji ih je uzeo je pao) idu ponovo u red.
+
+    Svježi rendering poslovi pripadaju živom procesu i ne diraju se.
+    """
+    worker = worker or get_decision_worker()
+    stale_before = (now or datetime.now()) - timedelta(
+        seconds=_env_int("DMS_DECISION_TIMEOUT_S", DEFAULT_RENDER_TIMEOUT_S)
+    )
+    db = worker.session_factory()
+    try:
+        db.execute(
+            update(DecisionJob)
+            .where(
+                DecisionJob.status == STATUS_RENDERING,
+                or_(DecisionJob.started_at.is_(None), DecisionJob.started_at < stale_before),
+            )
+            .values(status=STATUS_QUEUED)
+        )
+        ids = [
+            request_id
+            for (request_id,) in db.query(DecisionJob.request_id).filter(DecisionJob.status == STATUS_QUEUED)
+        ]
+        db.commit()
+    finally:
+        db.close()
+    if ids:
+        logger.info("Nastavljam generisanje rješenja: %s poslova", len(ids))
+    return len(worker.submit(ids))
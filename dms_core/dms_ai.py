@@ -9,20 +9,42 @@ Hybrid assistant for the DMS portal:
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-import os
 import re
+import threading
 import unicodedata
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
 
 from dms_core import DocumentTemplate
+from dms_core.answer_cache import get_answer_cache, make_cache_key
+from dms_core.keyword_matcher import RequestTypeMatcher
+from dms_core.llm_client import LlmUnavailable, TokenStream, get_llm_client
 
 
 logger = logging.getLogger("dms_portal.ai")
 BASE_DIR = Path(__file__).resolve().parent.parent
+SOURCE_FILES = (
+    BASE_DIR / "database" / "mup_rules.json",
+    BASE_DIR / "requirements_data" / "turizam_requirements.json",
+)
+
+
+def normalize_text(text: str) -> str:
+    """Strip diacritics and punctuation, lowercase and collapse whitespace."""
+    if not text:
+        return ""
+    normalized = unicodedata.normalize("NFKD", text)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    normalized = normalized.lower()
+    normalized = re.sub(r"[^a-z0-9\s_]", " ", normalized)
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    return normalized
 
 
 @dataclass
@@ -41,7 +63,7 @@ class DmsAiAssistant:
 
     def __init__(self, db_session):
         self.db = db_session
-        self.templates = self._load_templates()
+        self.templates, self.matcher, self.knowledge_version = _KNOWLEDGE_CACHE.get(self)
         self.intent_keywords = {
             "required_docs": {"dokument", "dokumenti", "papiri", "sta", "treba", "potrebno"},
             "fee": {
@@ -63,20 +85,14 @@ class DmsAiAssistant:
         }
 
     def _normalize(self, text: str) -> str:
-        if not text:
-            return ""
-        normalized = unicodedata.normalize("NFKD", text)
-        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
-        normalized = normalized.lower()
-        normalized = re.sub(r"[^a-z0-9\s_]", " ", normalized)
-        normalized = re.sub(r"\s+", " ", normalized).strip()
-        return normalized
+        return normalize_text(text)
 
     def _title_from_request_type(self, request_type: str) -> str:
         return request_type.replace("_", " ").title()
 
-    def _load_templates(self) -> Dict[str, TemplateKnowledge]:
-        source_keywords = self._load_source_keywords()
+    def _load_templates(self, source_keywords: Optional[Dict[str, List[str]]] = None) -> Dict[str, TemplateKnowledge]:
+        if source_keywords is None:
+            source_keywords = self._load_source_keywords()
         templates: Dict[str, TemplateKnowledge] = {}
         rows = self.db.query(DocumentTemplate).all()
 
@@ -116,12 +132,8 @@ class DmsAiAssistant:
 
     def _load_source_keywords(self) -> Dict[str, List[str]]:
         source_keywords: Dict[str, List[str]] = {}
-        source_files = [
-            BASE_DIR / "database" / "mup_rules.json",
-            BASE_DIR / "requirements_data" / "turizam_requirements.json",
-        ]
 
-        for source_file in source_files:
+        for source_file in SOURCE_FILES:
             if not source_file.exists():
                 continue
 
@@ -169,27 +181,7 @@ class DmsAiAssistant:
         if not normalized_query:
             return None, 0.0
 
-        query_tokens = set(normalized_query.split())
-        best_match: Optional[str] = None
-        best_score = 0.0
-
-        for request_type, knowledge in self.templates.items():
-            score = 0.0
-            request_name = self._normalize(request_type.replace("_", " "))
-            if request_name and request_name in normalized_query:
-                score += 2.0
-
-            for keyword in knowledge.keywords:
-                if keyword and keyword in normalized_query:
-                    score += min(2.0, 1.0 + len(keyword.split()) * 0.3)
-
-            for token in query_tokens:
-                if token in request_name.split():
-                    score += 0.4
-
-            if score > best_score:
-                best_score = score
-                best_match = request_type
+        best_match, best_score = self.matcher.best_match(normalized_query)
 
         confidence = min(1.0, best_score / 4.0)
         return best_match, confidence
@@ -248,11 +240,9 @@ class DmsAiAssistant:
             if not title_match:
                 continue
 
-            normalized_title = self._normalize(title_match.group(1))
-            for request_type in self.templates:
-                normalized_request_name = self._normalize(request_type.replace("_", " "))
-                if normalized_title == normalized_request_name:
-                    return request_type, 1.0
+            request_type = self.matcher.request_type_for_name(self._normalize(title_match.group(1)))
+            if request_type:
+                return request_type, 1.0
 
         recent_text = []
         for item in chat_history[-6:]:
@@ -362,33 +352,21 @@ class DmsAiAssistant:
         context_text: str,
         chat_history: Optional[List[Dict[str, str]]] = None,
     ) -> Optional[str]:
-        api_key = os.getenv("OPENAI_API_KEY", "").strip()
-        if not api_key:
+        client = get_llm_client()
+        if client is None:
             return None
 
+        messages = self._build_llm_messages(
+            user_query=user_query,
+            intent=intent,
+            request_type=request_type,
+            context_text=context_text,
+            chat_history=chat_history,
+        )
         try:
-            from openai import OpenAI
-
-            model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            client = OpenAI(api_key=api_key)
-            messages = self._build_llm_messages(
-                user_query=user_query,
-                intent=intent,
-                request_type=request_type,
-                context_text=context_text,
-                chat_history=chat_history,
-            )
-
-            completion = client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=0.2,
-            )
-
-            text = completion.choices[0].message.content if completion.choices else ""
-            return (text or "").strip() or None
-        except Exception:
-            logger.exception("LLM response generation failed")
+            return client.complete(messages) or None
+        except LlmUnavailable as exc:
+            logger.warning("LLM unavailable, using rule-based answer: %s", exc)
             return None
 
     def process_user_query(
@@ -404,17 +382,14 @@ class DmsAiAssistant:
         query: str,
         chat_history: Optional[List[Dict[str, str]]] = None,
     ) -> Tuple[str, str]:
-        normalized_query = self._normalize(query)
-        intent = self._detect_intent(normalized_query)
-        request_type, confidence = self._detect_request_type(normalized_query)
+        intent, request_type, confidence, context_text = self._analyze_query(query, chat_history)
 
-        if not request_type or confidence < 0.25:
-            history_request_type, history_confidence = self._infer_request_type_from_history(chat_history)
-            if history_request_type and history_confidence >= 0.25:
-                request_type = history_request_type
-                confidence = max(confidence, history_confidence)
-
-        context_text = self._build_context(request_type)
+        cache_key = None
+        if get_llm_client() is not None:
+            cache_key = self._answer_cache_key(query, intent, request_type)
+            cached = get_answer_cache().get(cache_key)
+            if cached:
+                return cached
 
         llm_answer = self._generate_llm_answer(
             user_query=query,
@@ -424,10 +399,151 @@ class DmsAiAssistant:
             chat_history=chat_history,
         )
         if llm_answer:
+            if cache_key:
+                get_answer_cache().put(cache_key, llm_answer, "llm")
             return llm_answer, "llm"
 
         return self._build_rule_response(intent, request_type, confidence), "fallback"
 
+    def process_user_query_stream(
+        self,
+        query: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+    ) -> Tuple[Iterator[str], str]:
+        """Like `process_user_query_with_source`, but yields the LLM answer as it
+        is generated. Returns once the first token has arrived (or the rule-based
+        fallback has been chosen), so the source is already known."""
+        intent, request_type, confidence, context_text = self._analyze_query(query, chat_history)
+
+        client = get_llm_client()
+        if client is not None:
+            cache_key = self._answer_cache_key(query, intent, request_type)
+            cached = get_answer_cache().get(cache_key)
+            if cached:
+                return iter([cached[0]]), cached[1]
+
+            messages = self._build_llm_messages(
+                user_query=query,
+                intent=intent,
+                request_type=request_type,
+                context_text=context_text,
+                chat_history=chat_history,
+            )
+            try:
+                return _caching_stream(client.stream_chat(messages), cache_key), "llm"
+            except LlmUnavailable as exc:
+                logger.warning("LLM stream unavailable, using rule-based answer: %s", exc)
+
+        return iter([self._build_rule_response(intent, request_type, confidence)]), "fallback"
+
+    def _answer_cache_key(self, query: str, intent: str, request_type: Optional[str]) -> str:
+        return make_cache_key(self._normalize(query), intent, request_type, self.knowledge_version)
+
+    def _analyze_query(
+        self,
+        query: str,
+        chat_history: Optional[List[Dict[str, str]]],
+    ) -> Tuple[str, Optional[str], float, str]:
+        normalized_query = self._normalize(query)
+        intent = self._detect_intent(normalized_query)
+        request_type, confidence = self._detect_request_type(normalized_query)
+
+        if not request_type or confidence < 0.25:
+            history_request_type, history_confidence = self._infer_request_type_from_history(chat_history)
+            if history_request_type and history_confidence >= 0.25:
+                request_type = history_request_type
+                confidence = max(confidence, history_confidence)
+
+        return intent, request_type, confidence, self._build_context(request_type)
+
+
+def _caching_stream(stream: TokenStream, cache_key: str) -> Iterator[str]:
+    """Pass tokens through and cache the full answer if the stream completed."""
+    parts: List[str] = []
+    for token in stream:
+        parts.append(token)
+        yield token
+    if stream.completed:
+        get_answer_cache().put(cache_key, "".join(parts), "llm")
+
+
+class _KnowledgeCache:
+    """Process-wide template knowledge shared by all assistant instances.
+
+    The cache key is a cheap template fingerprint (row count, max id, max
+    timestamps) plus the mtimes of the JSON rule files, so a reseed from
+    another process is picked up on the next message. Within this process
+    `invalidate_knowledge_cache()` drops it explicitly. Cached templates are
+    shared between threads and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple] = None
+        self._templates: Optional[Dict[str, TemplateKnowledge]] = None
+        self._matcher: Optional[RequestTypeMatcher] = None
+        self._version = ""
+        self._source_mtimes: Optional[Tuple] = None
+        self._source_keywords: Optional[Dict[str, List[str]]] = None
+
+    @staticmethod
+    def _source_mtimes_now() -> Tuple:
+        mtimes = []
+        for source_file in SOURCE_FILES:
+            try:
+                mtimes.append(source_file.stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    @staticmethod
+    def _template_version(db_session) -> Tuple:
+        row = db_session.query(
+            func.count(DocumentTemplate.id),
+            func.max(DocumentTemplate.id),
+            func.max(DocumentTemplate.created_at),
+            func.max(DocumentTemplate.updated_at),
+        ).one()
+        return tuple(row)
+
+    def get(self, assistant: "DmsAiAssistant") -> Tuple[Dict[str, TemplateKnowledge], RequestTypeMatcher, str]:
+        source_mtimes = self._source_mtimes_now()
+        key = (self._template_version(assistant.db), source_mtimes)
+
+        with self._lock:
+            if self._key == key and self._templates is not None:
+                return self._templates, self._matcher, self._version
+
+            if self._source_mtimes != source_mtimes or self._source_keywords is None:
+                self._source_keywords = assistant._load_source_keywords()
+                self._source_mtimes = source_mtimes
+
+            self._templates = assistant._load_templates(self._source_keywords)
+            self._matcher = RequestTypeMatcher(
+                {request_type: knowledge.keywords for request_type, knowledge in self._templates.items()},
+                normalize_text,
+            )
+            self._key = key
+            self._version = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+            logger.info("Assistant knowledge loaded (%s templates)", len(self._templates))
+            return self._templates, self._matcher, self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._key = None
+            self._templates = None
+            self._matcher = None
+            self._source_mtimes = None
+            self._source_keywords = None
+
+
+_KNOWLEDGE_CACHE = _KnowledgeCache()
+
+
+def invalidate_knowledge_cache() -> None:
+    """Drop cached template knowledge (call after reseeding templates)."""
+    _KNOWLEDGE_CACHE.invalidate()
+
 
 def enhance_chatbot_with_dms(original_response: str, dms_context: str) -> str:
     if dms_context and len(dms_context) > 10:
@@ -451,3 +567,12 @@ def get_dms_aware_response_with_source(
 ) -> Tuple[str, str]:
     assistant = DmsAiAssistant(db_session)
     return assistant.process_user_query_with_source(user_message, chat_history=chat_history)
+
+
+def get_dms_aware_response_stream(
+    user_message: str,
+    db_session,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+) -> Tuple[Iterator[str], str]:
+    assistant = DmsAiAssistant(db_session)
+    return assistant.process_user_query_stream(user_message, chat_history=chat_history)
@@ -4,9 +4,16 @@ Popunjavanje baze sa šablonima zahtjeva (MUP + Turizam)
 """
 
 import json
-from datetime import datetime
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from dms_core.models import DocumentTemplate, Base, engine
+from dms_core.answer_cache import invalidate_answer_cache
+from dms_core.dms_ai import invalidate_knowledge_cache
+from dms_core.migrations import DMS_COMPONENT, DMS_SCHEMA_VERSION, run_dms_migrations
+from dms_core.models import DocumentTemplate
+
+
+# Verzija DMS šeme prati posljednju migraciju u dms_core.migrations.
+DMS_SCHEMA_COMPONENT = DMS_COMPONENT
 
 
 def _normalize_request_type(value: str) -> str:
@@ -101,39 +108,39 @@ def init_dms_templates(db: Session, mup_rules_path: str, turizam_path: str):
         print(f"  [OK] Turizam: {turizam_data.get('naziv', turizam_type)}")
     
     db.commit()
+    invalidate_knowledge_cache()
+    invalidate_answer_cache()
     print(f"\n[OK] DMS inicijalizacija zavrsena! {db.query(DocumentTemplate).count()} sablona ucitano.")
 
 
-def init_dms_database(db_session: Session):
-    """Kreira sve DMS tabele i primjenjuje lake migracije za nove kolone."""
-    Base.metadata.create_all(engine)
-    _apply_lightweight_migrations(db_session)
-    print("[OK] DMS baza podataka inicijalizirana")
-
-
-def _apply_lightweight_migrations(db_session: Session) -> None:
-    """Primijeni ALTER TABLE za nove kolone (idempotentno)."""
-    from sqlalchemy import text
+def get_dms_schema_version(db_session: Session) -> int:
+    """Vraća zabilježenu verziju DMS šeme (0 ako baza nije inicijalizovana)."""
+    exists = db_session.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+    ).first()
+    if not exists:
+        return 0
+    row = db_session.execute(
+        text("SELECT version FROM schema_version WHERE component = :component"),
+        {"component": DMS_SCHEMA_COMPONENT},
+    ).first()
+    return int(row[0]) if row else 0
 
-    # request_status_history: hash chain
-    _safe_add_column(db_session, "request_status_history", "prev_hash", "VARCHAR")
-    _safe_add_column(db_session, "request_status_history", "entry_hash", "VARCHAR")
 
-    # dms_requests: payment i e-signature meta
-    _safe_add_column(db_session, "dms_requests", "payment_status", "VARCHAR")
-    _safe_add_column(db_session, "dms_requests", "payment_reference", "VARCHAR")
-    _safe_add_column(db_session, "dms_requests", "paid_at", "DATETIME")
-    _safe_add_column(db_session, "dms_requests", "signed_pdf_path", "VARCHAR")
-    _safe_add_column(db_session, "dms_requests", "signature_hash", "VARCHAR")
+def init_dms_database(db_session: Session, force: bool = False) -> bool:
+    """Primjenjuje pending DMS migracije (dms_core.migrations).
 
+    Preskače sve ako je zabilježena verzija šeme aktuelna. Vraća True ako je
+    šema primijenjena.
+    """
+    if not force and get_dms_schema_version(db_session) >= DMS_SCHEMA_VERSION:
+        return False
 
-def _safe_add_column(db_session: Session, table: str, column: str, col_type: str) -> None:
-    from sqlalchemy import text
-    try:
-        db_session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}"))
-        db_session.commit()
-    except Exception:
-        db_session.rollback()  # kolona vjerovatno već postoji
+    # Sesija ne smije držati otvorenu transakciju dok migracije traže write lock
+    db_session.commit()
+    run_dms_migrations(force=True)
+    print("[OK] DMS baza podataka inicijalizirana")
+    return True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+"""Precompiled request-type matcher for the DMS assistant.
+
+Replaces the per-message loop over every template and keyword with:
+- an Aho-Corasick automaton over all keywords and request names, so every
+  substring hit in the query is found in one pass over its characters
+- a token -> template inverted index for the request-name token bonus
+
+Scores are bit-for-bit identical to the original loop: contributions are
+added in the same order (name bonus, keywords in sorted order, token bonus)
+and ties go to the template that comes first in load order.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+NAME_WEIGHT = 2.0
+TOKEN_WEIGHT = 0.4
+
+
+def keyword_weight(keyword: str) -> float:
+    return min(2.0, 1.0 + len(keyword.split()) * 0.3)
+
+
+class AhoCorasick:
+    """Minimal character-level Aho-Corasick automaton."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+
+        for pattern_id, pattern in enumerate(patterns):
+            self.patterns.append(pattern)
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pattern_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> Set[int]:
+        """Ids of all patterns that occur in `text` as substrings."""
+        found: Set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class RequestTypeMatcher:
+    """Scores request types for a normalized query in one automaton pass.
+
+    `templates` maps request_type -> sorted keyword list, in load order.
+    """
+
+    def __init__(self, templates: Dict[str, List[str]], normalize: Callable[[str], str]):
+        self.request_types: List[str] = list(templates)
+        self.request_names: List[str] = [normalize(rt.replace("_", " ")) for rt in self.request_types]
+        self._by_name: Dict[str, str] = {}
+        for request_type, name in zip(self.request_types, self.request_names):
+            self._by_name.setdefault(name, request_type)
+
+        # pattern -> [(template index, keyword position or -1 for the name)]
+        pattern_hits: Dict[str, List[Tuple[int, int]]] = {}
+        self._keyword_weights: List[List[float]] = []
+        for idx, request_type in enumerate(self.request_types):
+            name = self.request_names[idx]
+            if name:
+                pattern_hits.setdefault(name, []).append((idx, -1))
+            weights = []
+            for position, keyword in enumerate(templates[request_type]):
+                weights.append(keyword_weight(keyword) if keyword else 0.0)
+                if keyword:
+                    pattern_hits.setdefault(keyword, []).append((idx, position))
+            self._keyword_weights.append(weights)
+
+        patterns = list(pattern_hits)
+        self._pattern_hits = [pattern_hits[pattern] for pattern in patterns]
+        self._automaton = AhoCorasick(patterns)
+
+        self._token_index: Dict[str, List[int]] = {}
+        for idx, name in enumerate(self.request_names):
+            for token in set(name.split()):
+                self._token_index.setdefault(token, []).append(idx)
+
+    def request_type_for_name(self, normalized_name: str) -> Optional[str]:
+        """First request type whose normalized name equals `normalized_name`."""
+        return self._by_name.get(normalized_name)
+
+    def best_match(self, normalized_query: str) -> Tuple[Optional[str], float]:
+        """Best (request_type, raw score); (None, 0.0) when nothing matches."""
+        if not normalized_query:
+            return None, 0.0
+
+        name_hits: Set[int] = set()
+        keyword_hits: Dict[int, List[int]] = {}
+        for pattern_id in self._automaton.find_all(normalized_query):
+            for idx, position in self._pattern_hits[pattern_id]:
+                if position < 0:
+                    name_hits.add(idx)
+                else:
+                    keyword_hits.setdefault(idx, []).append(position)
+
+        token_hits: Dict[int, int] = {}
+        for token in set(normalized_query.split()):
+            for idx in self._token_index.get(token, ()):
+                token_hits[idx] = token_hits.get(idx, 0) + 1
+
+        best_idx: Optional[int] = None
+        best_score = 0.0
+        for idx in sorted(name_hits | keyword_hits.keys() | token_hits.keys()):
+            score = 0.0
+            if idx in name_hits:
+                score += NAME_WEIGHT
+            weights = self._keyword_weights[idx]
+            for position in sorted(keyword_hits.get(idx, ())):
+                score += weights[position]
+            for _ in range(token_hits.get(idx, 0)):
+                score += TOKEN_WEIGHT
+            if score > best_score:
+                best_score = score
+                best_idx = idx
+
+        if best_idx is None:
+            return None, 0.0
+        return self.request_types[best_idx], best_score
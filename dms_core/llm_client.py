@@ -0,0 +1,274 @@
+"""Shared LLM client for the FAQ assistant.
+
+- one OpenAI client per process (its HTTP connection pool is reused across
+  messages instead of a new client + TLS handshake per call)
+- connect/read timeouts and retries from the environment
+- token streaming (`stream_chat`) so the page renders partial answers
+- a circuit breaker: after repeated failures or slow calls the LLM is skipped
+  for a cool-down period and callers fall back to rule-based answers at once
+
+Streamlit consumes a synchronous generator (`st.write_stream`), so the client
+is synchronous; the time-to-first-token wait is bounded by the read timeout.
+
+Environment:
+  OPENAI_API_KEY, OPENAI_MODEL (gpt-4o-mini), OPENAI_BASE_URL
+  LLM_CONNECT_TIMEOUT_S (3), LLM_READ_TIMEOUT_S (15), LLM_MAX_RETRIES (1)
+  LLM_BREAKER_FAILURES (3), LLM_BREAKER_RESET_S (30), LLM_SLOW_CALL_S (10)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger("dms_portal.ai.llm")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class LlmSettings:
+    api_key: str
+    model: str
+    base_url: Optional[str]
+    connect_timeout_s: float
+    read_timeout_s: float
+    max_retries: int
+    breaker_failures: int
+    breaker_reset_s: float
+    slow_call_s: float
+
+    @classmethod
+    def from_env(cls) -> "LlmSettings":
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY", "").strip(),
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            base_url=os.getenv("OPENAI_BASE_URL", "").strip() or None,
+            connect_timeout_s=_env_float("LLM_CONNECT_TIMEOUT_S", 3.0),
+            read_timeout_s=_env_float("LLM_READ_TIMEOUT_S", 15.0),
+            max_retries=int(_env_float("LLM_MAX_RETRIES", 1)),
+            breaker_failures=max(1, int(_env_float("LLM_BREAKER_FAILURES", 3))),
+            breaker_reset_s=_env_float("LLM_BREAKER_RESET_S", 30.0),
+            slow_call_s=_env_float("LLM_SLOW_CALL_S", 10.0),
+        )
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after reset.
+
+    While open, `allow()` returns False without touching the network. In the
+    half-open state a single trial call is let through; its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+class LlmUnavailable(RuntimeError):
+    """LLM is not configured, the breaker is open, or the call failed."""
+
+
+class LlmClient:
+    """Pooled, breaker-protected chat completion client."""
+
+    def __init__(self, settings: LlmSettings):
+        from openai import OpenAI, Timeout
+
+        self.settings = settings
+        self.breaker = CircuitBreaker(settings.breaker_failures, settings.breaker_reset_s)
+        timeout = Timeout(
+            settings.read_timeout_s,
+            connect=settings.connect_timeout_s,
+            read=settings.read_timeout_s,
+        )
+        kwargs = {"api_key": settings.api_key, "timeout": timeout, "max_retries": settings.max_retries}
+        if settings.base_url:
+            kwargs["base_url"] = settings.base_url
+        self._client = OpenAI(**kwargs)
+
+    def _finish(self, started: float) -> None:
+        """Record the call outcome; a successful but slow call counts as a failure."""
+        elapsed = time.monotonic() - started
+        if self.settings.slow_call_s and elapsed > self.settings.slow_call_s:
+            logger.warning("LLM call slow (%.1fs), counting as breaker failure", elapsed)
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def complete(self, messages: List[Dict[str, str]], temperature: float = 0.2) -> str:
+        if not self.breaker.allow():
+            raise LlmUnavailable("circuit open")
+
+        started = time.monotonic()
+        try:
+            completion = self._client.chat.completions.create(
+                model=self.settings.model,
+                messages=messages,
+                temperature=temperature,
+            )
+        except Exception as exc:
+            self.breaker.record_failure()
+            raise LlmUnavailable(str(exc)) from exc
+
+        self._finish(started)
+        text = completion.choices[0].message.content if completion.choices else ""
+        return (text or "").strip()
+
+    def stream_chat(self, messages: List[Dict[str, str]], temperature: float = 0.2) -> "TokenStream":
+        """Stream answer tokens.
+
+        The request is sent and the first non-empty token is awaited before this
+        returns, so an unavailable endpoint raises `LlmUnavailable` here and the
+        caller can still fall back. A failure after the first token ends the
+        stream early (the partial answer stays visible) and counts against the
+        breaker.
+        """
+        if not self.breaker.allow():
+            raise LlmUnavailable("circuit open")
+
+        started = time.monotonic()
+        try:
+            stream = self._client.chat.completions.create(
+                model=self.settings.model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+            )
+            chunks = self._iter_text(stream)
+            first = next(chunks, None)
+        except Exception as exc:
+            self.breaker.record_failure()
+            raise LlmUnavailable(str(exc)) from exc
+
+        if not first:
+            self.breaker.record_failure()
+            raise LlmUnavailable("empty completion")
+
+        # For streams the breaker judges time-to-first-token, not answer length
+        self._finish(started)
+        return TokenStream(first, chunks, self.breaker)
+
+    @staticmethod
+    def _iter_text(stream) -> Iterator[str]:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+
+class TokenStream:
+    """Iterator over answer tokens; `completed` is True once the stream ended
+    normally. A failure mid-stream ends iteration early (the partial answer
+    stays visible) and counts against the breaker."""
+
+    def __init__(self, first: str, chunks: Iterator[str], breaker: CircuitBreaker):
+        self._pending: Optional[str] = first
+        self._chunks = chunks
+        self._breaker = breaker
+        self.completed = False
+
+    def __iter__(self) -> "TokenStream":
+        return self
+
+    def __next__(self) -> str:
+        if self._pending is not None:
+            token, self._pending = self._pending, None
+            return token
+        if self._chunks is None:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.completed = True
+            self._chunks = None
+            raise
+        except Exception:
+            logger.exception("LLM stream interrupted")
+            self._breaker.record_failure()
+            self._chunks = None
+            raise StopIteration
+
+
+_CLIENT_LOCK = threading.Lock()
+_CLIENT: Optional[LlmClient] = None
+
+
+def get_llm_client() -> Optional[LlmClient]:
+    """Process-wide client; None when OPENAI_API_KEY is not set.
+
+    The client is rebuilt only when the environment settings change.
+    """
+    global _CLIENT
+    settings = LlmSettings.from_env()
+    if not settings.api_key:
+        return None
+
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT.settings != settings:
+            try:
+                _CLIENT = LlmClient(settings)
+            except Exception:
+                logger.exception("LLM client initialization failed")
+                return None
+        return _CLIENT
+
+
+def reset_llm_client() -> None:
+    """Drop the shared client (tests, settings reload)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        _CLIENT = None
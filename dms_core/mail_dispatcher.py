@@ -0,0 +1,382 @@
+"""Outbox za e-mail notifikacije + pozadinski dispatcher.
+
+`notify()` samo upiše red u `email_outbox` u istoj transakciji kao in-app
+notifikaciju; promjena statusa više ne čeka SMTP. Dispatcher thread:
+  - preuzima dospjele redove u serijama (lease, pa isti red ne šalju dva procesa)
+  - šalje ih preko jedne SMTP sesije koja ostaje otvorena između serija
+    (zatvara se nakon SMTP_IDLE_CLOSE_S bez posla)
+  - neuspjelo slanje ponavlja sa eksponencijalnim backoff-om; nakon
+    MAIL_MAX_ATTEMPTS pokušaja red prelazi u status 'dead' (dead-letter)
+
+Podešavanja preko env varijabli:
+  SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM
+  SMTP_STARTTLS (1), SMTP_TIMEOUT_S (8), SMTP_IDLE_CLOSE_S (60)
+  MAIL_BATCH_SIZE (50), MAIL_MAX_ATTEMPTS (6), MAIL_BACKOFF_BASE_S (30),
+  MAIL_POLL_INTERVAL_S (15)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import smtplib
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database.database import get_pool
+from database.pool import ConnectionPool
+
+
+logger = logging.getLogger("dms_portal.notifications.mail")
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+MAX_BACKOFF_S = 6 * 3600
+LEASE_S = 300
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class SmtpSettings:
+    host: str
+    port: int
+    user: str
+    password: str
+    sender: str
+    starttls: bool
+    timeout_s: float
+    idle_close_s: float
+
+    @classmethod
+    def from_env(cls) -> "SmtpSettings":
+        user = os.getenv("SMTP_USER", "")
+        try:
+            port = int(os.getenv("SMTP_PORT", "0"))
+        except ValueError:
+            port = 0
+        return cls(
+            host=os.getenv("SMTP_HOST", ""),
+            port=port,
+            user=user,
+            password=os.getenv("SMTP_PASSWORD", ""),
+            sender=os.getenv("SMTP_FROM", user),
+            starttls=os.getenv("SMTP_STARTTLS", "1").strip().lower() not in {"0", "false", "no"},
+            timeout_s=_env_float("SMTP_TIMEOUT_S", 8.0),
+            idle_close_s=_env_float("SMTP_IDLE_CLOSE_S", 60.0),
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host and self.port and self.sender)
+
+
+def enqueue_email(
+    conn,
+    to_email: str,
+    subject: str,
+    body: str,
+    notification_id: Optional[int] = None,
+    now: Optional[float] = None,
+) -> Optional[int]:
+    """Upiše e-mail u outbox bez commit-a (commit radi pozivalac).
+
+    Vraća id reda; None ako SMTP nije konfigurisan ili adresa nedostaje.
+    """
+    if not to_email or not SmtpSettings.from_env().configured:
+        return None
+    cur = conn.execute(
+        "INSERT INTO email_outbox (notification_id, to_email, subject, body, status, next_attempt_at, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            notification_id,
+            to_email,
+            subject,
+            body or "",
+            STATUS_PENDING,
+            time.time() if now is None else now,
+            datetime.now().isoformat(),
+        ),
+    )
+    return cur.lastrowid
+
+
+def enqueue_emails(conn, messages: List[Tuple[str, str, str, Optional[int]]]) -> int:
+    """Grupni upis u outbox (executemany, bez commit-a).
+
+    `messages` su (to_email, subject, body, notification_id); redovi bez
+    adrese se preskaču. Vraća broj upisanih redova.
+    """
+    rows = [message for message in messages if message[0]]
+    if not rows or not SmtpSettings.from_env().configured:
+        return 0
+    now = time.time()
+    created_at = datetime.now().isoformat()
+    conn.executemany(
+        "INSERT INTO email_outbox (notification_id, to_email, subject, body, status, next_attempt_at, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (notification_id, to_email, subject, body or "", STATUS_PENDING, now, created_at)
+            for to_email, subject, body, notification_id in rows
+        ],
+    )
+    return len(rows)
+
+
+class MailDispatcher:
+    """Šalje outbox u serijama preko jedne (ponovo korištene) SMTP sesije."""
+
+    def __init__(
+        self,
+        settings: Optional[SmtpSettings] = None,
+        pool: Optional[ConnectionPool] = None,
+        smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        backoff_base_s: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.settings = settings or SmtpSettings.from_env()
+        self.pool = pool or get_pool()
+        self.smtp_factory = smtp_factory
+        self.batch_size = batch_size or max(1, int(_env_float("MAIL_BATCH_SIZE", 50)))
+        self.max_attempts = max_attempts or max(1, int(_env_float("MAIL_MAX_ATTEMPTS", 6)))
+        self.backoff_base_s = (
+            backoff_base_s if backoff_base_s is not None else _env_float("MAIL_BACKOFF_BASE_S", 30.0)
+        )
+        self.poll_interval_s = _env_float("MAIL_POLL_INTERVAL_S", 15.0)
+        self._clock = clock
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- SMTP sesija -----------------------------------------------------
+
+    def _session(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except Exception:
+                self._close_session()
+
+        s = self.settings
+        smtp = self.smtp_factory(s.host, s.port, timeout=s.timeout_s)
+        try:
+            if s.starttls:
+                smtp.starttls()
+            if s.user:
+                smtp.login(s.user, s.password)
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+            raise
+        self._smtp = smtp
+        return smtp
+
+    def _close_session(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _build_message(self, to_email: str, subject: str, body: str) -> str:
+        msg = MIMEText(body or "", "plain", "utf-8")
+        msg["Subject"] = subject
+        msg["From"] = self.settings.sender
+        msg["To"] = to_email
+        return msg.as_string()
+
+    # --- outbox ----------------------------------------------------------
+
+    def _claim(self, conn) -> List[Tuple]:
+        now = self._clock()
+        token = uuid.uuid4().hex
+        with conn:
+            conn.execute(
+                """
+                UPDATE email_outbox SET lease_token = ?, lease_until = ?
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE status = ? AND next_attempt_at <= ?
+                      AND (lease_until IS NULL OR lease_until < ?)
+                    ORDER BY id
+                    LIMIT ?
+                )
+                """,
+                (token, now + LEASE_S, STATUS_PENDING, now, now, self.batch_size),
+            )
+        return conn.execute(
+            "SELECT id, to_email, subject, body, attempts FROM email_outbox "
+            "WHERE lease_token = ? ORDER BY id",
+            (token,),
+        ).fetchall()
+
+    def _backoff(self, attempts: int) -> float:
+        return min(MAX_BACKOFF_S, self.backoff_base_s * (2 ** (attempts - 1)))
+
+    def dispatch_once(self) -> Dict[str, int]:
+        """Pošalje jednu seriju dospjelih poruka; vraća brojače ishoda."""
+        result = {"sent": 0, "retried": 0, "dead": 0}
+        conn = self.pool.acquire()
+        try:
+            rows = self._claim(conn)
+            if not rows:
+                if self._smtp is not None and self._clock() - self._last_used > self.settings.idle_close_s:
+                    self._close_session()
+                return result
+
+            sent: List[int] = []
+            failed: List[Tuple[Tuple, str]] = []
+            smtp = None
+            session_error: Optional[str] = None
+            try:
+                smtp = self._session()
+            except Exception as exc:
+                logger.warning("SMTP konekcija neuspjela: %s", exc)
+                session_error = str(exc) or exc.__class__.__name__
+
+            for row in rows:
+                outbox_id, to_email, subject, body, _ = row
+                if smtp is None:
+                    failed.append((row, session_error or "SMTP nedostupan"))
+                    continue
+                try:
+                    smtp.sendmail(self.settings.sender, [to_email], self._build_message(to_email, subject, body))
+                    sent.append(outbox_id)
+                except (smtplib.SMTPServerDisconnected, OSError) as exc:
+                    # Sesija je pukla — ostatak serije ide u ponovni pokušaj
+                    logger.warning("SMTP sesija prekinuta: %s", exc)
+                    self._smtp = None
+                    smtp = None
+                    session_error = str(exc) or exc.__class__.__name__
+                    failed.append((row, session_error))
+                except Exception as exc:
+                    failed.append((row, str(exc) or exc.__class__.__name__))
+            self._last_used = self._clock()
+
+            now = self._clock()
+            sent_at = datetime.now().isoformat()
+            retry_rows, dead_rows = [], []
+            for (outbox_id, to_email, _, _, attempts), error in failed:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    dead_rows.append((STATUS_DEAD, attempts, error[:500], outbox_id))
+                    logger.error("E-mail prebačen u dead-letter id=%s to=%s: %s", outbox_id, to_email, error)
+                else:
+                    retry_rows.append((attempts, now + self._backoff(attempts), error[:500], outbox_id))
+            with conn:
+                conn.executemany(
+                    "UPDATE email_outbox SET status = ?, sent_at = ?, attempts = attempts + 1, "
+                    "lease_token = NULL, lease_until = NULL, last_error = NULL WHERE id = ?",
+                    [(STATUS_SENT, sent_at, outbox_id) for outbox_id in sent],
+                )
+                conn.executemany(
+                    "UPDATE email_outbox SET attempts = ?, next_attempt_at = ?, last_error = ?, "
+                    "lease_token = NULL, lease_until = NULL WHERE id = ?",
+                    retry_rows,
+                )
+                conn.executemany(
+                    "UPDATE email_outbox SET status = ?, attempts = ?, last_error = ?, "
+                    "lease_token = NULL, lease_until = NULL WHERE id = ?",
+                    dead_rows,
+                )
+            result.update(sent=len(sent), retried=len(retry_rows), dead=len(dead_rows))
+            if sent:
+                logger.info("E-mail serija poslana: %s poruka", len(sent))
+            return result
+        finally:
+            conn.close()
+
+    def drain(self) -> Dict[str, int]:
+        """Šalje serije dok ima dospjelih poruka."""
+        total = {"sent": 0, "retried": 0, "dead": 0}
+        while True:
+            result = self.dispatch_once()
+            for key, value in result.items():
+                total[key] += value
+            if not any(result.values()):
+                return total
+
+    # --- pozadinski thread -----------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("Mail dispatcher greška")
+            self._wake.wait(self.poll_interval_s)
+            self._wake.clear()
+        self._close_session()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_DISPATCHER_LOCK = threading.Lock()
+_DISPATCHER: Optional[MailDispatcher] = None
+
+
+def start_dispatcher() -> Optional[MailDispatcher]:
+    """Pokreće procesni dispatcher (idempotentno); None ako SMTP nije konfigurisan."""
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            settings = SmtpSettings.from_env()
+            if not settings.configured:
+                return None
+            _DISPATCHER = MailDispatcher(settings)
+        _DISPATCHER.start()
+        return _DISPATCHER
+
+
+def wake_dispatcher() -> None:
+    """Probudi dispatcher odmah nakon upisa u outbox (bez čekanja poll intervala)."""
+    dispatcher = _DISPATCHER
+    if dispatcher is not None:
+        dispatcher.wake()
+
+
+def stop_dispatcher() -> None:
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        dispatcher, _DISPATCHER = _DISPATCHER, None
+    if dispatcher is not None:
+        dispatcher.stop()
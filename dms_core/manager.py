@@ -4,17 +4,40 @@ Upravljanje zahtjevima kroz kompletan workflow
 """
 
 import hashlib
+import heapq
 import logging
 from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
+from sqlalchemy import DateTime, Integer, and_, case, cast, func, insert, literal, or_, select, update
 from dms_core.models import (
     DmsRequest, RequestType, RequestStatus, RequestPriority,
-    DocumentTemplate, RequestStatusHistory, RequestComment, TourismProperty
+    DocumentTemplate, KpiRequestState, RequestDocument, RequestStatusHistory, RequestComment,
+    SlaEscalationLog, TourismProperty
 )
 from municipality_utils import validate_municipality
-from database.database import get_staff_usernames
-from dms_core.notifications import notify
-from dms_core.signature import generate_signed_decision
+from database.database import save_request_submissions
+from dms_core.notifications import notify, notify_many
+from dms_core.rollups import apply_rollup_batch, record_request_change
+from dms_core.assignment import get_balancer
+from dms_core.decision_jobs import enqueue_decision, get_decision_worker
+
+
+_MS_PER_DAY = 86_400_000
+
+
+def _floor_days_between(start, end):
+    """SQL izraz za `(end - start).days` — cijeli dani zaokruženi naniže.
+
+    julianday razlika se prvo svodi na cijele milisekunde (preciznost SQLite
+    datuma), pa se floor ne kvari greškom zaokruživanja double vrijednosti.
+    """
+    ms = cast(func.round((func.julianday(end) - func.julianday(start)) * _MS_PER_DAY), Integer)
+    return case(
+        (ms >= 0, ms // _MS_PER_DAY),
+        else_=-((-ms + _MS_PER_DAY - 1) // _MS_PER_DAY),
+    )
 
 
 _STATUS_LABELS_HR = {
@@ -50,6 +73,25 @@ _TOURISM_TYPES = {
     RequestType.TURIZAM_DOZVOLA_GRADNJE,
 }
 
+ACTIVE_STATUSES = [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER]
+
+# Prioritetni inbox
+PENDING_USER_LONG_DAYS = 3
+SLA_URGENT_LATE_DAYS = 7  # kasni ovoliko dana ili više → URGENT, inače HIGH
+_PRIORITY_WEIGHTS = {
+    RequestPriority.URGENT: 3,
+    RequestPriority.HIGH: 2,
+    RequestPriority.MEDIUM: 1,
+    RequestPriority.LOW: 0,
+}
+
+# Ključ sortiranja reda → (kolona, opadajuće); id je uvijek drugi ključ.
+QUEUE_SORTS = {
+    "oldest": (DmsRequest.created_at, False),
+    "newest": (DmsRequest.created_at, True),
+    "deadline": (DmsRequest.estimated_completion, False),
+}
+
 
 class DmsManager:
     """Upravljanje Dokumentima i Zahtjevima"""
@@ -57,6 +99,8 @@ class DmsManager:
     def __init__(self, db_session):
         self.db = db_session
         self.logger = logging.getLogger("dms_portal.dms_manager")
+        # None = procesni worker (get_decision_worker); testovi mogu podmetnuti svoj
+        self.decision_worker = None
 
     def _get_request(self, request_id: int) -> Optional[DmsRequest]:
         return self.db.get(DmsRequest, request_id)
@@ -74,7 +118,24 @@ class DmsManager:
         reason: str = None
     ) -> DmsRequest:
         """Kreiraj novi zahtjev"""
+        request = self._build_request(
+            request_type, user_id, user_email, user_city, details, description, reason
+        )
+        self.db.commit()
+        return request
 
+    def _build_request(
+        self,
+        request_type: RequestType,
+        user_id: str,
+        user_email: str,
+        user_city: str,
+        details: Optional[Dict],
+        description: Optional[str],
+        reason: Optional[str],
+        rollup_batch: Optional[Dict] = None,
+    ) -> DmsRequest:
+        """Novi DRAFT zahtjev + rollup, bez commit-a."""
         if user_city and not validate_municipality(user_city):
             raise ValueError("Nevalidna opština za korisnika.")
         
@@ -106,8 +167,86 @@ class DmsManager:
         )
         
         self.db.add(request)
-        self.db.commit()
-        
+        self.db.flush()
+        record_request_change(self.db, request, batch=rollup_batch)
+        return request
+
+    def submit_full_request(
+        self,
+        request_type: RequestType,
+        user_id: str,
+        user_email: str,
+        user_city: str,
+        details: Dict = None,
+        description: str = None,
+        reason: str = None,
+        documents: Optional[List[Dict]] = None,
+        comment: Optional[str] = None,
+    ) -> DmsRequest:
+        """Kreiranje, podnošenje, auto-dodjela, dokumenta i komentar u jednoj transakciji.
+
+        Ako bilo šta pukne, rollback ne ostavlja DRAFT bez podnošenja. Posle
+        commit-a idu notifikacija i zapis u `request_submissions` (glavna baza).
+        """
+        rollup_batch: Dict = {}
+        try:
+            request = self._build_request(
+                request_type, user_id, user_email, user_city, details, description, reason,
+                rollup_batch=rollup_batch,
+            )
+            request.submitted_at = datetime.now()
+            history = self._apply_status_change(
+                request,
+                RequestStatus.SUBMITTED,
+                changed_by=user_id,
+                reason="Korisnik je podnio zahtjev",
+                prev_hash="",
+                rollup_batch=rollup_batch,
+            )
+
+            assignment = self._pick_officer(request.request_type, submitted_by=user_id)
+            review_reason = None
+            if assignment:
+                officer, active = assignment
+                request.assigned_to = officer
+                review_reason = f"Automatski dodijeljeno službeniku {officer} (aktivnih predmeta: {active})"
+                self._apply_status_change(
+                    request,
+                    RequestStatus.UNDER_REVIEW,
+                    changed_by="sistem",
+                    reason=review_reason,
+                    prev_hash=history.entry_hash,
+                    rollup_batch=rollup_batch,
+                )
+
+            if documents:
+                self.add_documents(request.id, documents, commit=False)
+            if comment:
+                self.db.add(
+                    RequestComment(request_id=request.id, author=user_id, content=comment, author_type="user")
+                )
+
+            apply_rollup_batch(self.db, rollup_batch)
+            self.refresh_inbox_scores([request.id], commit=False)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if assignment:
+            get_balancer(self.db).record_assignment(assignment[0])
+        self.logger.info(
+            "Request submitted request_id=%s status=%s assigned_to=%s",
+            request.id, request.status.value, request.assigned_to,
+        )
+        if assignment:
+            self._notify_status_change(request, RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, review_reason)
+        try:
+            save_request_submissions(
+                [(request.id, user_id, request.request_type.value, request.status.value)]
+            )
+        except Exception:
+            self.logger.exception("Audit mirror upis neuspio request_id=%s", request.id)
         return request
     
     # ============= WORKFLOW STATUS =============
@@ -131,49 +270,40 @@ class DmsManager:
 
         return success
 
-    def _auto_assign(self, request_id: int, submitted_by: str = None) -> bool:
-        """Pronađi najmanje opterećenog službenika i prebaci zahtjev u UNDER_REVIEW."""
+    def _pick_officer(self, request_type: RequestType, submitted_by: str = None) -> Optional[Tuple[str, int]]:
+        """Najmanje opterećen službenik sa slobodnim kapacitetom: (username, aktivnih) ili None."""
         try:
-            staff = get_staff_usernames()
+            return get_balancer(self.db).pick(self.db, request_type, exclude=submitted_by)
         except Exception:
-            self.logger.warning("Auto-assign: nije moguće učitati listu službenika")
-            return False
-
-        if not staff:
-            self.logger.info("Auto-assign: nema registrovanih službenika, request_id=%s ostaje SUBMITTED", request_id)
-            return False
-
-        active_statuses = [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER]
-
-        # Izbjegni dodjelu istom korisniku koji je podnio (npr. admin demo)
-        candidates = [o for o in staff if o != submitted_by] or list(staff)
-
-        workload = {}
-        for officer in candidates:
-            workload[officer] = self.db.query(DmsRequest).filter(
-                DmsRequest.assigned_to == officer,
-                DmsRequest.status.in_(active_statuses),
-            ).count()
-
-        assigned_to = min(workload, key=workload.get)
+            self.logger.warning("Auto-assign: nije moguće učitati listu službenika", exc_info=True)
+            return None
 
+    def _auto_assign(self, request_id: int, submitted_by: str = None) -> bool:
+        """Pronađi najmanje opterećenog službenika i prebaci zahtjev u UNDER_REVIEW."""
         request = self._get_request(request_id)
         if not request:
             return False
 
+        assignment = self._pick_officer(request.request_type, submitted_by)
+        if not assignment:
+            self.logger.info("Auto-assign: nema slobodnog službenika, request_id=%s ostaje SUBMITTED", request_id)
+            return False
+        assigned_to, active = assignment
+
         request.assigned_to = assigned_to
         self.db.commit()
+        get_balancer(self.db).record_assignment(assigned_to)
 
         self._change_status(
             request_id,
             RequestStatus.UNDER_REVIEW,
             changed_by="sistem",
-            reason=f"Automatski dodijeljeno službeniku {assigned_to} (aktivnih predmeta: {workload[assigned_to]})",
+            reason=f"Automatski dodijeljeno službeniku {assigned_to} (aktivnih predmeta: {active})",
         )
 
         self.logger.info(
             "Auto-assign: request_id=%s → officer=%s (active=%s)",
-            request_id, assigned_to, workload[assigned_to],
+            request_id, assigned_to, active,
         )
         return True
     
@@ -283,12 +413,49 @@ class DmsManager:
         if not request:
             return False
 
+        old_status = request.status
+        history = self._apply_status_change(request, new_status, changed_by, reason)
+        if history is None:
+            return True
+
+        self.refresh_inbox_scores([request.id], commit=False)
+        self.db.commit()
+        self.logger.info(
+            "Status change request_id=%s from=%s to=%s by=%s",
+            request_id,
+            old_status.value,
+            new_status.value,
+            changed_by,
+        )
+
+        # Pošalji notifikaciju korisniku ako je promjena javna
+        if changed_by != request.user_id:
+            self._notify_status_change(request, old_status, new_status, reason)
+
+        return True
+
+    def _apply_status_change(
+        self,
+        request: DmsRequest,
+        new_status: RequestStatus,
+        changed_by: str,
+        reason: Optional[str],
+        prev_hash: Optional[str] = None,
+        rollup_batch: Optional[Dict] = None,
+    ) -> Optional[RequestStatusHistory]:
+        """Promjena statusa + red istorije + rollup, bez commit-a.
+
+        Validacija se radi prije bilo kakve izmjene. `prev_hash` je hash zadnjeg
+        reda istorije ako ga pozivalac već zna (bulk); inače se čita iz baze.
+        `rollup_batch` odlaže upis rollup razlika (vidi `apply_rollup_batch`).
+        Vraća novi red istorije ili None ako je status već `new_status`.
+        """
         if not changed_by:
             raise ValueError("Promjena statusa zahtijeva korisnicki identitet.")
-        
+
         old_status = request.status
         if old_status == new_status:
-            return True
+            return None
 
         if not self._is_transition_allowed(old_status, new_status):
             raise ValueError(f"Nedozvoljena tranzicija: {old_status.value} -> {new_status.value}")
@@ -297,17 +464,18 @@ class DmsManager:
         request.updated_at = datetime.now()
 
         # Hash chain: nadovezi se na zadnji red u istoriji
-        last_entry = (
-            self.db.query(RequestStatusHistory)
-            .filter(RequestStatusHistory.request_id == request_id)
-            .order_by(RequestStatusHistory.id.desc())
-            .first()
-        )
-        prev_hash = last_entry.entry_hash if last_entry and last_entry.entry_hash else ""
+        if prev_hash is None:
+            last_entry = (
+                self.db.query(RequestStatusHistory)
+                .filter(RequestStatusHistory.request_id == request.id)
+                .order_by(RequestStatusHistory.id.desc())
+                .first()
+            )
+            prev_hash = last_entry.entry_hash if last_entry and last_entry.entry_hash else ""
         changed_at = datetime.now()
         entry_hash = _hash_history_entry(
             prev_hash=prev_hash,
-            request_id=request_id,
+            request_id=request.id,
             from_status=old_status.value if old_status else "",
             to_status=new_status.value,
             changed_by=changed_by,
@@ -316,7 +484,7 @@ class DmsManager:
         )
 
         history = RequestStatusHistory(
-            request_id=request_id,
+            request_id=request.id,
             from_status=old_status,
             to_status=new_status,
             changed_by=changed_by,
@@ -327,30 +495,33 @@ class DmsManager:
         )
 
         self.db.add(history)
-        self.db.commit()
-        self.logger.info(
-            "Status change request_id=%s from=%s to=%s by=%s",
-            request_id,
-            old_status.value,
-            new_status.value,
-            changed_by,
+        record_request_change(self.db, request, history, batch=rollup_batch)
+        return history
+
+    def _last_history_hashes(self, request_ids: List[int]) -> Dict[int, str]:
+        """Hash zadnjeg reda istorije za više zahtjeva jednim upitom."""
+        if not request_ids:
+            return {}
+        last_ids = (
+            self.db.query(func.max(RequestStatusHistory.id))
+            .filter(RequestStatusHistory.request_id.in_(request_ids))
+            .group_by(RequestStatusHistory.request_id)
         )
+        rows = (
+            self.db.query(RequestStatusHistory.request_id, RequestStatusHistory.entry_hash)
+            .filter(RequestStatusHistory.id.in_(last_ids))
+            .all()
+        )
+        return {request_id: entry_hash or "" for request_id, entry_hash in rows}
 
-        # Pošalji notifikaciju korisniku ako je promjena javna
-        if changed_by != request.user_id:
-            self._notify_status_change(request, old_status, new_status, reason)
-
-        return True
-
-    def _notify_status_change(
+    def _status_notification(
         self,
         request: DmsRequest,
         old_status: RequestStatus,
         new_status: RequestStatus,
         reason: Optional[str],
-    ) -> None:
+    ) -> Dict:
         new_label = _STATUS_LABELS_HR.get(new_status, new_status.value)
-        title = f"Zahtjev #{request.id}: novi status — {new_label}"
         body_lines = [
             f"Tip zahtjeva: {request.request_type.value}",
             f"Prethodni status: {_STATUS_LABELS_HR.get(old_status, old_status.value)}",
@@ -358,14 +529,23 @@ class DmsManager:
         ]
         if reason:
             body_lines.append(f"Napomena: {reason}")
+        return {
+            "username": request.user_id,
+            "title": f"Zahtjev #{request.id}: novi status — {new_label}",
+            "body": "\n".join(body_lines),
+            "request_id": request.id,
+            "email": request.user_email,
+        }
+
+    def _notify_status_change(
+        self,
+        request: DmsRequest,
+        old_status: RequestStatus,
+        new_status: RequestStatus,
+        reason: Optional[str],
+    ) -> None:
         try:
-            notify(
-                username=request.user_id,
-                title=title,
-                body="\n".join(body_lines),
-                request_id=request.id,
-                email=request.user_email,
-            )
+            notify(**self._status_notification(request, old_status, new_status, reason))
         except Exception:
             self.logger.exception("Notifikacija nije poslana request_id=%s", request.id)
 
@@ -416,61 +596,55 @@ class DmsManager:
             if not allowed_user_transition:
                 raise PermissionError("Nemate dozvolu za ovu promjenu statusa.")
 
-        result = self._change_status(
+        if new_status == RequestStatus.APPROVED:
+            return self._approve_with_decision(request, changed_by, reason)
+
+        return self._change_status(
             request_id=request_id,
             new_status=new_status,
             changed_by=changed_by,
             reason=reason,
         )
 
-        if result and new_status == RequestStatus.APPROVED:
-            req = self._get_request(request_id)
-            if req:
-                self._finalize_tourism_registration(req)
-                self._generate_decision_document(req, officer_name=changed_by, reason=reason)
-
-        return result
+    def _approve_with_decision(self, request: DmsRequest, changed_by: str, reason: Optional[str]) -> bool:
+        """APPROVED + turistička nekretnina + posao rješenja u JEDNOJ transakciji.
 
-    def _generate_decision_document(
-        self,
-        request: DmsRequest,
-        officer_name: str,
-        reason: Optional[str],
-    ) -> None:
-        """Pri odobravanju zahtjeva generiši potpisano rješenje i zabilježi hash."""
+        Odobren predmet bez `decision_jobs` reda ne bi nikad dobio rješenje
+        (`resume_pending_decisions` nastavlja samo postojeće poslove).
+        """
+        old_status = request.status
+        rollup_batch: Dict = {}
         try:
-            request_type_label = request.request_type.value.replace("_", " ").title()
-            decision_lines = [
-                f"Zahtjev za uslugu '{request_type_label}' je odobren.",
-            ]
-            if reason:
-                decision_lines.append(f"Obrazloženje: {reason}")
-            if request.request_type in _TOURISM_TYPES:
-                decision_lines.append(
-                    "Korisnik je ovlašćen da otpočne sa pružanjem usluge u skladu sa registracijom."
-                )
-            else:
-                decision_lines.append(
-                    "Za preuzimanje fizičkog dokumenta očekujte instrukcije u sekciji 'Moji zahtjevi'."
-                )
-
-            file_path, sig_hash = generate_signed_decision(
-                request_id=request.id,
-                request_type=request_type_label,
-                citizen_name=request.user_id,
-                officer_name=officer_name or "Sistem",
-                decision_text="\n".join(decision_lines),
+            history = self._apply_status_change(
+                request, RequestStatus.APPROVED, changed_by, reason, rollup_batch=rollup_batch
             )
-
-            request.signed_pdf_path = file_path
-            request.signature_hash = sig_hash
+            if history is None:
+                return True
+            self._finalize_tourism_registration(request, commit=False)
+            enqueue_decision(self.db, request, officer_name=changed_by, reason=reason)
+            apply_rollup_batch(self.db, rollup_batch)
+            self.refresh_inbox_scores([request.id], commit=False)
             self.db.commit()
-            self.logger.info(
-                "Decision document generated request_id=%s path=%s hash=%s",
-                request.id, file_path, sig_hash[:16],
-            )
         except Exception:
-            self.logger.exception("Generisanje rješenja neuspjelo request_id=%s", request.id)
+            self.db.rollback()
+            raise
+
+        self.logger.info(
+            "Status change request_id=%s from=%s to=%s by=%s",
+            request.id, old_status.value, RequestStatus.APPROVED.value, changed_by,
+        )
+        if changed_by != request.user_id:
+            self._notify_status_change(request, old_status, RequestStatus.APPROVED, reason)
+        self._submit_decisions([request.id])
+        return True
+
+    def _submit_decisions(self, request_ids: List[int]) -> None:
+        """Pošalji već commit-ovane poslove rješenja na render (van klika)."""
+        try:
+            worker = self.decision_worker or get_decision_worker()
+            worker.submit(request_ids)
+        except Exception:
+            self.logger.exception("Slanje rješenja na render neuspjelo request_ids=%s", request_ids)
 
     # ============= PLAĆANJE =============
 
@@ -525,24 +699,82 @@ class DmsManager:
 
     # ============= DOKUMENTA =============
     
-    def upload_document(self, request_id: int, doc_name: str, file_path: str) -> bool:
-        """Učitaj dokument na zahtjev"""
+    def upload_document(
+        self,
+        request_id: int,
+        doc_name: str,
+        file_path: str,
+        sha256: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> bool:
+        """Učitaj dokument na zahtjev (hash i veličina dolaze iz `ingest_upload`)"""
+        return self.add_documents(
+            request_id, [{"name": doc_name, "path": file_path, "sha256": sha256, "size": size}]
+        ) > 0
+
+    def add_documents(self, request_id: int, documents: List[Dict], commit: bool = True) -> int:
+        """Grupni upis dokumenata (višefajlni upload) — jedan INSERT batch po pozivu."""
         request = self._get_request(request_id)
-        if not request:
-            return False
-        
-        current_docs = list(request.documents_metadata or [])
-        current_docs.append({
-            "name": doc_name,
-            "file_path": file_path,
-            "uploaded_at": datetime.now().isoformat(),
-            "status": "pending_review"
-        })
-        request.documents_metadata = current_docs
-        request.updated_at = datetime.now()
-        
-        self.db.commit()
-        return True
+        if not request or not documents:
+            return 0
+
+        now = datetime.now()
+        self.db.execute(
+            insert(RequestDocument),
+            [
+                {
+                    "request_id": request_id,
+                    "name": doc["name"],
+                    "path": doc["path"],
+                    "sha256": doc.get("sha256"),
+                    "size": doc.get("size"),
+                    "status": doc.get("status") or "pending_review",
+                    "uploaded_at": now,
+                }
+                for doc in documents
+            ],
+        )
+        # INSERT drži write lock do commit-a, pa `discard_unreferenced` ne može
+        # obrisati blob između ove provjere i upisa reda koji na njega pokazuje.
+        missing = [doc["path"] for doc in documents if doc.get("sha256") and not Path(doc["path"]).exists()]
+        if missing:
+            if commit:
+                self.db.rollback()
+            raise FileNotFoundError(f"Dokument nije u skladištu: {missing[0]}")
+        request.updated_at = now
+        if commit:
+            self.db.commit()
+        return len(documents)
+
+    @staticmethod
+    def _document_dict(row: RequestDocument) -> Dict:
+        return {
+            "name": row.name,
+            "file_path": row.path,
+            "sha256": row.sha256,
+            "size": row.size,
+            "uploaded_at": row.uploaded_at.isoformat() if row.uploaded_at else "",
+            "status": row.status,
+        }
+
+    def get_documents(self, request_id: int) -> List[Dict]:
+        """Dokumenta predmeta, redom upload-a."""
+        return self.get_documents_for_requests([request_id]).get(request_id, [])
+
+    def get_documents_for_requests(self, request_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Dokumenta za više predmeta jednim upitom (lista zahtjeva korisnika)."""
+        if not request_ids:
+            return {}
+        rows = (
+            self.db.query(RequestDocument)
+            .filter(RequestDocument.request_id.in_(request_ids))
+            .order_by(RequestDocument.request_id, RequestDocument.id)
+            .all()
+        )
+        documents: Dict[int, List[Dict]] = {}
+        for row in rows:
+            documents.setdefault(row.request_id, []).append(self._document_dict(row))
+        return documents
     
     def get_required_documents(self, request_id: int) -> List[str]:
         """Vrni listu potrebnih dokumenata"""
@@ -596,7 +828,8 @@ class DmsManager:
         capacity: int,
         rooms: int,
         amenities: List[str] = None,
-        coordinates: Dict = None
+        coordinates: Dict = None,
+        commit: bool = True,
     ) -> Optional[TourismProperty]:
         """Registruj turističku nekretninu sa zahtjevom"""
         
@@ -613,11 +846,12 @@ class DmsManager:
         )
         
         self.db.add(property)
-        self.db.commit()
+        if commit:
+            self.db.commit()
 
         return property
 
-    def _finalize_tourism_registration(self, request: DmsRequest) -> None:
+    def _finalize_tourism_registration(self, request: DmsRequest, commit: bool = True) -> None:
         """Kreira TourismProperty zapis tek kad je turistički zahtjev odobren (ne na submit)."""
         if request.request_type not in _TOURISM_TYPES:
             return
@@ -646,6 +880,7 @@ class DmsManager:
             capacity=int(details.get("capacity", 1)),
             rooms=int(details.get("rooms", 1)),
             amenities=[],
+            commit=commit,
         )
         self.logger.info("Turizam nekretnina finalizovana za request_id=%s", request.id)
 
@@ -669,50 +904,195 @@ class DmsManager:
             DmsRequest.status.in_(active_statuses)
         ).order_by(DmsRequest.priority, DmsRequest.created_at).all()
 
-    def get_priority_inbox(self, pending_user_days: int = 3) -> List[Dict]:
-        """Vraća aktivne predmete sa prioritetnim oznakama za admin inbox."""
-        now = datetime.now()
-        inbox = []
+    def _queue_filter(
+        self,
+        statuses: Optional[List[RequestStatus]] = None,
+        request_type: Optional[RequestType] = None,
+        assigned_to: Optional[str] = None,
+        unassigned: bool = False,
+        city: Optional[str] = None,
+        overdue: bool = False,
+        priority: Optional[RequestPriority] = None,
+    ):
+        query = self.db.query(DmsRequest).filter(DmsRequest.status.in_(statuses or ACTIVE_STATUSES))
+        if request_type:
+            query = query.filter(DmsRequest.request_type == request_type)
+        if unassigned:
+            query = query.filter(or_(DmsRequest.assigned_to.is_(None), DmsRequest.assigned_to == ""))
+        elif assigned_to:
+            query = query.filter(DmsRequest.assigned_to == assigned_to)
+        if city:
+            query = query.filter(DmsRequest.user_city == city)
+        if overdue:
+            query = query.filter(DmsRequest.estimated_completion < datetime.now())
+        if priority:
+            query = query.filter(DmsRequest.priority == priority)
+        return query
+
+    @staticmethod
+    def _keyset_condition(column, descending: bool, after: Tuple):
+        value, last_id = after
+        if descending:
+            # SQLite: NULL ide na kraj kod DESC
+            if value is None:
+                return and_(column.is_(None), DmsRequest.id < last_id)
+            return or_(column < value, and_(column == value, DmsRequest.id < last_id), column.is_(None))
+        # SQLite: NULL ide na početak kod ASC
+        if value is None:
+            return or_(and_(column.is_(None), DmsRequest.id > last_id), column.isnot(None))
+        return or_(column > value, and_(column == value, DmsRequest.id > last_id))
+
+    def query_queue(
+        self,
+        sort: str = "oldest",
+        after: Optional[Tuple] = None,
+        limit: int = 50,
+        statuses: Optional[List[RequestStatus]] = None,
+        **filters,
+    ) -> Dict:
+        """Stranica aktivnog reda (keyset paginacija).
 
-        for req in self.get_active_requests():
-            flags = []
-            score = 0
+        Filteri: statuses, request_type, assigned_to, unassigned, city, overdue,
+        priority. `sort` je ključ iz QUEUE_SORTS; `after` je `next_cursor`
+        prethodne stranice. Vraća {"items": [...], "next_cursor": tuple | None}.
 
-            if req.estimated_completion and req.estimated_completion < now:
-                late_days = (now - req.estimated_completion).days
-                flags.append(f"Kasni {late_days} dana")
-                score += 3 + min(4, max(0, late_days))
+        Za svaki status ide zaseban upit po (status, sort kolona, id) indeksu,
+        pa se uređeni nizovi spajaju — bez sortiranja svih aktivnih predmeta.
+        """
+        if sort not in QUEUE_SORTS:
+            raise ValueError(f"Nepoznat redoslijed: {sort}")
+        column, descending = QUEUE_SORTS[sort]
+        order = (column.desc(), DmsRequest.id.desc()) if descending else (column.asc(), DmsRequest.id.asc())
+
+        per_status = []
+        for status in statuses or ACTIVE_STATUSES:
+            query = self._queue_filter(statuses=[status], **filters)
+            if after is not None:
+                query = query.filter(self._keyset_condition(column, descending, after))
+            per_status.append(query.order_by(*order).limit(limit + 1).all())
+
+        def sort_key(req):
+            value = getattr(req, column.key)
+            return (value is not None, value, req.id)
+
+        rows = list(islice(heapq.merge(*per_status, key=sort_key, reverse=descending), limit + 1))
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = (getattr(last, column.key), last.id)
+        return {"items": items, "next_cursor": next_cursor}
+
+    def count_queue(self, **filters) -> int:
+        """Broj predmeta za iste filtere kao `query_queue` (za prikaz ukupno)."""
+        return self._queue_filter(**filters).with_entities(func.count(DmsRequest.id)).scalar() or 0
+
+    def refresh_inbox_scores(
+        self,
+        request_ids: Optional[List[int]] = None,
+        now: Optional[datetime] = None,
+        pending_user_days: int = PENDING_USER_LONG_DAYS,
+        commit: bool = True,
+    ) -> int:
+        """Set-based preračun `inbox_score` i bool oznaka jednim UPDATE-om.
 
-            if req.status == RequestStatus.PENDING_USER and req.updated_at:
-                wait_days = (now - req.updated_at).days
-                if wait_days >= pending_user_days:
-                    flags.append(f"Čeka korisnika {wait_days} dana")
-                    score += 3
+        Bez `request_ids` obrađuje sve predmete sa score-om ili aktivnim
+        statusom (SLA tick); sa njima samo te predmete (promjena statusa,
+        dodjele, prioriteta). Neaktivni predmeti dobijaju NULL score.
+        """
+        now = now or datetime.now()
+        now_param = literal(now, DateTime)
+        active = DmsRequest.status.in_(ACTIVE_STATUSES)
+        overdue = and_(DmsRequest.estimated_completion.isnot(None), DmsRequest.estimated_completion < now_param)
+        late_days = _floor_days_between(DmsRequest.estimated_completion, now_param)
+        pending_long = and_(
+            DmsRequest.status == RequestStatus.PENDING_USER,
+            DmsRequest.updated_at.isnot(None),
+            _floor_days_between(DmsRequest.updated_at, now_param) >= pending_user_days,
+        )
+        unassigned = and_(
+            DmsRequest.status == RequestStatus.SUBMITTED,
+            or_(DmsRequest.assigned_to.is_(None), DmsRequest.assigned_to == ""),
+        )
+        score = (
+            case((overdue, 3 + func.min(4, func.max(0, late_days))), else_=0)
+            + case((pending_long, 3), else_=0)
+            + case((unassigned, 2), else_=0)
+            + case(
+                *[(DmsRequest.priority == priority, weight) for priority, weight in _PRIORITY_WEIGHTS.items()],
+                else_=0,
+            )
+        )
 
-            if req.status == RequestStatus.SUBMITTED and not req.assigned_to:
-                flags.append("Bez dodijeljenog službenika")
-                score += 2
+        stmt = update(DmsRequest).values(
+            inbox_score=case((active, score), else_=None),
+            is_overdue=case((and_(active, overdue), True), else_=False),
+            is_unassigned=case((and_(active, unassigned), True), else_=False),
+            is_pending_user_long=case((and_(active, pending_long), True), else_=False),
+            # onupdate bi inače pomjerio updated_at i pokvario "čeka korisnika N dana"
+            updated_at=DmsRequest.updated_at,
+        )
+        if request_ids is not None:
+            if not request_ids:
+                return 0
+            stmt = stmt.where(DmsRequest.id.in_(request_ids))
+        else:
+            stmt = stmt.where(or_(active, DmsRequest.inbox_score.isnot(None)))
+
+        self.db.flush()
+        result = self.db.execute(stmt.execution_options(synchronize_session=False))
+        if commit:
+            self.db.commit()
+        return result.rowcount
 
-            priority_weight = {
-                RequestPriority.URGENT: 3,
-                RequestPriority.HIGH: 2,
-                RequestPriority.MEDIUM: 1,
-                RequestPriority.LOW: 0,
-            }.get(req.priority, 0)
-            score += priority_weight
+    def get_priority_inbox(
+        self,
+        limit: int = 25,
+        only_overdue: bool = False,
+        only_pending_user: bool = False,
+        only_unassigned: bool = False,
+    ) -> List[Dict]:
+        """Top-K aktivnih predmeta po `inbox_score` za admin inbox.
+
+        Score i oznake su sačuvane kolone; redoslijed i filteri idu preko
+        parcijalnih indeksa (bez sortiranja svih aktivnih predmeta). Čitanje
+        ništa ne upisuje: score osvježavaju pokretanje aplikacije
+        (app.bootstrap_data), promjene predmeta i SLA tick
+        (dms_core/sla_scheduler.py), koji drži i vremenske oznake tekućim.
+        """
+        query = self.db.query(DmsRequest).filter(DmsRequest.inbox_score.isnot(None))
+        if only_overdue:
+            query = query.filter(DmsRequest.is_overdue == True)  # noqa: E712 — mora odgovarati indeksu
+        if only_pending_user:
+            query = query.filter(DmsRequest.is_pending_user_long == True)  # noqa: E712
+        if only_unassigned:
+            query = query.filter(DmsRequest.is_unassigned == True)  # noqa: E712
+        rows = (
+            query.order_by(DmsRequest.inbox_score.desc(), DmsRequest.created_at.desc(), DmsRequest.id.desc())
+            .limit(limit)
+            .all()
+        )
 
+        now = datetime.now()
+        inbox = []
+        for req in rows:
+            flags = []
+            if req.is_overdue:
+                flags.append(f"Kasni {(now - req.estimated_completion).days} dana")
+            if req.is_pending_user_long:
+                flags.append(f"Čeka korisnika {(now - req.updated_at).days} dana")
+            if req.is_unassigned:
+                flags.append("Bez dodijeljenog službenika")
             inbox.append(
                 {
                     "request": req,
-                    "score": score,
+                    "score": req.inbox_score,
                     "flags": flags,
-                    "is_overdue": any("Kasni" in flag for flag in flags),
-                    "is_pending_user_long": any("Čeka korisnika" in flag for flag in flags),
-                    "is_unassigned": "Bez dodijeljenog službenika" in flags,
+                    "is_overdue": bool(req.is_overdue),
+                    "is_pending_user_long": bool(req.is_pending_user_long),
+                    "is_unassigned": bool(req.is_unassigned),
                 }
             )
-
-        inbox.sort(key=lambda item: (item["score"], item["request"].created_at), reverse=True)
         return inbox
 
     def bulk_manage_requests(
@@ -724,62 +1104,113 @@ class DmsManager:
         new_status: Optional[RequestStatus] = None,
         reason: Optional[str] = None,
     ) -> Dict:
-        """Primijeni grupne izmjene nad više predmeta."""
+        """Primijeni grupne izmjene nad više predmeta.
+
+        Sve izmjene, redovi istorije i komentari idu u jednu transakciju;
+        predmeti i zadnji hash-evi istorije čitaju se grupno, a notifikacije
+        se upisuju jednim `notify_many` nakon commit-a.
+        """
         if not changed_by:
             raise ValueError("Bulk izmjene zahtijevaju korisnicki identitet.")
 
         updated = 0
         transitioned = 0
         failed: List[Dict] = []
-        touched = False
+        notifications: List[Dict] = []
+        approved: List[DmsRequest] = []
 
-        for request_id in request_ids:
-            request = self._get_request(int(request_id))
-            if not request:
-                failed.append({"request_id": request_id, "error": "Zahtjev nije pronađen."})
-                continue
+        unique_ids = list(dict.fromkeys(int(request_id) for request_id in request_ids))
+        requests = {
+            request.id: request
+            for request in self.db.query(DmsRequest).filter(DmsRequest.id.in_(unique_ids)).all()
+        }
+        last_hashes = self._last_history_hashes(list(requests)) if new_status else {}
+        # Rollup stanja u identity map (record_request_change ih čita preko db.get);
+        # lista se drži do commit-a (`del` ispod) jer identity map objekte referencira slabo
+        rollup_states = (
+            self.db.query(KpiRequestState).filter(KpiRequestState.request_id.in_(list(requests))).all()
+            if requests
+            else []
+        )
 
-            try:
-                if assign_to is not None:
-                    normalized_assignee = assign_to.strip() if assign_to else None
-                    if request.assigned_to != normalized_assignee:
-                        request.assigned_to = normalized_assignee
-                        touched = True
-
-                if new_priority and request.priority != new_priority:
-                    request.priority = new_priority
-                    request.updated_at = datetime.now()
-                    touched = True
-
-                if new_status and request.status != new_status:
-                    transition_reason = reason.strip() if reason else "Bulk status promjena"
-                    self.transition_request(
-                        request_id=request.id,
-                        new_status=new_status,
-                        changed_by=changed_by,
-                        actor_role="admin",
-                        reason=transition_reason,
-                    )
-                    transitioned += 1
-
-                    if new_status == RequestStatus.PENDING_USER and transition_reason:
-                        self.add_comment(
-                            request.id,
-                            author=changed_by,
-                            content=transition_reason,
-                            author_type="admin",
-                            is_internal=False,
+        rollup_batch: Dict = {}
+
+        # Petlja ne čita ništa što zavisi od neflush-ovanih izmjena; flush ide na commit-u
+        with self.db.no_autoflush:
+            for request_id in request_ids:
+                request = requests.get(int(request_id))
+                if not request:
+                    failed.append({"request_id": request_id, "error": "Zahtjev nije pronađen."})
+                    continue
+
+                try:
+                    if assign_to is not None:
+                        normalized_assignee = assign_to.strip() if assign_to else None
+                        if request.assigned_to != normalized_assignee:
+                            request.assigned_to = normalized_assignee
+                            record_request_change(self.db, request, batch=rollup_batch)
+
+                    if new_priority and request.priority != new_priority:
+                        request.priority = new_priority
+                        request.updated_at = datetime.now()
+
+                    if new_status and request.status != new_status:
+                        transition_reason = reason.strip() if reason else "Bulk status promjena"
+                        old_status = request.status
+                        history = self._apply_status_change(
+                            request,
+                            new_status,
+                            changed_by=changed_by,
+                            reason=transition_reason,
+                            prev_hash=last_hashes.get(request.id, ""),
+                            rollup_batch=rollup_batch,
                         )
-                    if new_status == RequestStatus.REJECTED and transition_reason:
-                        request.rejection_reason = transition_reason
-                        touched = True
+                        last_hashes[request.id] = history.entry_hash
+                        transitioned += 1
+
+                        if changed_by != request.user_id:
+                            notifications.append(
+                                self._status_notification(request, old_status, new_status, transition_reason)
+                            )
+                        if new_status == RequestStatus.APPROVED:
+                            enqueue_decision(self.db, request, officer_name=changed_by, reason=transition_reason)
+                            approved.append(request)
+                        if new_status == RequestStatus.PENDING_USER and transition_reason:
+                            self.db.add(
+                                RequestComment(
+                                    request_id=request.id,
+                                    author=changed_by,
+                                    content=transition_reason,
+                                    author_type="admin",
+                                    is_internal=False,
+                                )
+                            )
+                        if new_status == RequestStatus.REJECTED and transition_reason:
+                            request.rejection_reason = transition_reason
+
+                    updated += 1
+                except Exception as exc:
+                    failed.append({"request_id": request_id, "error": str(exc)})
+
+        for request in approved:
+            self._finalize_tourism_registration(request, commit=False)
+        apply_rollup_batch(self.db, rollup_batch)
+        self.refresh_inbox_scores(list(requests), commit=False)
+        self.db.commit()
+        del rollup_states
+        if transitioned:
+            self.logger.info(
+                "Bulk status change to=%s by=%s count=%s", new_status.value, changed_by, transitioned
+            )
 
-                updated += 1
-            except Exception as exc:
-                failed.append({"request_id": request_id, "error": str(exc)})
+        if notifications:
+            try:
+                notify_many(notifications)
+            except Exception:
+                self.logger.exception("Bulk notifikacije nisu upisane (%s)", len(notifications))
 
-        if touched:
-            self.db.commit()
+        if approved:
+            self._submit_decisions([request.id for request in approved])
 
         return {
             "processed": len(request_ids),
@@ -797,7 +1228,37 @@ class DmsManager:
             RequestStatus.PENDING_USER,
         }
 
-        requests = self.db.query(DmsRequest).filter(DmsRequest.assigned_to != None).all()
+        first_review = self._first_review_subquery(by_officer=True)
+        rows = (
+            self.db.query(
+                DmsRequest.id,
+                DmsRequest.assigned_to,
+                DmsRequest.status,
+                DmsRequest.submitted_at,
+                DmsRequest.completed_at,
+                DmsRequest.estimated_completion,
+                first_review.c.changed_by,
+                first_review.c.first_at,
+                first_review.c.null_count,
+            )
+            .outerjoin(first_review, first_review.c.request_id == DmsRequest.id)
+            .filter(DmsRequest.assigned_to != None)
+            .order_by(DmsRequest.id)
+            .all()
+        )
+
+        # Jedan red po (zahtjev, službenik koji je prebacio u UNDER_REVIEW);
+        # zahtjev se broji jednom, a uzorak uzima samo od dodijeljenog službenika.
+        reviews: Dict[int, Dict[str, Tuple]] = {}
+        requests = []
+        for row in rows:
+            if row.id not in reviews:
+                reviews[row.id] = {}
+                requests.append(row)
+            if row.first_at is not None or row.null_count:
+                reviews[row.id][row.changed_by] = (row.first_at, row.null_count)
+
+        now = datetime.now()
         officers: Dict[str, Dict] = {}
 
         for req in requests:
@@ -819,24 +1280,16 @@ class DmsManager:
 
             if req.status in active_statuses:
                 bucket["active"] += 1
-                if req.estimated_completion and req.estimated_completion < datetime.now():
+                if req.estimated_completion and req.estimated_completion < now:
                     bucket["overdue_active"] += 1
 
             if req.status == RequestStatus.COMPLETED and req.completed_at and req.completed_at >= since:
                 bucket["completed_last_30_days"] += 1
 
-            first_review = (
-                self.db.query(RequestStatusHistory)
-                .filter(
-                    RequestStatusHistory.request_id == req.id,
-                    RequestStatusHistory.to_status == RequestStatus.UNDER_REVIEW,
-                    RequestStatusHistory.changed_by == officer,
-                )
-                .order_by(RequestStatusHistory.changed_at.asc())
-                .first()
-            )
-            if first_review and req.submitted_at and first_review.changed_at:
-                delta_hours = (first_review.changed_at - req.submitted_at).total_seconds() / 3600
+            first_at, null_count = reviews[req.id].get(officer, (None, 0))
+            # Stari upit (ORDER BY changed_at ASC LIMIT 1) vraćao je NULL prvi
+            if req.submitted_at and first_at and not null_count:
+                delta_hours = (first_at - req.submitted_at).total_seconds() / 3600
                 if delta_hours >= 0:
                     sample_count = bucket["first_review_samples"]
                     avg = bucket["avg_first_review_hours"]
@@ -851,6 +1304,33 @@ class DmsManager:
             row.pop("first_review_samples", None)
         return result
     
+    def _first_review_subquery(self, by_officer: bool = False):
+        """Prvi prelaz u UNDER_REVIEW po zahtjevu (opciono i po službeniku).
+
+        `null_count` > 0 znači da postoji prelaz bez `changed_at`; takav
+        zahtjev se ne uzima kao uzorak, kao i u ranijem upitu po zahtjevu.
+        """
+        group_by = [RequestStatusHistory.request_id]
+        if by_officer:
+            group_by.append(RequestStatusHistory.changed_by)
+        return (
+            self.db.query(
+                *group_by,
+                func.min(RequestStatusHistory.changed_at).label("first_at"),
+                func.sum(case((RequestStatusHistory.changed_at.is_(None), 1), else_=0)).label("null_count"),
+            )
+            .filter(RequestStatusHistory.to_status == RequestStatus.UNDER_REVIEW)
+            .group_by(*group_by)
+            .subquery()
+        )
+
+    def _count_overdue(self) -> int:
+        return self.db.query(func.count(DmsRequest.id)).filter(
+            DmsRequest.estimated_completion < datetime.now(),
+            DmsRequest.status != RequestStatus.COMPLETED,
+            DmsRequest.status != RequestStatus.REJECTED
+        ).scalar()
+
     def get_overdue_requests(self) -> List[DmsRequest]:
         """Zahtjevi koji su prošli rok"""
         return self.db.query(DmsRequest).filter(
@@ -877,23 +1357,47 @@ class DmsManager:
     # ============= STATISTIKA =============
     
     def get_statistics(self) -> Dict:
-        """Osnovne statistike DMS-a"""
-        total = self.db.query(DmsRequest).count()
-        
-        statuses = {}
-        for status in RequestStatus:
-            count = self.db.query(DmsRequest).filter(
-                DmsRequest.status == status
-            ).count()
+        """Osnovne statistike DMS-a (jedan GROUP BY prolaz kroz dms_requests)."""
+        completed_with_dates = and_(
+            DmsRequest.status == RequestStatus.COMPLETED,
+            DmsRequest.completed_at.isnot(None),
+            DmsRequest.submitted_at.isnot(None),
+        )
+        overdue = and_(
+            DmsRequest.estimated_completion < datetime.now(),
+            DmsRequest.status.notin_([RequestStatus.COMPLETED, RequestStatus.REJECTED]),
+        )
+        rows = (
+            self.db.query(
+                DmsRequest.status,
+                func.count(DmsRequest.id),
+                func.sum(case((overdue, 1), else_=0)),
+                func.sum(case((completed_with_dates, 1), else_=0)),
+                func.sum(
+                    case(
+                        (completed_with_dates, _floor_days_between(DmsRequest.submitted_at, DmsRequest.completed_at)),
+                        else_=0,
+                    )
+                ),
+            )
+            .group_by(DmsRequest.status)
+            .all()
+        )
+
+        statuses = {status.value: 0 for status in RequestStatus}
+        total = overdue_count = completed_count = completed_days = 0
+        for status, count, overdue_rows, completed_rows, days in rows:
             statuses[status.value] = count
-        
-        avg_completion_time = self._calculate_avg_completion_time()
-        
+            total += count
+            overdue_count += overdue_rows or 0
+            completed_count += completed_rows or 0
+            completed_days += days or 0
+
         return {
             "total_requests": total,
             "by_status": statuses,
-            "avg_completion_days": avg_completion_time,
-            "overdue_count": len(self.get_overdue_requests())
+            "avg_completion_days": completed_days / completed_count if completed_count else 0,
+            "overdue_count": overdue_count,
         }
 
     def get_kpi_metrics(self) -> Dict:
@@ -910,21 +1414,19 @@ class DmsManager:
             .all()
         }
 
-        first_review_hours = []
-        submitted_requests = self.db.query(DmsRequest).filter(DmsRequest.submitted_at != None).all()
-        for req in submitted_requests:
-            first_review = (
-                self.db.query(RequestStatusHistory)
-                .filter(
-                    RequestStatusHistory.request_id == req.id,
-                    RequestStatusHistory.to_status == RequestStatus.UNDER_REVIEW,
-                )
-                .order_by(RequestStatusHistory.changed_at.asc())
-                .first()
-            )
-            if first_review and req.submitted_at and first_review.changed_at:
-                delta_hours = (first_review.changed_at - req.submitted_at).total_seconds() / 3600
-                first_review_hours.append(max(delta_hours, 0))
+        first_review = self._first_review_subquery()
+        rows = (
+            self.db.query(DmsRequest.submitted_at, first_review.c.first_at)
+            .join(first_review, first_review.c.request_id == DmsRequest.id)
+            .filter(DmsRequest.submitted_at != None, first_review.c.null_count == 0)
+            .order_by(DmsRequest.id)
+            .all()
+        )
+        first_review_hours = [
+            max((first_at - submitted_at).total_seconds() / 3600, 0)
+            for submitted_at, first_at in rows
+            if first_at
+        ]
 
         avg_first_review_hours = (
             round(sum(first_review_hours) / len(first_review_hours), 2) if first_review_hours else 0
@@ -937,7 +1439,7 @@ class DmsManager:
             "total_requests": total,
             "submitted_requests": submitted,
             "completed_requests": completed,
-            "overdue_requests": len(self.get_overdue_requests()),
+            "overdue_requests": self._count_overdue(),
             "avg_first_review_hours": avg_first_review_hours,
             "completion_rate_percent": completion_rate,
             "correction_rate_percent": correction_rate,
@@ -988,37 +1490,70 @@ class DmsManager:
 
         return [buckets[key] for key in sorted(buckets.keys())]
 
-    def apply_sla_escalation(self) -> Dict:
-        """Eskalira prioritet aktivnih predmeta koji kasne preko procijenjenog roka."""
-        now = datetime.now()
-        active_statuses = [
-            RequestStatus.SUBMITTED,
-            RequestStatus.UNDER_REVIEW,
-            RequestStatus.PENDING_USER,
-        ]
-        active = self.db.query(DmsRequest).filter(DmsRequest.status.in_(active_statuses)).all()
-
-        escalated = 0
-        checked = 0
-        for req in active:
-            if not req.estimated_completion or req.estimated_completion >= now:
-                continue
+    def apply_sla_escalation(self, now: Optional[datetime] = None, run_by: str = None) -> Dict:
+        """Eskalira prioritet aktivnih predmeta koji kasne preko procijenjenog roka.
 
-            checked += 1
-            late_days = (now - req.estimated_completion).days
-            target_priority = RequestPriority.URGENT if late_days >= 7 else RequestPriority.HIGH
+        Po jedan set-based UPDATE za svaki ciljni prioritet (HIGH: kasni
+        manje od SLA_URGENT_LATE_DAYS dana, URGENT: toliko ili više); oba idu
+        opsegom po idx_dms_requests_status_deadline, bez učitavanja predmeta.
+        Svaka promjena se prije UPDATE-a upisuje u `sla_escalation_log`.
+        """
+        now = now or datetime.now()
+        urgent_before = now - timedelta(days=SLA_URGENT_LATE_DAYS)
+        active = DmsRequest.status.in_(ACTIVE_STATUSES)
+        targets = (
+            (RequestPriority.URGENT, DmsRequest.estimated_completion <= urgent_before),
+            (
+                RequestPriority.HIGH,
+                and_(DmsRequest.estimated_completion > urgent_before, DmsRequest.estimated_completion < now),
+            ),
+        )
 
-            if req.priority != target_priority:
-                req.priority = target_priority
-                req.updated_at = now
-                escalated += 1
+        self.db.flush()
+        checked = (
+            self.db.query(func.count(DmsRequest.id))
+            .filter(active, DmsRequest.estimated_completion < now)
+            .scalar()
+        )
+        escalated = {}
+        for target, late in targets:
+            # priority IS NULL != target je NULL u SQL-u, pa se provjerava posebno
+            condition = and_(active, late, or_(DmsRequest.priority.is_(None), DmsRequest.priority != target))
+            self.db.execute(
+                insert(SlaEscalationLog).from_select(
+                    ["request_id", "from_priority", "to_priority", "escalated_at", "run_by"],
+                    select(
+                        DmsRequest.id,
+                        DmsRequest.priority,
+                        literal(target, DmsRequest.priority.type),
+                        literal(now, DateTime),
+                        literal(run_by or "sistem"),
+                    ).where(condition),
+                )
+            )
+            result = self.db.execute(
+                update(DmsRequest)
+                .where(condition)
+                .values(priority=target, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            escalated[target] = result.rowcount
 
-        if escalated:
-            self.db.commit()
+        # SLA tick: preračunaj inbox score za sve aktivne (commit-uje i eskalacije)
+        self.refresh_inbox_scores(now=now)
+        self.db.expire_all()
 
+        total = sum(escalated.values())
+        if total:
+            self.logger.info(
+                "SLA escalation high=%s urgent=%s run_by=%s",
+                escalated[RequestPriority.HIGH], escalated[RequestPriority.URGENT], run_by or "sistem",
+            )
         return {
             "checked_overdue": checked,
-            "escalated": escalated,
+            "escalated": total,
+            "escalated_high": escalated[RequestPriority.HIGH],
+            "escalated_urgent": escalated[RequestPriority.URGENT],
         }
 
     def verify_audit_chain(self, request_id: int) -> Dict:
@@ -1108,7 +1643,7 @@ class DmsManager:
                 "description": request.description,
                 "reason": request.reason,
                 "details": request.details or {},
-                "documents_metadata": request.documents_metadata or [],
+                "documents_metadata": self.get_documents(request_id),
                 "required_documents": request.required_documents or [],
                 "created_at": request.created_at.isoformat() if request.created_at else None,
                 "submitted_at": request.submitted_at.isoformat() if request.submitted_at else None,
@@ -1181,18 +1716,20 @@ class DmsManager:
 
     def _calculate_avg_completion_time(self) -> float:
         """Prosječne dane za završetak zahtjeva"""
-        completed = self.db.query(DmsRequest).filter(
-            DmsRequest.status == RequestStatus.COMPLETED,
-            DmsRequest.completed_at != None,
-            DmsRequest.submitted_at != None
-        ).all()
-        
-        if not completed:
+        count, total_days = (
+            self.db.query(
+                func.count(DmsRequest.id),
+                func.sum(_floor_days_between(DmsRequest.submitted_at, DmsRequest.completed_at)),
+            )
+            .filter(
+                DmsRequest.status == RequestStatus.COMPLETED,
+                DmsRequest.completed_at != None,
+                DmsRequest.submitted_at != None
+            )
+            .one()
+        )
+
+        if not count:
             return 0
-        
-        total_days = 0
-        for req in completed:
-            delta = (req.completed_at - req.submitted_at).days
-            total_days += delta
-        
-        return total_days / len(completed)
+
+        return total_days / count
@@ -0,0 +1,458 @@
+"""Registar migracija DMS baze (instance/dms.db).
+
+Baseline (v1) je zamrznut DDL modela u trenutku uvođenja migracija; nove
+kolone, indeksi i backfill-ovi se dodaju ISKLJUČIVO kao nove verzije na kraj
+liste — primijenjene migracije se ne mijenjaju (checksum).
+
+Pokretanje iz komandne linije:
+  python -m dms_core.migrations [--dry-run]
+"""
+
+from __future__ import annotations
+
+import json
+from typing import List
+
+from database.migrations import AddColumn, Backfill, Migration, Sql, migrate, read_schema_version
+from dms_core.assignment import reconcile_officer_load_conn
+from dms_core.models import engine
+from dms_core.rollups import rebuild_rollups
+
+
+DMS_COMPONENT = "dms"
+
+
+def _backfill_request_documents(conn) -> None:
+    """Prepiše stavke iz dms_requests.documents_metadata u request_documents."""
+    rows = conn.execute(
+        "SELECT id, documents_metadata FROM dms_requests "
+        "WHERE documents_metadata IS NOT NULL AND documents_metadata NOT IN ('', '[]', 'null') "
+        "AND id NOT IN (SELECT DISTINCT request_id FROM request_documents)"
+    ).fetchall()
+    documents = []
+    for request_id, raw in rows:
+        try:
+            entries = json.loads(raw) or []
+        except (TypeError, ValueError):
+            continue
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("file_path"):
+                continue
+            documents.append(
+                (
+                    request_id,
+                    entry.get("name") or "document.bin",
+                    entry["file_path"],
+                    entry.get("sha256"),
+                    entry.get("size"),
+                    entry.get("status") or "pending_review",
+                    (entry.get("uploaded_at") or "").replace("T", " ") or None,
+                )
+            )
+    conn.executemany(
+        "INSERT INTO request_documents (request_id, name, path, sha256, size, status, uploaded_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        documents,
+    )
+
+
+DMS_MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        name="baseline",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS dms_requests (
+                    id INTEGER NOT NULL,
+                    request_type VARCHAR(23) NOT NULL,
+                    user_id VARCHAR NOT NULL,
+                    user_email VARCHAR NOT NULL,
+                    user_city VARCHAR NOT NULL,
+                    status VARCHAR(12) NOT NULL,
+                    priority VARCHAR(6),
+                    created_at DATETIME,
+                    submitted_at DATETIME,
+                    updated_at DATETIME,
+                    completed_at DATETIME,
+                    estimated_completion DATETIME,
+                    description TEXT,
+                    reason TEXT,
+                    details JSON,
+                    documents_metadata JSON,
+                    required_documents JSON,
+                    assigned_to VARCHAR,
+                    notes TEXT,
+                    rejection_reason TEXT,
+                    payment_status VARCHAR,
+                    payment_reference VARCHAR,
+                    paid_at DATETIME,
+                    signed_pdf_path VARCHAR,
+                    signature_hash VARCHAR,
+                    PRIMARY KEY (id)
+                )
+                """
+            ),
+            Sql("CREATE INDEX IF NOT EXISTS idx_dms_requests_created_at ON dms_requests (created_at)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_dms_requests_status ON dms_requests (status)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_dms_requests_user_id ON dms_requests (user_id)"),
+            Sql("CREATE INDEX IF NOT EXISTS ix_dms_requests_request_type ON dms_requests (request_type)"),
+            Sql("CREATE INDEX IF NOT EXISTS ix_dms_requests_status ON dms_requests (status)"),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS document_templates (
+                    id INTEGER NOT NULL,
+                    request_type VARCHAR NOT NULL,
+                    required_documents JSON NOT NULL,
+                    optional_documents JSON,
+                    estimated_days INTEGER NOT NULL,
+                    processing_fee_eur FLOAT,
+                    instructions TEXT,
+                    ai_keywords JSON,
+                    created_at DATETIME,
+                    updated_at DATETIME,
+                    PRIMARY KEY (id),
+                    UNIQUE (request_type)
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS request_comments (
+                    id INTEGER NOT NULL,
+                    request_id INTEGER NOT NULL,
+                    author VARCHAR NOT NULL,
+                    author_type VARCHAR NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at DATETIME,
+                    is_internal BOOLEAN,
+                    PRIMARY KEY (id),
+                    FOREIGN KEY(request_id) REFERENCES dms_requests (id)
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS request_status_history (
+                    id INTEGER NOT NULL,
+                    request_id INTEGER NOT NULL,
+                    from_status VARCHAR(12) NOT NULL,
+                    to_status VARCHAR(12) NOT NULL,
+                    changed_by VARCHAR,
+                    changed_at DATETIME,
+                    reason TEXT,
+                    prev_hash VARCHAR,
+                    entry_hash VARCHAR,
+                    PRIMARY KEY (id),
+                    FOREIGN KEY(request_id) REFERENCES dms_requests (id)
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS tourism_properties (
+                    id INTEGER NOT NULL,
+                    property_type VARCHAR NOT NULL,
+                    owner_id VARCHAR NOT NULL,
+                    address VARCHAR NOT NULL,
+                    city VARCHAR NOT NULL,
+                    coordinates JSON,
+                    capacity INTEGER NOT NULL,
+                    rooms INTEGER NOT NULL,
+                    amenities JSON,
+                    license_number VARCHAR,
+                    license_valid_from DATETIME,
+                    license_valid_to DATETIME,
+                    category VARCHAR,
+                    registration_request_id INTEGER,
+                    created_at DATETIME,
+                    updated_at DATETIME,
+                    PRIMARY KEY (id),
+                    FOREIGN KEY(registration_request_id) REFERENCES dms_requests (id)
+                )
+                """
+            ),
+            # Baze nastale prije hash chain-a, plaćanja i e-potpisa
+            AddColumn("request_status_history", "prev_hash", "VARCHAR"),
+            AddColumn("request_status_history", "entry_hash", "VARCHAR"),
+            AddColumn("dms_requests", "payment_status", "VARCHAR"),
+            AddColumn("dms_requests", "payment_reference", "VARCHAR"),
+            AddColumn("dms_requests", "paid_at", "DATETIME"),
+            AddColumn("dms_requests", "signed_pdf_path", "VARCHAR"),
+            AddColumn("dms_requests", "signature_hash", "VARCHAR"),
+        ),
+    ),
+    Migration(
+        version=2,
+        name="status_history_indexes",
+        steps=(
+            # Hash chain (zadnji unos po zahtjevu) i prvi UNDER_REVIEW prelaz za KPI
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_status_history_request "
+                "ON request_status_history (request_id, id)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_status_history_first_review "
+                "ON request_status_history (to_status, request_id, changed_by, changed_at)"
+            ),
+        ),
+    ),
+    Migration(
+        version=3,
+        name="kpi_rollups",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS kpi_rollup_daily (
+                    bucket_day VARCHAR NOT NULL,
+                    cohort_week VARCHAR NOT NULL,
+                    request_type VARCHAR NOT NULL,
+                    officer VARCHAR NOT NULL,
+                    metric VARCHAR NOT NULL,
+                    count INTEGER NOT NULL,
+                    value_sum FLOAT NOT NULL,
+                    PRIMARY KEY (bucket_day, cohort_week, request_type, officer, metric)
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS kpi_request_state (
+                    request_id INTEGER NOT NULL,
+                    request_type VARCHAR NOT NULL,
+                    officer VARCHAR NOT NULL,
+                    status VARCHAR NOT NULL,
+                    created_at DATETIME,
+                    submitted_at DATETIME,
+                    completed_at DATETIME,
+                    first_review_at DATETIME,
+                    had_pending_user BOOLEAN NOT NULL,
+                    PRIMARY KEY (request_id)
+                )
+                """
+            ),
+            Backfill("rebuild_kpi_rollups", rebuild_rollups),
+        ),
+    ),
+    Migration(
+        version=4,
+        name="decision_jobs",
+        steps=(
+            AddColumn("dms_requests", "decision_status", "VARCHAR"),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS decision_jobs (
+                    request_id INTEGER NOT NULL,
+                    officer_name VARCHAR NOT NULL,
+                    reason TEXT,
+                    status VARCHAR NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    error TEXT,
+                    queued_at DATETIME,
+                    started_at DATETIME,
+                    finished_at DATETIME,
+                    PRIMARY KEY (request_id)
+                )
+                """
+            ),
+            Sql("CREATE INDEX IF NOT EXISTS idx_decision_jobs_status ON decision_jobs (status)"),
+            Sql(
+                "UPDATE dms_requests SET decision_status = 'ready' "
+                "WHERE signed_pdf_path IS NOT NULL AND decision_status IS NULL"
+            ),
+        ),
+    ),
+    Migration(
+        version=5,
+        name="request_documents",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS request_documents (
+                    id INTEGER NOT NULL,
+                    request_id INTEGER NOT NULL,
+                    name VARCHAR NOT NULL,
+                    path VARCHAR NOT NULL,
+                    sha256 VARCHAR,
+                    size INTEGER,
+                    status VARCHAR NOT NULL,
+                    uploaded_at DATETIME,
+                    PRIMARY KEY (id),
+                    FOREIGN KEY(request_id) REFERENCES dms_requests (id)
+                )
+                """
+            ),
+            Sql("CREATE INDEX IF NOT EXISTS idx_request_documents_request ON request_documents (request_id, id)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_request_documents_sha256 ON request_documents (sha256)"),
+            Sql("CREATE INDEX IF NOT EXISTS idx_request_documents_status ON request_documents (status)"),
+            Backfill("backfill_request_documents", _backfill_request_documents),
+        ),
+    ),
+    Migration(
+        version=6,
+        name="queue_indexes",
+        steps=(
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_status_created "
+                "ON dms_requests (status, created_at, id)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_status_deadline "
+                "ON dms_requests (status, estimated_completion, id)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_assignee_queue "
+                "ON dms_requests (assigned_to, status, created_at, id)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_type_queue "
+                "ON dms_requests (request_type, status, created_at, id)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_city_queue "
+                "ON dms_requests (user_city, status, created_at, id)"
+            ),
+        ),
+    ),
+    Migration(
+        version=7,
+        name="inbox_score",
+        # Score zavisi od vremena; ne popunjava ga migracija nego
+        # refresh_inbox_scores pri pokretanju aplikacije (bootstrap_data),
+        # na svaki SLA tick i pri promjeni predmeta.
+        steps=(
+            AddColumn("dms_requests", "inbox_score", "INTEGER"),
+            AddColumn("dms_requests", "is_overdue", "BOOLEAN DEFAULT '0' NOT NULL"),
+            AddColumn("dms_requests", "is_unassigned", "BOOLEAN DEFAULT '0' NOT NULL"),
+            AddColumn("dms_requests", "is_pending_user_long", "BOOLEAN DEFAULT '0' NOT NULL"),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_inbox "
+                "ON dms_requests (inbox_score, created_at, id) WHERE inbox_score IS NOT NULL"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_inbox_overdue "
+                "ON dms_requests (inbox_score, created_at, id) WHERE is_overdue = 1"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_inbox_unassigned "
+                "ON dms_requests (inbox_score, created_at, id) WHERE is_unassigned = 1"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_dms_requests_inbox_pending_user "
+                "ON dms_requests (inbox_score, created_at, id) WHERE is_pending_user_long = 1"
+            ),
+        ),
+    ),
+    Migration(
+        version=8,
+        name="officer_load",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS officer_load (
+                    officer VARCHAR NOT NULL,
+                    active INTEGER NOT NULL,
+                    capacity INTEGER,
+                    skills JSON,
+                    updated_at DATETIME,
+                    PRIMARY KEY (officer)
+                )
+                """
+            ),
+            Backfill("reconcile_officer_load", reconcile_officer_load_conn),
+        ),
+    ),
+    Migration(
+        version=9,
+        name="sla_scheduler",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS scheduler_leases (
+                    name VARCHAR NOT NULL,
+                    owner VARCHAR NOT NULL,
+                    expires_at DATETIME NOT NULL,
+                    last_run_at DATETIME,
+                    PRIMARY KEY (name)
+                )
+                """
+            ),
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS sla_escalation_log (
+                    id INTEGER NOT NULL,
+                    request_id INTEGER NOT NULL,
+                    from_priority VARCHAR(6),
+                    to_priority VARCHAR(6) NOT NULL,
+                    escalated_at DATETIME NOT NULL,
+                    run_by VARCHAR,
+                    PRIMARY KEY (id),
+                    FOREIGN KEY(request_id) REFERENCES dms_requests (id)
+                )
+                """
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_sla_escalation_log_request "
+                "ON sla_escalation_log (request_id, id)"
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_sla_escalation_log_time "
+                "ON sla_escalation_log (escalated_at)"
+            ),
+        ),
+    ),
+    Migration(
+        version=10,
+        name="audit_checkpoints",
+        steps=(
+            Sql(
+                """
+                CREATE TABLE IF NOT EXISTS audit_checkpoints (
+                    request_id INTEGER NOT NULL,
+                    verified_up_to INTEGER NOT NULL,
+                    last_hash VARCHAR NOT NULL,
+                    broken_at INTEGER,
+                    verified_at DATETIME,
+                    PRIMARY KEY (request_id)
+                )
+                """
+            ),
+            Sql(
+                "CREATE INDEX IF NOT EXISTS idx_audit_checkpoints_broken "
+                "ON audit_checkpoints (broken_at)"
+            ),
+        ),
+    ),
+]
+
+DMS_SCHEMA_VERSION = DMS_MIGRATIONS[-1].version
+
+
+def run_dms_migrations(dry_run: bool = False, force: bool = False):
+    """Primijeni pending DMS migracije na zasebnoj DB-API konekciji.
+
+    Vraća False ako je šema aktuelna (brza provjera), inače plan migracija.
+    """
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        if dry_run:
+            return migrate(conn, DMS_COMPONENT, DMS_MIGRATIONS, dry_run=True)
+        if not force and read_schema_version(conn, DMS_COMPONENT) >= DMS_SCHEMA_VERSION:
+            return False
+        return migrate(conn, DMS_COMPONENT, DMS_MIGRATIONS)
+    finally:
+        raw.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database.migrations import _print_plan
+
+    parser = argparse.ArgumentParser(description="Migracije DMS baze (instance/dms.db)")
+    parser.add_argument("--dry-run", action="store_true", help="samo prikaži plan")
+    args = parser.parse_args()
+
+    plan = run_dms_migrations(dry_run=args.dry_run, force=True)
+    _print_plan(DMS_COMPONENT, plan or [])
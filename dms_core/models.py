@@ -7,7 +7,7 @@ from datetime import datetime
 from enum import Enum as PyEnum
 import os
 from pathlib import Path
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, Enum, Float, JSON, Boolean, ForeignKey, Index
+from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, Enum, Float, JSON, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
 # Kreiraj SQLAlchemy engine sa stabilnom putanjom unutar projekta.
@@ -63,6 +63,29 @@ class DmsRequest(Base):
         Index("idx_dms_requests_user_id", "user_id"),
         Index("idx_dms_requests_status", "status"),
         Index("idx_dms_requests_created_at", "created_at"),
+        # Aktivni red (query_queue): filter + keyset sort po (created_at|rok, id)
+        Index("idx_dms_requests_status_created", "status", "created_at", "id"),
+        Index("idx_dms_requests_status_deadline", "status", "estimated_completion", "id"),
+        Index("idx_dms_requests_assignee_queue", "assigned_to", "status", "created_at", "id"),
+        Index("idx_dms_requests_type_queue", "request_type", "status", "created_at", "id"),
+        Index("idx_dms_requests_city_queue", "user_city", "status", "created_at", "id"),
+        # Prioritetni inbox: top-K direktno iz indeksa (samo aktivni imaju score)
+        Index(
+            "idx_dms_requests_inbox", "inbox_score", "created_at", "id",
+            sqlite_where=text("inbox_score IS NOT NULL"),
+        ),
+        Index(
+            "idx_dms_requests_inbox_overdue", "inbox_score", "created_at", "id",
+            sqlite_where=text("is_overdue = 1"),
+        ),
+        Index(
+            "idx_dms_requests_inbox_unassigned", "inbox_score", "created_at", "id",
+            sqlite_where=text("is_unassigned = 1"),
+        ),
+        Index(
+            "idx_dms_requests_inbox_pending_user", "inbox_score", "created_at", "id",
+            sqlite_where=text("is_pending_user_long = 1"),
+        ),
     )
     
     id = Column(Integer, primary_key=True)
@@ -93,7 +116,7 @@ class DmsRequest(Base):
     # JSON sa specifičnim poljima po tipu zahtjeva
     details = Column(JSON, nullable=True)
     
-    # Dokumenta metadata
+    # Dokumenta metadata (legacy JSON; od v5 dokumenta su u request_documents)
     documents_metadata = Column(JSON, nullable=True)  # Lista dokumenata sa statusom
     required_documents = Column(JSON, nullable=True)  # Template šta je potrebno
     
@@ -112,10 +135,23 @@ class DmsRequest(Base):
     # e-Potpis odluke (PDF rješenje)
     signed_pdf_path = Column(String, nullable=True)
     signature_hash = Column(String, nullable=True)
+    decision_status = Column(String, nullable=True)  # queued | rendering | ready | failed
+
+    # Prioritetni inbox (održava DmsManager.refresh_inbox_scores; NULL = nije aktivan)
+    inbox_score = Column(Integer, nullable=True)
+    is_overdue = Column(Boolean, nullable=False, default=False, server_default="0")
+    is_unassigned = Column(Boolean, nullable=False, default=False, server_default="0")
+    is_pending_user_long = Column(Boolean, nullable=False, default=False, server_default="0")
 
     # Connections
     status_history = relationship("RequestStatusHistory", back_populates="request", cascade="all, delete-orphan")
     comments = relationship("RequestComment", back_populates="request", cascade="all, delete-orphan")
+    documents = relationship(
+        "RequestDocument",
+        back_populates="request",
+        cascade="all, delete-orphan",
+        order_by="RequestDocument.id",
+    )
     
     def __repr__(self):
         return f"<DmsRequest {self.id}: {self.request_type.value} - {self.status.value}>"
@@ -124,6 +160,10 @@ class DmsRequest(Base):
 class RequestStatusHistory(Base):
     """Istorija promjena statusa zahtjeva sa tamper-evident hash chain."""
     __tablename__ = 'request_status_history'
+    __table_args__ = (
+        Index("idx_status_history_request", "request_id", "id"),
+        Index("idx_status_history_first_review", "to_status", "request_id", "changed_by", "changed_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     request_id = Column(Integer, ForeignKey('dms_requests.id'), nullable=False)
@@ -163,6 +203,28 @@ class RequestComment(Base):
     request = relationship("DmsRequest", back_populates="comments")
 
 
+class RequestDocument(Base):
+    """Dokument uploadovan uz zahtjev (jedan red po fajlu)."""
+    __tablename__ = 'request_documents'
+    __table_args__ = (
+        Index("idx_request_documents_request", "request_id", "id"),
+        Index("idx_request_documents_sha256", "sha256"),
+        Index("idx_request_documents_status", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    request_id = Column(Integer, ForeignKey('dms_requests.id'), nullable=False)
+
+    name = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    sha256 = Column(String, nullable=True)
+    size = Column(Integer, nullable=True)
+    status = Column(String, nullable=False, default="pending_review")
+    uploaded_at = Column(DateTime, default=datetime.now)
+
+    request = relationship("DmsRequest", back_populates="documents")
+
+
 class DocumentTemplate(Base):
     """Template za potrebne dokumente po tipu zahtjeva"""
     __tablename__ = 'document_templates'
@@ -217,3 +279,107 @@ class TourismProperty(Base):
     
     def __repr__(self):
         return f"<Property {self.address} - Capacity: {self.capacity} osoba>"
+
+
+class KpiRollup(Base):
+    """Materijalizovani KPI brojači (dms_core.rollups).
+
+    `bucket_day` je dan događaja (YYYY-MM-DD) za created/submitted/completed,
+    a prazan string za metrike trenutnog stanja (status:*, trajanja).
+    `cohort_week` je ponedjeljak nedjelje kreiranja zahtjeva.
+    """
+    __tablename__ = 'kpi_rollup_daily'
+
+    bucket_day = Column(String, primary_key=True)
+    cohort_week = Column(String, primary_key=True)
+    request_type = Column(String, primary_key=True)
+    officer = Column(String, primary_key=True)
+    metric = Column(String, primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+
+
+class KpiRequestState(Base):
+    """Stanje zahtjeva kakvo je trenutno uračunato u kpi_rollup_daily."""
+    __tablename__ = 'kpi_request_state'
+
+    request_id = Column(Integer, primary_key=True)
+    request_type = Column(String, nullable=False)
+    officer = Column(String, nullable=False, default="")
+    status = Column(String, nullable=False)
+
+    created_at = Column(DateTime, nullable=True)
+    submitted_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    first_review_at = Column(DateTime, nullable=True)
+    had_pending_user = Column(Boolean, nullable=False, default=False)
+
+
+class OfficerLoad(Base):
+    """Broj aktivnih predmeta po službeniku + kapacitet i vještine (dms_core/assignment.py)."""
+    __tablename__ = 'officer_load'
+
+    officer = Column(String, primary_key=True)
+    active = Column(Integer, nullable=False, default=0)
+    capacity = Column(Integer, nullable=True)  # NULL = bez ograničenja
+    skills = Column(JSON, nullable=True)  # lista RequestType imena; NULL = svi tipovi
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+class AuditCheckpoint(Base):
+    """Do kog unosa istorije je hash chain predmeta provjeren (dms_core/audit_verify.py)."""
+    __tablename__ = 'audit_checkpoints'
+    __table_args__ = (
+        Index("idx_audit_checkpoints_broken", "broken_at"),
+    )
+
+    request_id = Column(Integer, primary_key=True)
+    verified_up_to = Column(Integer, nullable=False, default=0)  # id zadnjeg ispravnog unosa
+    last_hash = Column(String, nullable=False, default="")  # entry_hash tog unosa
+    broken_at = Column(Integer, nullable=True)  # id prvog neispravnog unosa
+    verified_at = Column(DateTime, nullable=True)
+
+
+class SchedulerLease(Base):
+    """Lease za periodične poslove: samo jedan proces radi posao po intervalu."""
+    __tablename__ = 'scheduler_leases'
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    last_run_at = Column(DateTime, nullable=True)
+
+
+class SlaEscalationLog(Base):
+    """Jedan red po eskalaciji prioriteta (vidi dms_core/sla_scheduler.py)."""
+    __tablename__ = 'sla_escalation_log'
+    __table_args__ = (
+        Index("idx_sla_escalation_log_request", "request_id", "id"),
+        Index("idx_sla_escalation_log_time", "escalated_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    request_id = Column(Integer, ForeignKey('dms_requests.id'), nullable=False)
+    from_priority = Column(Enum(RequestPriority), nullable=True)
+    to_priority = Column(Enum(RequestPriority), nullable=False)
+    escalated_at = Column(DateTime, nullable=False)
+    run_by = Column(String, nullable=True)
+
+
+class DecisionJob(Base):
+    """Posao generisanja potpisanog rješenja (vidi dms_core/decision_jobs.py)."""
+    __tablename__ = 'decision_jobs'
+    __table_args__ = (
+        Index("idx_decision_jobs_status", "status"),
+    )
+
+    request_id = Column(Integer, primary_key=True)
+    officer_name = Column(String, nullable=False)
+    reason = Column(Text, nullable=True)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    queued_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,183 @@
+"""Retencija notifikacija: pročitane starije od N dana sele se u arhivu.
+
+Arhiva (`notifications_archive`) čuva po jedan red za korisnika i seriju:
+zlib-kompresovan JSON spisak notifikacija + opseg id-eva. Posao radi u
+ograničenim serijama (BATCH_SIZE redova po transakciji), pa write lock nad
+glavnom bazom drži samo kratko; između serija se pravi pauza da drugi
+pisci (status promjene, notify) ne čekaju.
+
+Podešavanja preko env varijabli:
+  NOTIFICATION_RETENTION_DAYS (90; 0 isključuje), NOTIFICATION_RETENTION_BATCH (500)
+
+Pokretanje iz komandne linije:
+  python -m dms_core.notification_retention [--days 90] [--batch-size 500]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database.database import get_pool
+from database.pool import ConnectionPool
+from dms_core.notifications import invalidate_notification_cache
+
+
+logger = logging.getLogger("dms_portal.notifications.retention")
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_BATCH_SIZE = 500
+
+_COLUMNS = ("id", "request_id", "title", "body", "created_at", "read_at")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _archive_batch(conn, cutoff: str, after_id: int, max_id: int, batch_size: int) -> Optional[Tuple[int, int]]:
+    """Arhivira jednu seriju; vraća (zadnji id, broj redova) ili None kad nema više.
+
+    `max_id` ograničava opseg po primarnom ključu, pa ni zadnja serija pod
+    write lock-om ne čita novije notifikacije do kraja tabele.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT id, username, request_id, title, body, created_at, read_at FROM notifications "
+            "WHERE id > ? AND id <= ? AND read_at IS NOT NULL AND created_at < ? "
+            "ORDER BY id LIMIT ?",
+            (after_id, max_id, cutoff, batch_size),
+        ).fetchall()
+        if not rows:
+            conn.rollback()
+            return None
+
+        by_user: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_user.setdefault(row[1], []).append(dict(zip(_COLUMNS, (row[0],) + tuple(row[2:]))))
+
+        archived_at = datetime.now().isoformat()
+        conn.executemany(
+            "INSERT INTO notifications_archive (username, first_id, last_id, item_count, payload, archived_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    username,
+                    items[0]["id"],
+                    items[-1]["id"],
+                    len(items),
+                    zlib.compress(json.dumps(items, ensure_ascii=False).encode("utf-8"), 9),
+                    archived_at,
+                )
+                for username, items in by_user.items()
+            ],
+        )
+        conn.executemany("DELETE FROM notifications WHERE id = ?", [(row[0],) for row in rows])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for username in by_user:
+        invalidate_notification_cache(username)
+    return rows[-1][0], len(rows)
+
+
+def archive_read_notifications(
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+    pause_s: float = 0.05,
+    pool: Optional[ConnectionPool] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Arhivira pročitane notifikacije starije od `retention_days`.
+
+    Serije idu redom po id-u (keyset), svaka u svojoj kratkoj transakciji.
+    Vraća {"archived": broj redova, "batches": broj serija}.
+    """
+    retention_days = (
+        retention_days
+        if retention_days is not None
+        else _env_int("NOTIFICATION_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    )
+    batch_size = batch_size or _env_int("NOTIFICATION_RETENTION_BATCH", DEFAULT_BATCH_SIZE) or DEFAULT_BATCH_SIZE
+    result = {"archived": 0, "batches": 0}
+    if retention_days <= 0:
+        return result
+
+    cutoff = ((now or datetime.now()) - timedelta(days=retention_days)).isoformat()
+    conn = (pool or get_pool()).acquire()
+    try:
+        # Gornja granica se čita prije serija, van write lock-a
+        max_id = conn.execute(
+            "SELECT MAX(id) FROM notifications WHERE created_at < ?", (cutoff,)
+        ).fetchone()[0]
+        last_id = 0
+        while max_id is not None and (max_batches is None or result["batches"] < max_batches):
+            batch = _archive_batch(conn, cutoff, last_id, max_id, batch_size)
+            if batch is None:
+                break
+            last_id, count = batch
+            result["batches"] += 1
+            result["archived"] += count
+            if pause_s:
+                time.sleep(pause_s)
+    finally:
+        conn.close()
+
+    if result["archived"]:
+        logger.info("Arhivirano notifikacija: %s (%s serija)", result["archived"], result["batches"])
+    return result
+
+
+def load_archived(username: str, pool: Optional[ConnectionPool] = None) -> List[Dict]:
+    """Arhivirane notifikacije korisnika, od najnovije."""
+    conn = (pool or get_pool()).acquire()
+    try:
+        rows = conn.execute(
+            "SELECT payload FROM notifications_archive WHERE username = ? ORDER BY last_id DESC",
+            (username,),
+        ).fetchall()
+    finally:
+        conn.close()
+    items: List[Dict] = []
+    for (payload,) in rows:
+        items.extend(reversed(json.loads(zlib.decompress(payload).decode("utf-8"))))
+    return items
+
+
+def start_retention_job() -> Optional[threading.Thread]:
+    """Jednom po procesu pokreće arhiviranje u pozadinskom thread-u."""
+    if _env_int("NOTIFICATION_RETENTION_DAYS", DEFAULT_RETENTION_DAYS) <= 0:
+        return None
+
+    def _run():
+        try:
+            archive_read_notifications()
+        except Exception:
+            logger.exception("Arhiviranje notifikacija neuspjelo")
+
+    thread = threading.Thread(target=_run, name="notification-retention", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Arhiviranje starih pročitanih notifikacija")
+    parser.add_argument("--days", type=int, default=None, help="starost u danima (default iz env-a)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    print(archive_read_notifications(retention_days=args.days, batch_size=args.batch_size))
@@ -1,7 +1,15 @@
 """In-app notifikacije + opciono e-mail slanje preko SMTP.
 
-Tabela `notifications` se kreira lazy-no kad je potrebno.
-E-mail slanje je omogućeno samo ako su definisani SMTP env vari:
+Tabela `notifications` i outbox `email_outbox` dolaze iz migracija glavne
+baze (database/migrations.py). E-mail se ne šalje sinhrono: `notify()` samo
+upiše red u outbox, a šalje ga pozadinski dispatcher (dms_core/mail_dispatcher.py).
+
+Broj nepročitanih se vodi u `notification_counters` (ažurira se u istoj
+transakciji kao upis/označavanje), a sidebar ga čita iz malog in-process
+keša sa kratkim TTL-om (NOTIFICATION_CACHE_TTL_S, default 30). `notify`,
+`notify_many` i `mark_all_read` keš eksplicitno poništavaju; promjene iz
+drugih procesa postaju vidljive najkasnije nakon TTL-a.
+E-mail je omogućen samo ako su definisani SMTP env vari:
   SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM
 """
 
@@ -9,43 +17,81 @@ from __future__ import annotations
 
 import logging
 import os
-import smtplib
-import sqlite3
+import threading
+import time
 from datetime import datetime
-from email.mime.text import MIMEText
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database.database import get_conn, init_db
+from dms_core.mail_dispatcher import enqueue_email, enqueue_emails, wake_dispatcher
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DB_PATH = BASE_DIR / "data" / "mup_data.db"
 
 logger = logging.getLogger("dms_portal.notifications")
 
+_schema_ready = False
+
+_COUNTER_UPSERT = (
+    "INSERT INTO notification_counters (username, unread) VALUES (?, ?) "
+    "ON CONFLICT(username) DO UPDATE SET unread = unread + excluded.unread"
+)
+
+
+class _TtlCache:
+    """Mali keš po korisniku: ključ (username, ...) -> vrijednost, sa TTL-om."""
+
+    def __init__(self, ttl_s: float, clock=time.monotonic):
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Tuple[float, object]] = {}
 
-def _get_conn() -> sqlite3.Connection:
-    return sqlite3.connect(str(DB_PATH))
+    def get(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            return entry[1]
 
+    def put(self, key: Tuple, value) -> None:
+        with self._lock:
+            if len(self._entries) > 10_000:
+                self._entries.clear()
+            self._entries[key] = (self._clock() + self.ttl_s, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, usernames: Iterable[str]) -> None:
+        users = set(usernames)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in users]:
+                del self._entries[key]
+
+
+def _cache_ttl() -> float:
+    try:
+        return max(0.0, float(os.getenv("NOTIFICATION_CACHE_TTL_S", 30)))
+    except ValueError:
+        return 30.0
 
-def _ensure_table(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            request_id INTEGER,
-            title TEXT NOT NULL,
-            body TEXT,
-            created_at TEXT NOT NULL,
-            read_at TEXT
-        );
-        """
-    )
-    conn.execute(
-        "CREATE INDEX IF NOT EXISTS idx_notifications_username_read "
-        "ON notifications(username, read_at)"
-    )
-    conn.commit()
+
+_CACHE = _TtlCache(_cache_ttl())
+
+
+def _get_conn():
+    global _schema_ready
+    if not _schema_ready:
+        # Jednom po procesu; init_db je no-op kad je šema već aktuelna
+        init_db()
+        _schema_ready = True
+    return get_conn()
 
 
 def notify(
@@ -55,8 +101,9 @@ def notify(
     request_id: Optional[int] = None,
     email: Optional[str] = None,
 ) -> int:
-    """Kreira in-app notifikaciju i opcioni e-mail.
+    """Kreira in-app notifikaciju i (ako je zadat e-mail) red u outbox-u.
 
+    Oba upisa idu u jednu transakciju; SMTP slanje radi dispatcher.
     Vraća id notifikacije; -1 ako username nedostaje.
     """
     if not username:
@@ -64,7 +111,6 @@ def notify(
 
     conn = _get_conn()
     try:
-        _ensure_table(conn)
         cur = conn.cursor()
         cur.execute(
             "INSERT INTO notifications (username, request_id, title, body, created_at) "
@@ -72,23 +118,95 @@ def notify(
             (username, request_id, title, body, datetime.now().isoformat()),
         )
         notification_id = cur.lastrowid
+        cur.execute(_COUNTER_UPSERT, (username, 1))
+        queued = enqueue_email(conn, email, title, body, notification_id=notification_id) if email else None
         conn.commit()
     finally:
         conn.close()
+    _CACHE.invalidate([username])
 
-    if email:
-        _try_send_email(email, title, body)
+    if queued:
+        wake_dispatcher()
 
     return notification_id
 
 
-def list_notifications(username: str, only_unread: bool = False, limit: int = 30) -> List[dict]:
+def notify_many(items: List[dict]) -> List[int]:
+    """Grupna varijanta `notify` za bulk izmjene.
+
+    `items` su dict-ovi sa ključevima kao argumenti `notify`. Notifikacije i
+    outbox redovi se upisuju sa `executemany` u jednoj transakciji.
+    Vraća id-eve notifikacija redom (stavke bez username-a se preskaču).
+    """
+    items = [item for item in items if item.get("username")]
+    if not items:
+        return []
+
+    created_at = datetime.now().isoformat()
+    conn = _get_conn()
+    try:
+        # Write lock od početka: novi id-evi su tada sigurno poslije `before`
+        conn.execute("BEGIN IMMEDIATE")
+        before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO notifications (username, request_id, title, body, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (item["username"], item.get("request_id"), item["title"], item.get("body", ""), created_at)
+                for item in items
+            ],
+        )
+        notification_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM notifications WHERE id > ? ORDER BY id", (before,)
+            ).fetchall()
+        ]
+        per_user: Dict[str, int] = {}
+        for item in items:
+            per_user[item["username"]] = per_user.get(item["username"], 0) + 1
+        conn.executemany(_COUNTER_UPSERT, list(per_user.items()))
+        queued = enqueue_emails(
+            conn,
+            [
+                (item.get("email"), item["title"], item.get("body", ""), notification_id)
+                for item, notification_id in zip(items, notification_ids)
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    _CACHE.invalidate(per_user)
+
+    if queued:
+        wake_dispatcher()
+
+    return notification_ids
+
+
+def list_notifications(
+    username: str,
+    only_unread: bool = False,
+    limit: int = 30,
+    after_id: Optional[int] = None,
+) -> List[dict]:
+    """Notifikacije od najnovije; keyset paginacija preko `after_id`.
+
+    `after_id` je id zadnje prikazane stavke — vraćaju se starije od nje
+    (`id < after_id`), pa dublje stranice ne koštaju OFFSET skeniranje.
+    Prva stranica se kratko kešira.
+    """
     if not username:
         return []
 
+    cache_key = (username, "feed", bool(only_unread), int(limit))
+    if after_id is None:
+        cached = _CACHE.get(cache_key)
+        if cached is not None:
+            return [dict(item) for item in cached]
+
     conn = _get_conn()
     try:
-        _ensure_table(conn)
         cur = conn.cursor()
         query = (
             "SELECT id, request_id, title, body, created_at, read_at "
@@ -97,13 +215,16 @@ def list_notifications(username: str, only_unread: bool = False, limit: int = 30
         params = [username]
         if only_unread:
             query += " AND read_at IS NULL"
+        if after_id is not None:
+            query += " AND id < ?"
+            params.append(int(after_id))
         query += " ORDER BY id DESC LIMIT ?"
         params.append(int(limit))
         rows = cur.execute(query, params).fetchall()
     finally:
         conn.close()
 
-    return [
+    items = [
         {
             "id": row[0],
             "request_id": row[1],
@@ -114,22 +235,29 @@ def list_notifications(username: str, only_unread: bool = False, limit: int = 30
         }
         for row in rows
     ]
+    if after_id is None:
+        _CACHE.put(cache_key, [dict(item) for item in items])
+    return items
 
 
 def unread_count(username: str) -> int:
+    """Broj nepročitanih iz `notification_counters` (keširano, vidi modul)."""
     if not username:
         return 0
+    cached = _CACHE.get((username, "unread"))
+    if cached is not None:
+        return cached
+
     conn = _get_conn()
     try:
-        _ensure_table(conn)
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT COUNT(*) FROM notifications WHERE username = ? AND read_at IS NULL",
-            (username,),
-        )
-        return int(cur.fetchone()[0])
+        row = conn.execute(
+            "SELECT unread FROM notification_counters WHERE username = ?", (username,)
+        ).fetchone()
     finally:
         conn.close()
+    count = int(row[0]) if row else 0
+    _CACHE.put((username, "unread"), count)
+    return count
 
 
 def mark_all_read(username: str) -> int:
@@ -138,41 +266,23 @@ def mark_all_read(username: str) -> int:
     now = datetime.now().isoformat()
     conn = _get_conn()
     try:
-        _ensure_table(conn)
         cur = conn.cursor()
         cur.execute(
             "UPDATE notifications SET read_at = ? WHERE username = ? AND read_at IS NULL",
             (now, username),
         )
+        marked = cur.rowcount
+        cur.execute("UPDATE notification_counters SET unread = 0 WHERE username = ?", (username,))
         conn.commit()
-        return cur.rowcount
     finally:
         conn.close()
+    _CACHE.invalidate([username])
+    return marked
 
 
-def _try_send_email(to_email: str, subject: str, body: str) -> bool:
-    host = os.getenv("SMTP_HOST")
-    port = os.getenv("SMTP_PORT")
-    user = os.getenv("SMTP_USER")
-    password = os.getenv("SMTP_PASSWORD")
-    sender = os.getenv("SMTP_FROM", user)
-
-    if not all([host, port, user, password, sender, to_email]):
-        # SMTP nije konfigurisan — preskačemo tiho (in-app notifikacija je već zabilježena)
-        return False
-
-    try:
-        msg = MIMEText(body or "", "plain", "utf-8")
-        msg["Subject"] = subject
-        msg["From"] = sender
-        msg["To"] = to_email
-
-        with smtplib.SMTP(host, int(port), timeout=8) as server:
-            server.starttls()
-            server.login(user, password)
-            server.sendmail(sender, [to_email], msg.as_string())
-        logger.info("Email sent to=%s subject=%s", to_email, subject)
-        return True
-    except Exception:
-        logger.exception("Email slanje neuspjelo to=%s", to_email)
-        return False
+def invalidate_notification_cache(username: Optional[str] = None) -> None:
+    """Poništi keš za korisnika (ili cijeli keš)."""
+    if username is None:
+        _CACHE.clear()
+    else:
+        _CACHE.invalidate([username])
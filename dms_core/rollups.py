@@ -0,0 +1,455 @@
+"""Inkrementalno održavani KPI rollup-ovi za admin dashboard.
+
+`kpi_rollup_daily` čuva brojače po (dan, kohorta, tip, službenik, metrika),
+a `kpi_request_state` stanje svakog zahtjeva kakvo je uračunato u brojače.
+Pri svakoj promjeni (`create_request`, `_change_status`) računa se razlika
+doprinosa starog i novog stanja i upisuje u ISTOJ transakciji kao i promjena.
+
+Čitanje za dashboard je O(broj bucket-a), a ne O(broj zahtjeva). Overdue
+zavisi od trenutnog vremena pa se i dalje broji direktno iz dms_requests.
+
+Pokretanje iz komandne linije:
+  python -m dms_core.rollups --rebuild   # ponovo izračunaj iz istorije
+  python -m dms_core.rollups --check     # uporedi sa sirovim izračunom
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from dms_core.models import (
+    DmsRequest,
+    KpiRequestState,
+    KpiRollup,
+    RequestStatus,
+    RequestStatusHistory,
+)
+from dms_core.assignment import ACTIVE_STATUS_NAMES, apply_load_delta
+
+
+TREND_METRICS = ("created", "submitted", "completed")
+
+RollupKey = Tuple[str, str, str, str, str]  # bucket_day, cohort_week, request_type, officer, metric
+
+
+def _day(value: Optional[datetime]) -> str:
+    return value.strftime("%Y-%m-%d") if value else ""
+
+
+def _week(value: Optional[datetime]) -> str:
+    return _day(value - timedelta(days=value.weekday())) if value else ""
+
+
+def _contributions(state: Optional[Dict]) -> Dict[RollupKey, Tuple[int, float]]:
+    """Doprinos jednog zahtjeva brojačima (prazno za nepostojeće stanje)."""
+    if not state:
+        return {}
+
+    request_type = state["request_type"]
+    officer = state["officer"]
+    created_at = state["created_at"]
+    submitted_at = state["submitted_at"]
+    completed_at = state["completed_at"]
+    cohort = _week(created_at)
+
+    rows: Dict[RollupKey, Tuple[int, float]] = {
+        ("", "", request_type, officer, f"status:{state['status']}"): (1, 0.0),
+    }
+    if created_at:
+        rows[(_day(created_at), cohort, request_type, officer, "created")] = (1, 0.0)
+    if submitted_at:
+        rows[(_day(submitted_at), cohort, request_type, officer, "submitted")] = (1, 0.0)
+    if completed_at:
+        rows[(_day(completed_at), cohort, request_type, officer, "completed")] = (1, 0.0)
+    if state["status"] == RequestStatus.COMPLETED.name and submitted_at and completed_at:
+        rows[("", "", request_type, officer, "completion_days")] = (1, float((completed_at - submitted_at).days))
+    if submitted_at and state["first_review_at"]:
+        hours = (state["first_review_at"] - submitted_at).total_seconds() / 3600
+        rows[("", "", request_type, officer, "first_review_hours")] = (1, max(hours, 0))
+    if state["had_pending_user"]:
+        rows[("", "", request_type, officer, "pending_user")] = (1, 0.0)
+    return rows
+
+
+def _diff(before: Optional[Dict], after: Optional[Dict]) -> Dict[RollupKey, Tuple[int, float]]:
+    delta: Dict[RollupKey, Tuple[int, float]] = {}
+    for sign, state in ((-1, before), (1, after)):
+        for key, (count, value) in _contributions(state).items():
+            old_count, old_value = delta.get(key, (0, 0.0))
+            delta[key] = (old_count + sign * count, old_value + sign * value)
+    return {key: change for key, change in delta.items() if change != (0, 0.0)}
+
+
+_STATE_FIELDS = (
+    "request_type", "officer", "status", "created_at",
+    "submitted_at", "completed_at", "first_review_at", "had_pending_user",
+)
+
+
+def _state_dict(row: KpiRequestState) -> Dict:
+    return {name: getattr(row, name) for name in _STATE_FIELDS}
+
+
+# ============= INKREMENTALNO ODRŽAVANJE =============
+
+def record_request_change(
+    db,
+    request: DmsRequest,
+    history: Optional[RequestStatusHistory] = None,
+    batch: Optional[Dict[RollupKey, Tuple[int, float]]] = None,
+) -> None:
+    """Uskladi rollup-ove sa trenutnim stanjem zahtjeva (bez commit-a).
+
+    Poziva se prije commit-a promjene, pa rollup i promjena idu u istoj
+    transakciji. `history` je novi unos istorije statusa, ako postoji.
+    Sa `batch` dict-om razlika se samo sabira u njega, a upisuje je
+    `apply_rollup_batch` (bulk izmjene: jedan upsert umjesto N).
+    """
+    if request.id is None:
+        db.flush()
+
+    row = db.get(KpiRequestState, request.id)
+    before = _state_dict(row) if row else None
+
+    first_review_at = before["first_review_at"] if before else None
+    had_pending_user = before["had_pending_user"] if before else False
+    if history is not None:
+        if history.to_status == RequestStatus.UNDER_REVIEW and first_review_at is None:
+            first_review_at = history.changed_at
+        if history.to_status == RequestStatus.PENDING_USER:
+            had_pending_user = True
+
+    after = {
+        "request_type": request.request_type.name,
+        "officer": (request.assigned_to or "").strip(),
+        "status": request.status.name,
+        "created_at": request.created_at,
+        "submitted_at": request.submitted_at,
+        "completed_at": request.completed_at,
+        "first_review_at": first_review_at,
+        "had_pending_user": bool(had_pending_user),
+    }
+    if after == before:
+        return
+
+    if row is None:
+        row = KpiRequestState(request_id=request.id)
+        db.add(row)
+    for name, value in after.items():
+        setattr(row, name, value)
+    if row in db.new:
+        # db.get ne vidi pending objekte; bez flush-a bi druga izmjena istog
+        # zahtjeva unutar no_autoflush bloka (bulk) kreirala duplikat
+        db.flush()
+
+    delta = _diff(before, after)
+    if batch is None:
+        _apply_delta(db, delta)
+        return
+    for key, (count, value) in delta.items():
+        old_count, old_value = batch.get(key, (0, 0.0))
+        batch[key] = (old_count + count, old_value + value)
+
+
+def apply_rollup_batch(db, batch: Dict[RollupKey, Tuple[int, float]]) -> None:
+    """Upiši razlike sabrane kroz `record_request_change(..., batch=...)`."""
+    _apply_delta(db, {key: change for key, change in batch.items() if change != (0, 0.0)})
+    batch.clear()
+
+
+def _apply_delta(db, delta: Dict[RollupKey, Tuple[int, float]]) -> None:
+    if not delta:
+        return
+
+    # Opterećenje službenika = zbir aktivnih status:* doprinosa po službeniku
+    active_metrics = {f"status:{name}" for name in ACTIVE_STATUS_NAMES}
+    load_delta: Dict[str, int] = defaultdict(int)
+    for key, (count, _) in delta.items():
+        if key[3] and key[4] in active_metrics:
+            load_delta[key[3]] += count
+    apply_load_delta(db, load_delta)
+
+    table = KpiRollup.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.bucket_day, table.c.cohort_week, table.c.request_type, table.c.officer, table.c.metric],
+        set_={
+            "count": table.c.count + stmt.excluded.count,
+            "value_sum": table.c.value_sum + stmt.excluded.value_sum,
+        },
+    )
+    db.execute(
+        stmt,
+        [
+            {
+                "bucket_day": key[0],
+                "cohort_week": key[1],
+                "request_type": key[2],
+                "officer": key[3],
+                "metric": key[4],
+                "count": count,
+                "value_sum": value,
+            }
+            for key, (count, value) in delta.items()
+        ],
+    )
+    # Samo ključevi kojima je brojač smanjen mogu pasti na nulu
+    emptied = [
+        {"bucket_day": key[0], "cohort_week": key[1], "request_type": key[2], "officer": key[3], "metric": key[4]}
+        for key, (count, _) in delta.items()
+        if count < 0
+    ]
+    if emptied:
+        db.execute(
+            text(
+                "DELETE FROM kpi_rollup_daily WHERE bucket_day = :bucket_day AND cohort_week = :cohort_week "
+                "AND request_type = :request_type AND officer = :officer AND metric = :metric AND count = 0"
+            ),
+            emptied,
+        )
+
+
+# ============= REBUILD =============
+
+def _parse_dt(value) -> Optional[datetime]:
+    if not value:
+        return None
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> int:
+    """Ponovo izračunaj oba rollup-a iz dms_requests i istorije statusa.
+
+    Radi na DB-API konekciji i NE commit-uje — koristi se kao Backfill korak
+    migracije i iz `rebuild()` (CLI). Vraća broj obrađenih zahtjeva.
+    """
+    rows = conn.execute(
+        """
+        SELECT r.id, r.request_type, r.assigned_to, r.status,
+               r.created_at, r.submitted_at, r.completed_at,
+               fr.first_at, fr.null_count, pu.request_id IS NOT NULL
+        FROM dms_requests r
+        LEFT JOIN (
+            SELECT request_id,
+                   MIN(changed_at) AS first_at,
+                   SUM(CASE WHEN changed_at IS NULL THEN 1 ELSE 0 END) AS null_count
+            FROM request_status_history
+            WHERE to_status = ?
+            GROUP BY request_id
+        ) fr ON fr.request_id = r.id
+        LEFT JOIN (
+            SELECT DISTINCT request_id FROM request_status_history WHERE to_status = ?
+        ) pu ON pu.request_id = r.id
+        """,
+        (RequestStatus.UNDER_REVIEW.name, RequestStatus.PENDING_USER.name),
+    ).fetchall()
+
+    totals: Dict[RollupKey, List] = defaultdict(lambda: [0, 0.0])
+    states = []
+    for (request_id, request_type, assigned_to, status, created_at, submitted_at,
+         completed_at, first_at, null_count, had_pending_user) in rows:
+        state = {
+            "request_type": request_type,
+            "officer": (assigned_to or "").strip(),
+            "status": status,
+            "created_at": _parse_dt(created_at),
+            "submitted_at": _parse_dt(submitted_at),
+            "completed_at": _parse_dt(completed_at),
+            # Prelaz bez changed_at: isto kao sirovi KPI, zahtjev nije uzorak
+            "first_review_at": None if null_count else _parse_dt(first_at),
+            "had_pending_user": bool(had_pending_user),
+        }
+        for key, (count, value) in _contributions(state).items():
+            totals[key][0] += count
+            totals[key][1] += value
+        states.append((
+            request_id, state["request_type"], state["officer"], state["status"],
+            created_at, submitted_at, completed_at,
+            None if null_count else first_at, int(state["had_pending_user"]),
+        ))
+
+    conn.execute("DELETE FROM kpi_rollup_daily")
+    conn.execute("DELETE FROM kpi_request_state")
+    conn.executemany(
+        "INSERT INTO kpi_rollup_daily (bucket_day, cohort_week, request_type, officer, metric, count, value_sum) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [key + (count, value) for key, (count, value) in totals.items()],
+    )
+    conn.executemany(
+        "INSERT INTO kpi_request_state (request_id, request_type, officer, status, created_at, "
+        "submitted_at, completed_at, first_review_at, had_pending_user) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        states,
+    )
+    return len(states)
+
+
+def rebuild(engine=None) -> int:
+    """Rebuild u jednoj transakciji na zasebnoj konekciji."""
+    if engine is None:
+        from dms_core.models import engine
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = rebuild_rollups(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+    finally:
+        raw.close()
+
+
+# ============= ČITANJE ZA DASHBOARD =============
+
+def _metric_totals(db) -> Dict[str, Tuple[int, float]]:
+    rows = (
+        db.query(KpiRollup.metric, func.sum(KpiRollup.count), func.sum(KpiRollup.value_sum))
+        .group_by(KpiRollup.metric)
+        .all()
+    )
+    return {metric: (int(count or 0), float(value or 0.0)) for metric, count, value in rows}
+
+
+def _count_overdue(db) -> int:
+    return db.query(func.count(DmsRequest.id)).filter(
+        DmsRequest.estimated_completion < datetime.now(),
+        DmsRequest.status != RequestStatus.COMPLETED,
+        DmsRequest.status != RequestStatus.REJECTED,
+    ).scalar()
+
+
+def rollup_statistics(db) -> Dict:
+    """Isti rezultat kao DmsManager.get_statistics, iz rollup-a."""
+    totals = _metric_totals(db)
+    statuses = {status.value: totals.get(f"status:{status.name}", (0, 0.0))[0] for status in RequestStatus}
+    completed_count, completed_days = totals.get("completion_days", (0, 0.0))
+    return {
+        "total_requests": sum(statuses.values()),
+        "by_status": statuses,
+        "avg_completion_days": completed_days / completed_count if completed_count else 0,
+        "overdue_count": _count_overdue(db),
+    }
+
+
+def rollup_kpi_metrics(db) -> Dict:
+    """Isti rezultat kao DmsManager.get_kpi_metrics, iz rollup-a."""
+    totals = _metric_totals(db)
+    total = sum(count for metric, (count, _) in totals.items() if metric.startswith("status:"))
+    submitted = totals.get("submitted", (0, 0.0))[0]
+    completed = totals.get(f"status:{RequestStatus.COMPLETED.name}", (0, 0.0))[0]
+    pending_user = totals.get("pending_user", (0, 0.0))[0]
+    review_count, review_hours = totals.get("first_review_hours", (0, 0.0))
+
+    return {
+        "total_requests": total,
+        "submitted_requests": submitted,
+        "completed_requests": completed,
+        "overdue_requests": _count_overdue(db),
+        "avg_first_review_hours": round(review_hours / review_count, 2) if review_count else 0,
+        "completion_rate_percent": round((completed / submitted) * 100, 2) if submitted else 0,
+        "correction_rate_percent": round((pending_user / submitted) * 100, 2) if submitted else 0,
+    }
+
+
+def rollup_weekly_trends(db, weeks: int = 8) -> List[Dict]:
+    """Isti rezultat kao DmsManager.get_weekly_trends, iz dnevnih bucket-a."""
+    weeks = max(2, min(weeks, 26))
+    now = datetime.now()
+    current_week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_week_start = current_week_start - timedelta(days=7 * (weeks - 1))
+    first_day = _day(first_week_start)
+
+    buckets = {}
+    for idx in range(weeks):
+        label = _day(first_week_start + timedelta(days=7 * idx))
+        buckets[label] = {"week": label, "created": 0, "submitted": 0, "completed": 0}
+
+    # Kao i sirovi izračun: samo zahtjevi kreirani unutar prozora (kohorta)
+    rows = (
+        db.query(KpiRollup.bucket_day, KpiRollup.metric, func.sum(KpiRollup.count))
+        .filter(
+            KpiRollup.metric.in_(TREND_METRICS),
+            KpiRollup.bucket_day >= first_day,
+            KpiRollup.cohort_week >= first_day,
+        )
+        .group_by(KpiRollup.bucket_day, KpiRollup.metric)
+        .all()
+    )
+    for bucket_day, metric, count in rows:
+        label = _week(datetime.strptime(bucket_day, "%Y-%m-%d"))
+        if label in buckets:
+            buckets[label][metric] += int(count or 0)
+
+    return [buckets[key] for key in sorted(buckets.keys())]
+
+
+# ============= PROVJERA KONZISTENTNOSTI =============
+
+def check_consistency(db, weeks: int = 8, tolerance: float = 0.01) -> List[str]:
+    """Uporedi rollup čitanja sa sirovim izračunom DmsManager-a.
+
+    Vraća listu razlika (prazna lista = konzistentno).
+    """
+    from dms_core.manager import DmsManager
+
+    manager = DmsManager(db)
+    pairs = [
+        ("statistics", manager.get_statistics(), rollup_statistics(db)),
+        ("kpi_metrics", manager.get_kpi_metrics(), rollup_kpi_metrics(db)),
+        ("weekly_trends", manager.get_weekly_trends(weeks=weeks), rollup_weekly_trends(db, weeks=weeks)),
+    ]
+
+    problems = []
+
+    def compare(path, raw, rolled):
+        if isinstance(raw, dict) and isinstance(rolled, dict):
+            for key in sorted(set(raw) | set(rolled)):
+                compare(f"{path}.{key}", raw.get(key), rolled.get(key))
+        elif isinstance(raw, list) and isinstance(rolled, list) and len(raw) == len(rolled):
+            for idx, (left, right) in enumerate(zip(raw, rolled)):
+                compare(f"{path}[{idx}]", left, right)
+        elif isinstance(raw, (int, float)) and isinstance(rolled, (int, float)):
+            if abs(raw - rolled) > tolerance:
+                problems.append(f"{path}: sirovo={raw} rollup={rolled}")
+        elif raw != rolled:
+            problems.append(f"{path}: sirovo={raw!r} rollup={rolled!r}")
+
+    for name, raw, rolled in pairs:
+        compare(name, raw, rolled)
+    return problems
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dms_core.models import SessionLocal
+
+    parser = argparse.ArgumentParser(description="KPI rollup tabele DMS baze")
+    parser.add_argument("--rebuild", action="store_true", help="ponovo izračunaj iz istorije")
+    parser.add_argument("--check", action="store_true", help="uporedi sa sirovim izračunom")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        print(f"[OK] Rollup obnovljen za {rebuild()} zahtjeva")
+    if args.check or not args.rebuild:
+        session = SessionLocal()
+        try:
+            problems = check_consistency(session)
+        finally:
+            session.close()
+        for problem in problems:
+            print(f"[RAZLIKA] {problem}")
+        if not problems:
+            print("[OK] Rollup je konzistentan sa sirovim izračunom")
+        raise SystemExit(1 if problems else 0)
@@ -6,6 +6,15 @@ Kreira PDF (ako je reportlab dostupan) ili HTML fallback fajl sa:
   - Blokom za potpis službenika (ime, vrijeme, hash)
   - "Kvalifikovani elektronski potpis (demo)" oznakom
 
+Dokument se piše kroz `HashingWriter`: SHA-256 se računa dok bajtovi idu
+na disk (bez ponovnog čitanja fajla), u privremeni fajl koji se na kraju
+atomski preimenuje. Bez kopije cijelog dokumenta u memoriji piše se samo
+HTML fallback; reportlab (`SimpleDocTemplate.build`) cijeli PDF sklopi u
+memoriji i preda ga jednim `write()`-om. Za rješenje od jedne strane to je
+nekoliko KB, a hash i atomski upis važe i tada. Opciono (`content_addressed=True` ili env
+DMS_DECISIONS_CAS=1) fajl se smješta po hash-u:
+documents/decisions/sha256/ab/<hash>.pdf.
+
 NIJE pravi digitalni potpis — služi samo za demonstraciju procesa.
 """
 
@@ -13,9 +22,15 @@ from __future__ import annotations
 
 import hashlib
 import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Tuple
+from types import SimpleNamespace
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,19 +40,82 @@ DECISIONS_DIR.mkdir(parents=True, exist_ok=True)
 logger = logging.getLogger("dms_portal.signature")
 
 
-def _content_hash(content: bytes) -> str:
-    return hashlib.sha256(content).hexdigest()
+def _cas_enabled() -> bool:
+    return os.getenv("DMS_DECISIONS_CAS", "0").strip().lower() in ("1", "true", "yes", "on")
 
 
-def _try_generate_pdf(
-    output_path: Path,
-    request_id: int,
-    request_type: str,
-    citizen_name: str,
-    officer_name: str,
-    decision_text: str,
-    issued_at: str,
-) -> bool:
+class HashingWriter:
+    """Fajl-objekat koji računa SHA-256 dok piše u privremeni fajl.
+
+    `commit()` atomski preimenuje privremeni fajl u konačnu putanju (ili u
+    content-addressed putanju ispod `cas_dir`); `discard()` ga briše. Kao
+    context manager: izuzetak unutar bloka → discard.
+    """
+
+    def __init__(self, target: Path, cas_dir: Optional[Path] = None):
+        self.target = Path(target)
+        self.cas_dir = Path(cas_dir) if cas_dir else None
+        tmp_dir = self.cas_dir or self.target.parent
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = tmp_dir / f".{self.target.name}.{os.getpid()}.{id(self):x}.tmp"
+        self._file: Optional[BinaryIO] = open(self._tmp_path, "wb")
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.path: Optional[Path] = None
+        self.created = False  # commit je upisao novi fajl (nije zatekao isti u CAS-u)
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def commit(self) -> Tuple[Path, str]:
+        """Zatvori, preimenuj na konačno mjesto i vrati (putanja, hash)."""
+        sig_hash = self.hexdigest()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self.cas_dir:
+            final = self.cas_dir / sig_hash[:2] / f"{sig_hash}{self.target.suffix}"
+            final.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            final = self.target
+        # Isti sadržaj u CAS-u je već tu — ne prepisujemo ga.
+        if self.cas_dir and final.exists():
+            self._tmp_path.unlink()
+        else:
+            os.replace(self._tmp_path, final)
+            self.created = True
+        self.path = final
+        return final, sig_hash
+
+    def discard(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "HashingWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None or self.path is None:
+            self.discard()
+
+
+@lru_cache(maxsize=1)
+def _pdf_kit() -> Optional[SimpleNamespace]:
+    """reportlab moduli i stilovi, jednom po procesu (None bez reportlab-a).
+
+    Batch render i worker procesi tako ne grade stylesheet za svaki PDF.
+    """
     try:
         from reportlab.lib.pagesizes import A4
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -47,18 +125,51 @@ def _try_generate_pdf(
         )
         from reportlab.lib import colors
     except ImportError:
+        return None
+
+    styles = getSampleStyleSheet()
+    return SimpleNamespace(
+        A4=A4,
+        cm=cm,
+        SimpleDocTemplate=SimpleDocTemplate,
+        Paragraph=Paragraph,
+        Spacer=Spacer,
+        Table=Table,
+        title_style=ParagraphStyle(
+            "Title", parent=styles["Title"], fontSize=14, alignment=1, spaceAfter=12,
+        ),
+        body_style=ParagraphStyle("Body", parent=styles["BodyText"], fontSize=11, leading=15),
+        small_style=ParagraphStyle("Small", parent=styles["BodyText"], fontSize=9, textColor=colors.grey),
+        sig_table_style=TableStyle(
+            [
+                ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
+                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
+                ("FONTSIZE", (0, 0), (-1, -1), 10),
+                ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
+            ]
+        ),
+    )
+
+
+def _try_generate_pdf(
+    output: BinaryIO,
+    request_id: int,
+    request_type: str,
+    citizen_name: str,
+    officer_name: str,
+    decision_text: str,
+    issued_at: str,
+) -> bool:
+    kit = _pdf_kit()
+    if kit is None:
         return False
 
     try:
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            "Title", parent=styles["Title"], fontSize=14, alignment=1, spaceAfter=12,
-        )
-        body_style = ParagraphStyle("Body", parent=styles["BodyText"], fontSize=11, leading=15)
-        small_style = ParagraphStyle("Small", parent=styles["BodyText"], fontSize=9, textColor=colors.grey)
+        cm, Paragraph, Spacer = kit.cm, kit.Paragraph, kit.Spacer
+        title_style, body_style = kit.title_style, kit.body_style
 
-        doc = SimpleDocTemplate(
-            str(output_path), pagesize=A4,
+        doc = kit.SimpleDocTemplate(
+            output, pagesize=kit.A4,
             leftMargin=2 * cm, rightMargin=2 * cm,
             topMargin=2 * cm, bottomMargin=2 * cm,
         )
@@ -77,7 +188,7 @@ def _try_generate_pdf(
             Spacer(1, 1 * cm),
         ]
 
-        sig_table = Table(
+        sig_table = kit.Table(
             [
                 ["Službenik:", officer_name],
                 ["Datum potpisa:", issued_at],
@@ -85,26 +196,18 @@ def _try_generate_pdf(
             ],
             colWidths=[4 * cm, 11 * cm],
         )
-        sig_table.setStyle(
-            TableStyle(
-                [
-                    ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
-                    ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
-                    ("FONTSIZE", (0, 0), (-1, -1), 10),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
-                ]
-            )
-        )
+        sig_table.setStyle(kit.sig_table_style)
         story.append(sig_table)
         story.append(Spacer(1, 0.6 * cm))
         story.append(
             Paragraph(
                 "Ovaj dokument je generisan elektronski u okviru diplomskog DMS prototipa. "
                 "Integritet je obezbijeđen SHA-256 sažetkom u dnu strane.",
-                small_style,
+                kit.small_style,
             )
         )
 
+        # reportlab sklapa cijeli PDF u memoriji i upisuje ga jednim write()-om
         doc.build(story)
         return True
     except Exception:
@@ -113,7 +216,7 @@ def _try_generate_pdf(
 
 
 def _render_html_fallback(
-    output_path: Path,
+    output: BinaryIO,
     request_id: int,
     request_type: str,
     citizen_name: str,
@@ -154,7 +257,7 @@ def _render_html_fallback(
 </body>
 </html>
 """
-    output_path.write_text(content, encoding="utf-8")
+    output.write(content.encode("utf-8"))
 
 
 def generate_signed_decision(
@@ -163,23 +266,65 @@ def generate_signed_decision(
     citizen_name: str,
     officer_name: str,
     decision_text: str,
+    output_dir: Optional[Path] = None,
+    content_addressed: Optional[bool] = None,
 ) -> Tuple[str, str]:
     """Generiše potpisano rješenje. Vraća (file_path, sha256_hash)."""
     issued_at = datetime.now().strftime("%d.%m.%Y %H:%M")
+    output_dir = Path(output_dir) if output_dir else DECISIONS_DIR
+    if content_addressed is None:
+        content_addressed = _cas_enabled()
+    cas_dir = output_dir / "sha256" if content_addressed else None
+    args = (request_id, request_type, citizen_name, officer_name, decision_text, issued_at)
 
-    pdf_path = DECISIONS_DIR / f"rjesenje_{request_id}.pdf"
-    ok = _try_generate_pdf(
-        pdf_path, request_id, request_type, citizen_name, officer_name, decision_text, issued_at
-    )
-
-    if ok and pdf_path.exists():
-        content = pdf_path.read_bytes()
-        return str(pdf_path), _content_hash(content)
+    with HashingWriter(output_dir / f"rjesenje_{request_id}.pdf", cas_dir) as writer:
+        if _try_generate_pdf(writer, *args):
+            path, sig_hash = writer.commit()
+            return str(path), sig_hash
 
     # Fallback: HTML
-    html_path = DECISIONS_DIR / f"rjesenje_{request_id}.html"
-    _render_html_fallback(
-        html_path, request_id, request_type, citizen_name, officer_name, decision_text, issued_at
-    )
-    content = html_path.read_bytes()
-    return str(html_path), _content_hash(content)
+    with HashingWriter(output_dir / f"rjesenje_{request_id}.html", cas_dir) as writer:
+        _render_html_fallback(writer, *args)
+        path, sig_hash = writer.commit()
+    return str(path), sig_hash
+
+
+DecisionOutcome = Tuple[Optional[Tuple[str, str]], Optional[str]]
+
+
+def _render_safely(payload: Dict) -> DecisionOutcome:
+    try:
+        return generate_signed_decision(**payload), None
+    except Exception as exc:
+        logger.exception("Generisanje rješenja neuspjelo request_id=%s", payload.get("request_id"))
+        return None, str(exc) or exc.__class__.__name__
+
+
+def render_decision_chunk(payloads: List[Dict]) -> List[DecisionOutcome]:
+    """Renderuje seriju rješenja u jednom procesu; vraća (rezultat, greška) po stavci."""
+    return [_render_safely(payload) for payload in payloads]
+
+
+def generate_signed_decisions(
+    requests: Iterable[Dict],
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> List[Optional[Tuple[str, str]]]:
+    """Batch varijanta `generate_signed_decision`.
+
+    `requests` su rječnici sa argumentima za `generate_signed_decision`.
+    Stilovi se grade jednom po procesu, a serije idu na pool od `workers`
+    procesa (podrazumijevano broj CPU-a; 0/1 = serijski u ovom procesu).
+    Vraća (file_path, hash) po zahtjevu, redom, ili None ako render nije uspio.
+    """
+    payloads = list(requests)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers <= 1 or len(payloads) <= 1:
+        outcomes = render_decision_chunk(payloads)
+    else:
+        chunk_size = chunk_size or max(1, math.ceil(len(payloads) / (workers * 4)))
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            outcomes = list(pool.map(_render_safely, payloads, chunksize=chunk_size))
+    return [result for result, _ in outcomes]
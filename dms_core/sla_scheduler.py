@@ -0,0 +1,183 @@
+"""Periodična SLA eskalacija bez klika administratora.
+
+Svaki proces aplikacije može pokrenuti `SlaScheduler`, ali posao u jednom
+intervalu radi samo proces koji drži lease red (`scheduler_leases`, ime
+SLA_LEASE). Lease se uzima atomskim upsert-om koji uspijeva samo ako je
+prethodni istekao ili je već naš, i važi do sljedećeg tick-a — ostali
+procesi do tada preskaču. Ako vlasnik padne, lease ističe i preuzima ga
+prvi sljedeći proces.
+
+Sama eskalacija je `DmsManager.apply_sla_escalation` (dva set-based
+UPDATE-a + `sla_escalation_log` + preračun inbox score-a).
+
+Podešavanja preko env varijabli:
+  DMS_SLA_INTERVAL_S (300; 0 isključuje pozadinski thread)
+
+Pokretanje iz komandne linije:
+  python -m dms_core.sla_scheduler --once        # jedan tick (poštuje lease)
+  python -m dms_core.sla_scheduler               # radi u petlji, npr. kao servis
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import DateTime, bindparam, text
+
+from dms_core.manager import DmsManager
+from dms_core.models import SchedulerLease, SessionLocal
+
+
+logger = logging.getLogger("dms_portal.sla")
+
+SLA_LEASE = "sla_escalation"
+DEFAULT_INTERVAL_S = 300
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def acquire_lease(db, name: str, owner: str, ttl_s: float, now: Optional[datetime] = None) -> bool:
+    """Uzmi ili produži lease; False ako ga drugi proces drži i nije istekao. Commit-uje."""
+    now = now or datetime.now()
+    expires_at = now + timedelta(seconds=ttl_s)
+    db.execute(
+        text(
+            "INSERT INTO scheduler_leases (name, owner, expires_at) VALUES (:name, :owner, :expires_at) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE scheduler_leases.owner = excluded.owner OR scheduler_leases.expires_at <= :now"
+        ).bindparams(bindparam("expires_at", type_=DateTime), bindparam("now", type_=DateTime)),
+        {"name": name, "owner": owner, "expires_at": expires_at, "now": now},
+    )
+    db.commit()
+    lease = db.get(SchedulerLease, name, populate_existing=True)
+    return lease is not None and lease.owner == owner
+
+
+def release_lease(db, name: str, owner: str) -> None:
+    """Otpusti lease (samo ako je naš), da ga drugi proces preuzme odmah."""
+    db.execute(
+        text("DELETE FROM scheduler_leases WHERE name = :name AND owner = :owner"),
+        {"name": name, "owner": owner},
+    )
+    db.commit()
+
+
+def last_sla_run(db) -> Optional[datetime]:
+    lease = db.get(SchedulerLease, SLA_LEASE)
+    return lease.last_run_at if lease else None
+
+
+class SlaScheduler:
+    """Pozadinski thread koji na svaki interval pokušava SLA tick."""
+
+    def __init__(
+        self,
+        interval_s: Optional[float] = None,
+        session_factory: Callable = SessionLocal,
+        owner: Optional[str] = None,
+    ):
+        self.interval_s = _env_int("DMS_SLA_INTERVAL_S", DEFAULT_INTERVAL_S) if interval_s is None else interval_s
+        self.session_factory = session_factory
+        self.owner = owner or default_owner()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[datetime] = None) -> Optional[Dict]:
+        """Jedan tick: eskalacija ako smo dobili lease, inače None."""
+        now = now or datetime.now()
+        db = self.session_factory()
+        try:
+            if not acquire_lease(db, SLA_LEASE, self.owner, self.interval_s or DEFAULT_INTERVAL_S, now=now):
+                return None
+            result = DmsManager(db).apply_sla_escalation(now=now, run_by=self.owner)
+            lease = db.get(SchedulerLease, SLA_LEASE)
+            if lease is not None and lease.owner == self.owner:
+                lease.last_run_at = now
+                db.commit()
+            return result
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("SLA eskalacija neuspjela")
+            self._stop.wait(self.interval_s or DEFAULT_INTERVAL_S)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sla-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        db = self.session_factory()
+        try:
+            release_lease(db, SLA_LEASE, self.owner)
+        finally:
+            db.close()
+
+
+_SCHEDULER_LOCK = threading.Lock()
+_SCHEDULER: Optional[SlaScheduler] = None
+
+
+def start_sla_scheduler() -> Optional[SlaScheduler]:
+    """Pokreće procesni scheduler (idempotentno); None ako je interval 0."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            if _env_int("DMS_SLA_INTERVAL_S", DEFAULT_INTERVAL_S) <= 0:
+                return None
+            _SCHEDULER = SlaScheduler()
+        _SCHEDULER.start()
+        return _SCHEDULER
+
+
+def stop_sla_scheduler() -> None:
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        scheduler, _SCHEDULER = _SCHEDULER, None
+    if scheduler is not None:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Periodična SLA eskalacija")
+    parser.add_argument("--once", action="store_true", help="jedan tick pa izlaz")
+    parser.add_argument("--interval", type=int, default=None, help="sekundi između tick-ova (default iz env-a)")
+    args = parser.parse_args()
+
+    scheduler = SlaScheduler(interval_s=args.interval)
+    if args.once:
+        print(scheduler.run_once() or "Lease drži drugi proces; preskačem.")
+    else:
+        logging.basicConfig(level=logging.INFO)
+        try:
+            scheduler._run()
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,160 @@
+"""Prijem dokumenata uz zahtjev: čitanje u komadima, provjera potpisa, CAS.
+
+Upload se nikad ne kopira cijeli u memoriju:
+  - tip se provjerava iz prvih bajtova (magic header), ne iz cijelog sadržaja
+  - sadržaj se čita u komadima (CHUNK_SIZE) i kroz `HashingWriter` piše u
+    privremeni fajl, uz SHA-256 u istom prolazu, pa se atomski preimenuje
+  - blob se čuva po hash-u (documents/blobs/ab/<hash>.pdf), pa isti sken
+    lične karte uploadovan na više zahtjeva zauzima disk samo jednom
+  - blob se upisuje prije transakcije podnošenja; ako ona ne uspije,
+    `discard_unreferenced` briše blobove koje je ovo podnošenje napravilo,
+    a na koje ne pokazuje nijedan red `request_documents`. Provjera i
+    brisanje idu pod write lock-om DMS baze, a `DmsManager.add_documents`
+    pod istim lock-om provjerava da blob postoji — drugo podnošenje istog
+    sadržaja ili zadrži blob, ili padne prije commit-a (nikad red bez fajla)
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+from dms_core.signature import HashingWriter
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BLOBS_DIR = BASE_DIR / "documents" / "blobs"
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+_SIGNATURES = {
+    ".pdf": b"%PDF",
+    ".jpg": b"\xff\xd8\xff",
+    ".jpeg": b"\xff\xd8\xff",
+    ".png": b"\x89PNG\r\n\x1a\n",
+}
+ALLOWED_EXTENSIONS = set(_SIGNATURES)
+_HEADER_BYTES = max(len(magic) for magic in _SIGNATURES.values())
+
+logger = logging.getLogger("dms_portal.uploads")
+
+
+class UploadRejected(ValueError):
+    """Upload ne zadovoljava pravila (tip, veličina, sadržaj)."""
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    name: str
+    path: str
+    sha256: str
+    size: int
+    created: bool = False  # blob je nov (nije već bio u skladištu)
+
+
+def is_allowed_signature(file_name: str, head: bytes) -> bool:
+    magic = _SIGNATURES.get(Path(file_name).suffix.lower())
+    return bool(magic) and head.startswith(magic)
+
+
+def _read_head(fileobj: BinaryIO) -> bytes:
+    fileobj.seek(0)
+    head = fileobj.read(_HEADER_BYTES)
+    fileobj.seek(0)
+    return head
+
+
+def validate_upload(uploaded_file, max_bytes: int = MAX_UPLOAD_BYTES) -> Optional[str]:
+    """Provjera prije podnošenja; čita samo zaglavlje fajla. Vraća poruku ili None."""
+    name = uploaded_file.name
+    if Path(name).suffix.lower() not in ALLOWED_EXTENSIONS:
+        return f"Datoteka '{name}' nije dozvoljenog tipa."
+
+    size = int(uploaded_file.size or 0)
+    if size <= 0:
+        return f"Datoteka '{name}' je prazna."
+    if size > max_bytes:
+        return f"Datoteka '{name}' prelazi limit od {max_bytes // (1024 * 1024)} MB."
+
+    if not is_allowed_signature(name, _read_head(uploaded_file)):
+        return f"Datoteka '{name}' nema validan format sadrzaja."
+    return None
+
+
+def ingest_upload(
+    fileobj: BinaryIO,
+    name: str,
+    blobs_dir: Optional[Path] = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = CHUNK_SIZE,
+) -> StoredUpload:
+    """Upiše upload u content-addressed skladište i vrati putanju, hash i veličinu.
+
+    Potpis i veličina se provjeravaju u toku čitanja; ako pravilo padne,
+    privremeni fajl se briše i diže se `UploadRejected`.
+    """
+    if not is_allowed_signature(name, _read_head(fileobj)):
+        raise UploadRejected(f"Datoteka '{name}' nema validan format sadrzaja.")
+
+    blobs_dir = Path(blobs_dir) if blobs_dir else BLOBS_DIR
+    suffix = Path(name).suffix.lower()
+    with HashingWriter(blobs_dir / f"upload{suffix}", cas_dir=blobs_dir) as writer:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            if writer.size + len(chunk) > max_bytes:
+                raise UploadRejected(f"Datoteka '{name}' prelazi dozvoljenu veličinu.")
+            writer.write(chunk)
+        if writer.size == 0:
+            raise UploadRejected(f"Datoteka '{name}' je prazna.")
+        path, sha256 = writer.commit()
+
+    logger.info("Upload sačuvan name=%s hash=%s size=%s", name, sha256[:16], writer.size)
+    return StoredUpload(name=name, path=str(path), sha256=sha256, size=writer.size, created=writer.created)
+
+
+def discard_unreferenced(db, uploads: Iterable[StoredUpload]) -> int:
+    """Obriši nove blobove na koje ne pokazuje nijedan dokument; vraća broj obrisanih.
+
+    Poziva se nakon neuspjelog podnošenja (poslije rollback-a). Blobovi koji
+    su već bili u skladištu pripadaju drugim zahtjevima i ne diraju se.
+    Provjera referenci i brisanje su u jednoj BEGIN IMMEDIATE transakciji.
+    """
+    created = {upload.sha256: upload.path for upload in uploads if upload.created}
+    if not created:
+        return 0
+    raw = db.get_bind().raw_connection()
+    removed = 0
+    try:
+        conn = raw.driver_connection
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ", ".join("?" for _ in created)
+            referenced = {
+                row[0]
+                for row in conn.execute(
+                    f"SELECT DISTINCT sha256 FROM request_documents WHERE sha256 IN ({placeholders})",
+                    list(created),
+                )
+            }
+            for sha256, path in created.items():
+                if sha256 in referenced:
+                    continue
+                try:
+                    Path(path).unlink(missing_ok=True)
+                    removed += 1
+                except OSError:
+                    logger.warning("Blob nije obrisan path=%s", path, exc_info=True)
+        finally:
+            conn.execute("COMMIT")
+    finally:
+        raw.close()
+    if removed:
+        logger.info("Obrisano %s blobova neuspjelog podnošenja", removed)
+    return removed
@@ -11,7 +11,12 @@ import streamlit as st
 from database.database import validate_user_session
 from database.database import get_staff_usernames
 from dms_core import DmsManager, RequestStatus, RequestType, RequestPriority
+from dms_core.assignment import get_officer_profiles, set_officer_profile
+from dms_core.answer_cache import answer_cache_stats, invalidate_answer_cache
+from dms_core.decision_jobs import PENDING_STATUSES, STATUS_FAILED, requeue_decision
 from dms_core.models import DmsRequest, SessionLocal
+from dms_core.sla_scheduler import last_sla_run
+from dms_core.rollups import rollup_kpi_metrics, rollup_statistics, rollup_weekly_trends
 from permissions import Role, get_effective_role, has_admin_access
 
 
@@ -225,6 +230,92 @@ def _request_option_label(req: DmsRequest) -> str:
     return f"#{req.id} | {req.request_type.value} | {req.user_id} | {req.status.value}"
 
 
+QUEUE_PAGE_SIZE = 50
+_QUEUE_SORT_LABELS = {
+    "oldest": "Najstariji prvo",
+    "newest": "Najnoviji prvo",
+    "deadline": "Najbliži rok",
+}
+_ACTIVE_STATUSES = [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER]
+
+
+def _render_queue_filters(key: str, staff_options) -> dict:
+    """Filteri aktivnog reda; vraća argumente za `DmsManager.query_queue`."""
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        statuses = st.multiselect(
+            "Status",
+            options=_ACTIVE_STATUSES,
+            default=_ACTIVE_STATUSES,
+            format_func=_status_label,
+            key=f"{key}_statuses",
+        )
+        sort = st.selectbox(
+            "Redoslijed",
+            options=list(_QUEUE_SORT_LABELS),
+            format_func=_QUEUE_SORT_LABELS.get,
+            key=f"{key}_sort",
+        )
+    with c2:
+        request_type = st.selectbox(
+            "Tip",
+            options=[None] + list(RequestType),
+            format_func=lambda value: "Svi" if value is None else value.value,
+            key=f"{key}_type",
+        )
+        priority = st.selectbox(
+            "Prioritet",
+            options=[None] + list(RequestPriority),
+            format_func=lambda value: "Svi" if value is None else value.value,
+            key=f"{key}_priority",
+        )
+    with c3:
+        assignee = st.selectbox(
+            "Službenik",
+            options=["Svi", "(nedodijeljeni)"] + list(staff_options),
+            key=f"{key}_assignee",
+        )
+        city = st.text_input("Opština", key=f"{key}_city").strip()
+    with c4:
+        overdue = st.checkbox("Samo kasne", key=f"{key}_overdue")
+
+    return {
+        "sort": sort,
+        "statuses": statuses or _ACTIVE_STATUSES,
+        "request_type": request_type,
+        "priority": priority,
+        "assigned_to": assignee if assignee not in ("Svi", "(nedodijeljeni)") else None,
+        "unassigned": assignee == "(nedodijeljeni)",
+        "city": city or None,
+        "overdue": overdue,
+    }
+
+
+def _queue_page(dms: DmsManager, key: str, query: dict) -> list:
+    """Jedna stranica reda; kursori prethodnih stranica čuvaju se u session_state."""
+    signature = repr(sorted(query.items(), key=lambda item: item[0]))
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    page = dms.query_queue(after=cursors[-1], limit=QUEUE_PAGE_SIZE, **query)
+    filters = {name: value for name, value in query.items() if name != "sort"}
+
+    nav1, nav2, nav3 = st.columns([1, 3, 1])
+    with nav1:
+        if len(cursors) > 1 and st.button("← Prethodna", key=f"{key}_prev"):
+            cursors.pop()
+            st.rerun()
+    with nav2:
+        st.caption(f"Stranica {len(cursors)} · ukupno predmeta: {dms.count_queue(**filters)}")
+    with nav3:
+        if page["next_cursor"] is not None and st.button("Sljedeća →", key=f"{key}_next"):
+            cursors.append(page["next_cursor"])
+            st.rerun()
+    return page["items"]
+
+
 def _render_officer_view() -> None:
     """Pojednostavljen panel za officers — vide samo svoje dodijeljene predmete."""
     st.title("Officer panel")
@@ -250,9 +341,10 @@ def _render_officer_view() -> None:
                 _render_request_detail(chosen, dms)
 
         with tab_all:
-            active = dms.get_active_requests()
+            query = _render_queue_filters("officer_queue", get_staff_usernames())
+            active = _queue_page(dms, "officer_queue", query)
             if not active:
-                st.info("Nema aktivnih zahtjeva u sistemu.")
+                st.info("Nema aktivnih zahtjeva za odabrane filtere.")
             else:
                 for req in active:
                     assigned = req.assigned_to or "—"
@@ -293,18 +385,22 @@ def admin_dashboard() -> None:
             action_col1, action_col2 = st.columns(2)
             with action_col1:
                 if st.button("Primijeni SLA eskalaciju", key="sla_escalation_btn"):
-                    result = dms.apply_sla_escalation()
+                    result = dms.apply_sla_escalation(run_by=st.session_state.user)
                     if result["escalated"]:
                         st.warning(f"Eskalirano predmeta: {result['escalated']}")
                     else:
                         st.info("Nema novih SLA eskalacija.")
+                last_run = last_sla_run(db)
+                st.caption(
+                    f"Automatska eskalacija: {last_run:%d.%m.%Y %H:%M}" if last_run else "Automatska eskalacija još nije radila."
+                )
             with action_col2:
                 if st.button("Generisi demo predmete", key="seed_demo_requests_dashboard"):
                     result = _seed_demo_requests(dms, st.session_state.user)
                     st.success(f"Generisano demo predmeta: {result['created']}")
                     st.rerun()
 
-            kpis = dms.get_kpi_metrics()
+            kpis = rollup_kpi_metrics(db)
             kc1, kc2, kc3, kc4 = st.columns(4)
             kc1.metric("Ukupno zahtjeva", kpis["total_requests"])
             kc2.metric("Prosjek prve obrade (h)", kpis["avg_first_review_hours"])
@@ -312,14 +408,14 @@ def admin_dashboard() -> None:
             kc4.metric("Stopa vracanja", f"{kpis['correction_rate_percent']}%")
 
             st.markdown("### KPI trendovi (nedeljno)")
-            trends = dms.get_weekly_trends(weeks=8)
+            trends = rollup_weekly_trends(db, weeks=8)
             trends_df = pd.DataFrame(trends)
             if not trends_df.empty:
                 st.dataframe(trends_df, use_container_width=True)
                 chart_df = trends_df.set_index("week")[["created", "submitted", "completed"]]
                 st.line_chart(chart_df)
 
-            stats = dms.get_statistics()
+            stats = rollup_statistics(db)
             c1, c2, c3, c4 = st.columns(4)
             c1.metric("Ukupno", stats["total_requests"])
             c2.metric("Podneseni", stats["by_status"].get("submitted", 0))
@@ -338,7 +434,6 @@ def admin_dashboard() -> None:
                 st.success("Nema prekoračenih rokova.")
 
             st.markdown("### Prioritetni inbox")
-            inbox = dms.get_priority_inbox(pending_user_days=3)
             f1, f2, f3 = st.columns(3)
             with f1:
                 only_overdue = st.checkbox("Samo kasni", key="inbox_only_overdue")
@@ -347,15 +442,12 @@ def admin_dashboard() -> None:
             with f3:
                 only_unassigned = st.checkbox("Samo bez dodjele", key="inbox_only_unassigned")
 
-            filtered = []
-            for row in inbox:
-                if only_overdue and not row["is_overdue"]:
-                    continue
-                if only_pending_user and not row["is_pending_user_long"]:
-                    continue
-                if only_unassigned and not row["is_unassigned"]:
-                    continue
-                filtered.append(row)
+            filtered = dms.get_priority_inbox(
+                limit=25,
+                only_overdue=only_overdue,
+                only_pending_user=only_pending_user,
+                only_unassigned=only_unassigned,
+            )
 
             if not filtered:
                 st.caption("Nema predmeta za izabrane filtere.")
@@ -372,7 +464,7 @@ def admin_dashboard() -> None:
                             "signal": "; ".join(row["flags"]) if row["flags"] else "normal",
                             "score": row["score"],
                         }
-                        for row in filtered[:25]
+                        for row in filtered
                     ]
                 )
                 st.dataframe(inbox_df, use_container_width=True)
@@ -387,21 +479,64 @@ def admin_dashboard() -> None:
                 chart_df = workload_df.set_index("officer")[["active", "overdue_active", "completed_last_30_days"]]
                 st.bar_chart(chart_df)
 
+            with st.expander("Kapacitet i vještine službenika (auto-dodjela)"):
+                profiles = get_officer_profiles(dms.db)
+                staff = get_staff_usernames()
+                if not staff:
+                    st.caption("Nema registrovanih službenika.")
+                else:
+                    officer = st.selectbox("Službenik", options=staff, key="officer_profile_choice")
+                    profile = profiles.get(officer, {"active": 0, "capacity": None, "skills": []})
+                    st.caption(f"Aktivnih predmeta: {profile['active']}")
+                    capacity = st.number_input(
+                        "Najviše aktivnih predmeta (0 = bez ograničenja)",
+                        min_value=0,
+                        value=profile["capacity"] or 0,
+                        step=1,
+                        key=f"officer_capacity_{officer}",
+                    )
+                    skills = st.multiselect(
+                        "Tipovi zahtjeva (prazno = svi)",
+                        options=[t.name for t in RequestType],
+                        default=[name for name in profile["skills"] if name in RequestType.__members__],
+                        format_func=lambda name: RequestType[name].value,
+                        key=f"officer_skills_{officer}",
+                    )
+                    if st.button("Sačuvaj profil", key="officer_profile_save"):
+                        set_officer_profile(dms.db, officer, capacity=int(capacity), skills=skills)
+                        st.success("Profil službenika je sačuvan.")
+
+            st.markdown("### AI asistent keš")
+            cache_stats = answer_cache_stats()
+            ac1, ac2, ac3, ac4 = st.columns(4)
+            ac1.metric("Pogoci (memorija)", cache_stats["memory_hits"])
+            ac2.metric("Pogoci (disk)", cache_stats["disk_hits"])
+            ac3.metric("Promašaji", cache_stats["misses"])
+            ac4.metric("Stopa pogodaka", f"{cache_stats['hit_rate_percent']}%")
+            st.caption(
+                f"Zapisa u memoriji: {cache_stats['entries']} · "
+                f"SQLite sloj: {'uključen' if cache_stats['persistent'] else 'isključen'}"
+            )
+            if st.button("Isprazni keš odgovora", key="clear_answer_cache_btn"):
+                invalidate_answer_cache()
+                st.success("Keš odgovora je ispražnjen.")
+
         with tab_queue:
-            active = dms.get_active_requests()
+            staff_options = get_staff_usernames()
+            query = _render_queue_filters("admin_queue", staff_options)
+            active = _queue_page(dms, "admin_queue", query)
             if not active:
-                st.info("Nema aktivnih zahtjeva.")
+                st.info("Nema aktivnih zahtjeva za odabrane filtere.")
                 if st.button("Generisi demo predmete", key="seed_demo_requests_queue"):
                     result = _seed_demo_requests(dms, st.session_state.user)
                     st.success(f"Generisano demo predmeta: {result['created']}")
                     st.rerun()
             else:
                 st.markdown("### Bulk akcije")
-                staff_options = get_staff_usernames()
                 assign_options = ["(bez promjene)"] + staff_options
 
                 bulk_selection = st.multiselect(
-                    "Odaberite više zahtjeva",
+                    "Odaberite više zahtjeva (trenutna stranica)",
                     options=active,
                     format_func=_request_option_label,
                     key="bulk_request_selection",
@@ -518,8 +653,9 @@ def _render_request_detail(request, dms: DmsManager) -> None:
         st.json(request.details)
 
     st.markdown("#### Dokumenta")
-    if request.documents_metadata:
-        for doc in request.documents_metadata:
+    documents = dms.get_documents(request.id)
+    if documents:
+        for doc in documents:
             st.write(f"- {doc.get('name')} ({doc.get('status', 'pending_review')})")
     else:
         st.caption("Nema uploadovanih dokumenata.")
@@ -552,7 +688,14 @@ def _render_request_detail(request, dms: DmsManager) -> None:
             + (f" • Ref: {request.payment_reference}" if request.payment_reference else "")
         )
 
-    if request.signed_pdf_path and request.signature_hash:
+    if request.decision_status in PENDING_STATUSES:
+        st.caption(f"Rješenje: {'u redu' if request.decision_status == 'queued' else 'generiše se'}…")
+    elif request.decision_status == STATUS_FAILED:
+        st.error("Generisanje rješenja nije uspjelo.")
+        if st.button("Ponovi generisanje rješenja", key=f"retry_decision_{request.id}"):
+            requeue_decision(request.id)
+            st.rerun()
+    elif request.signed_pdf_path and request.signature_hash:
         st.caption(
             f"E-potpis rješenja: hash {request.signature_hash[:16]}… "
             f"({Path(request.signed_pdf_path).name})"
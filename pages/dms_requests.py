@@ -6,22 +6,15 @@ from typing import Optional
 
 import streamlit as st
 
-from database.database import save_request_submission
 from dms_core import DmsManager, RequestStatus, RequestType
+from dms_core.decision_jobs import STATUS_FAILED, STATUS_QUEUED, STATUS_RENDERING, get_decision_status
 from dms_core.models import DocumentTemplate, SessionLocal
+from dms_core.uploads import discard_unreferenced, ingest_upload, validate_upload
 from municipality_utils import get_all_municipalities, validate_municipality
 
 
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
-DOCUMENTS_DIR = PROJECT_ROOT / "documents"
-DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
-
 logger = logging.getLogger("dms_portal.requests")
 
-MAX_UPLOAD_BYTES = 5 * 1024 * 1024
-ALLOWED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png"}
-
-
 SEMI_DIGITAL_TYPES = {
     RequestType.LICNA_KARTA,
     RequestType.PASOS,
@@ -35,34 +28,6 @@ def _sanitize_filename(name: str) -> str:
     return cleaned[:120] or "document.bin"
 
 
-def _is_allowed_signature(file_name: str, content: bytes) -> bool:
-    ext = Path(file_name).suffix.lower()
-    if ext == ".pdf":
-        return content.startswith(b"%PDF")
-    if ext in {".jpg", ".jpeg"}:
-        return content.startswith(b"\xff\xd8\xff")
-    if ext == ".png":
-        return content.startswith(b"\x89PNG\r\n\x1a\n")
-    return False
-
-
-def _validate_upload(uploaded_file) -> Optional[str]:
-    ext = Path(uploaded_file.name).suffix.lower()
-    if ext not in ALLOWED_EXTENSIONS:
-        return f"Datoteka '{uploaded_file.name}' nije dozvoljenog tipa."
-
-    size = int(uploaded_file.size or 0)
-    if size <= 0:
-        return f"Datoteka '{uploaded_file.name}' je prazna."
-    if size > MAX_UPLOAD_BYTES:
-        return f"Datoteka '{uploaded_file.name}' prelazi limit od 5 MB."
-
-    content = bytes(uploaded_file.getbuffer())
-    if not _is_allowed_signature(uploaded_file.name, content):
-        return f"Datoteka '{uploaded_file.name}' nema validan format sadrzaja."
-    return None
-
-
 def _service_catalog() -> dict:
     return {
         "MUP (polu-digitalno)": [
@@ -272,7 +237,7 @@ def dms_request_page() -> None:
                         validation_errors.append("Opština objekta nije validna.")
 
                 for file in uploaded_files or []:
-                    error = _validate_upload(file)
+                    error = validate_upload(file)
                     if error:
                         validation_errors.append(error)
 
@@ -281,8 +246,13 @@ def dms_request_page() -> None:
                         st.error(error)
                     return
 
+                stored_files = []
                 try:
-                    request = dms.create_request(
+                    # Blobovi se upisuju prije transakcije; ako podnošenje ne
+                    # uspije, novi blobovi bez dokumenta se brišu ispod.
+                    for file in uploaded_files or []:
+                        stored_files.append(ingest_upload(file, _sanitize_filename(file.name)))
+                    request = dms.submit_full_request(
                         request_type=request_type,
                         user_id=st.session_state.user,
                         user_email=st.session_state.get("user_email") or "",
@@ -290,31 +260,11 @@ def dms_request_page() -> None:
                         details=details,
                         description=description,
                         reason=reason,
-                    )
-                    dms.submit_request(request.id, changed_by=st.session_state.user)
-
-                    request_dir = DOCUMENTS_DIR / str(request.id)
-                    request_dir.mkdir(exist_ok=True)
-
-                    for file in uploaded_files or []:
-                        safe_name = _sanitize_filename(file.name)
-                        file_path = request_dir / safe_name
-                        with open(file_path, "wb") as out:
-                            out.write(file.getbuffer())
-                        dms.upload_document(request.id, doc_name=safe_name, file_path=str(file_path))
-
-                    dms.add_comment(
-                        request_id=request.id,
-                        author=st.session_state.user,
-                        content="Zahtjev je podnesen preko građanskog portala.",
-                        author_type="user",
-                    )
-
-                    save_request_submission(
-                        username=st.session_state.user,
-                        request_id=request.id,
-                        request_type=request.request_type.value,
-                        status=request.status.value,
+                        documents=[
+                            {"name": stored.name, "path": stored.path, "sha256": stored.sha256, "size": stored.size}
+                            for stored in stored_files
+                        ],
+                        comment="Zahtjev je podnesen preko građanskog portala.",
                     )
 
                     st.success(f"Zahtjev #{request.id} je uspješno podnesen i automatski dodijeljen službeniku na obradu.")
@@ -326,6 +276,10 @@ def dms_request_page() -> None:
                     st.rerun()
                 except Exception:
                     logger.exception("Request submission failed for user=%s", st.session_state.user)
+                    try:
+                        discard_unreferenced(db, stored_files)
+                    except Exception:
+                        logger.exception("Cleanup of uploaded blobs failed for user=%s", st.session_state.user)
                     st.error("Doslo je do greske pri podnosenju zahtjeva. Pokusajte ponovo.")
 
     finally:
@@ -355,8 +309,36 @@ def _render_payment_widget(request, dms) -> None:
             st.info("Plaćanje nije bilo potrebno za ovaj predmet.")
 
 
+_DECISION_PROGRESS = {
+    STATUS_QUEUED: (0.2, "Rješenje je u redu za generisanje…"),
+    STATUS_RENDERING: (0.6, "Rješenje se generiše i potpisuje…"),
+}
+
+
+@st.fragment(run_every=2)
+def _render_decision_progress(request_id: int) -> None:
+    """Prati status generisanja rješenja; kad je gotovo, osvježi stranicu."""
+    db = SessionLocal()
+    try:
+        status = get_decision_status(db, request_id)
+    finally:
+        db.close()
+
+    if status in _DECISION_PROGRESS:
+        value, text = _DECISION_PROGRESS[status]
+        st.progress(value, text=text)
+    else:
+        st.rerun()
+
+
 def _render_signed_decision(request) -> None:
     """Ako predmet ima generisano potpisano rješenje, ponudi preuzimanje."""
+    if request.decision_status in _DECISION_PROGRESS:
+        _render_decision_progress(request.id)
+        return
+    if request.decision_status == STATUS_FAILED and not request.signed_pdf_path:
+        st.warning("Rješenje još nije dostupno — službenik je obaviješten o problemu pri generisanju.")
+        return
     if not request.signed_pdf_path:
         return
 
@@ -410,6 +392,8 @@ def my_requests_page() -> None:
         if selected_status != "Svi":
             requests = [req for req in requests if req.status.value == selected_status]
 
+        documents_by_request = dms.get_documents_for_requests([req.id for req in requests])
+
         for request in requests:
             mode = request.details.get("service_group") if request.details else "semi_digital"
             mode_label = "Polu-digitalno" if mode == "semi_digital" else "Potpuno digitalno"
@@ -440,8 +424,9 @@ def my_requests_page() -> None:
                     st.write(f"Opis: {request.description or '-'}")
 
                     st.markdown("#### Dokumenta")
-                    if request.documents_metadata:
-                        for doc in request.documents_metadata:
+                    documents = documents_by_request.get(request.id)
+                    if documents:
+                        for doc in documents:
                             uploaded_at = doc.get("uploaded_at", "")[:16].replace("T", " ")
                             st.write(f"- {doc.get('name')} ({doc.get('status', 'pending')}) {uploaded_at}")
                     else:
@@ -0,0 +1,88 @@
+"""Zajednička DMS test baza.
+
+Šema se gradi iz `DMS_MIGRATIONS` (kao `init_dms_database` u produkciji),
+ne iz `Base.metadata.create_all`, pa testovi vide iste parcijalne indekse
+i backfill-ovane tabele kao i aplikacija. SQLite sloj answer cache-a je
+isključen za sve testove (ne piše se ništa van tmp_path-a).
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.migrations import migrate
+from dms_core import manager as manager_module
+from dms_core.answer_cache import reset_answer_cache
+from dms_core.manager import DmsManager
+from dms_core.migrations import DMS_COMPONENT, DMS_MIGRATIONS
+
+
+@pytest.fixture(autouse=True)
+def _answer_cache_in_memory(monkeypatch):
+    monkeypatch.setenv("AI_ANSWER_CACHE_DB", "off")
+    reset_answer_cache()
+    yield
+    reset_answer_cache()
+
+
+@pytest.fixture
+def dms_engine_factory():
+    """Pravi migrirane engine-e; bez URL-a in-memory baza (StaticPool), inače fajl."""
+    engines = []
+
+    def _make(url: str = "sqlite://"):
+        if url == "sqlite://":
+            engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        else:
+            engine = create_engine(url, connect_args={"check_same_thread": False})
+        raw = engine.raw_connection()
+        try:
+            migrate(raw.driver_connection, DMS_COMPONENT, DMS_MIGRATIONS)
+        finally:
+            raw.close()
+        engines.append(engine)
+        return engine
+
+    yield _make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def dms_engine(dms_engine_factory):
+    return dms_engine_factory()
+
+
+@pytest.fixture
+def dms_session_factory(dms_engine):
+    return sessionmaker(bind=dms_engine)
+
+
+@pytest.fixture
+def dms_session(dms_session_factory):
+    session = dms_session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def sent_notifications():
+    return []
+
+
+@pytest.fixture
+def mirrored_submissions():
+    return []
+
+
+@pytest.fixture
+def dms_notify_capture(sent_notifications, mirrored_submissions, monkeypatch):
+    """Notifikacije i audit mirror idu u liste umjesto u glavnu bazu."""
+    monkeypatch.setattr(manager_module, "notify", lambda **kwargs: sent_notifications.append(kwargs))
+    monkeypatch.setattr(manager_module, "save_request_submissions", lambda rows: mirrored_submissions.extend(rows))
+
+
+@pytest.fixture
+def dms_manager(dms_session, dms_notify_capture):
+    return DmsManager(dms_session)
@@ -1,4 +1,4 @@
-from dms_core.dms_ai import get_dms_aware_response, get_dms_aware_response_with_source
+from dms_core.dms_ai import DmsAiAssistant, get_dms_aware_response, get_dms_aware_response_with_source
 from dms_core.init_dms import init_dms_database, init_dms_templates
 from dms_core.models import DocumentTemplate, SessionLocal
 
@@ -101,3 +101,33 @@ def test_ai_follow_up_payment_question_uses_chat_context():
         assert "pasos" in text or "paso" in text
     finally:
         db.close()
+
+
+def test_ai_knowledge_is_cached_until_templates_are_reseeded(monkeypatch):
+    db = SessionLocal()
+    try:
+        _ensure_templates(db)
+        first = DmsAiAssistant(db).templates
+
+        calls = []
+        original = DmsAiAssistant._load_source_keywords
+        monkeypatch.setattr(
+            DmsAiAssistant,
+            "_load_source_keywords",
+            lambda self: calls.append(1) or original(self),
+        )
+
+        assert DmsAiAssistant(db).templates is first
+        assert calls == []
+
+        init_dms_templates(
+            db,
+            mup_rules_path="database/mup_rules.json",
+            turizam_path="requirements_data/turizam_requirements.json",
+        )
+        reseeded = DmsAiAssistant(db).templates
+        assert reseeded is not first
+        assert sorted(reseeded) == sorted(first)
+        assert calls == [1]
+    finally:
+        db.close()
@@ -0,0 +1,62 @@
+from dms_core.answer_cache import AnswerCache, get_answer_cache, make_cache_key, reset_answer_cache
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = AnswerCache(max_entries=2, ttl_s=60)
+    cache.put("a", "odgovor a", "llm")
+    cache.put("b", "odgovor b", "llm")
+    assert cache.get("a") == ("odgovor a", "llm")
+
+    cache.put("c", "odgovor c", "llm")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ("odgovor a", "llm")
+    assert cache.get("c") == ("odgovor c", "llm")
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["entries"]) == (3, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    now = [1000.0]
+    cache = AnswerCache(max_entries=10, ttl_s=30, clock=lambda: now[0])
+    cache.put("k", "odgovor", "llm")
+
+    now[0] += 29
+    assert cache.get("k") == ("odgovor", "llm")
+    now[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_sqlite_tier_survives_restart_and_clear(tmp_path):
+    db_path = tmp_path / "answers.db"
+    first = AnswerCache(max_entries=10, ttl_s=60, db_path=db_path)
+    assert first.persistent
+    first.put("k", "odgovor", "llm")
+
+    second = AnswerCache(max_entries=10, ttl_s=60, db_path=db_path)
+    assert second.get("k") == ("odgovor", "llm")
+    assert second.get("k") == ("odgovor", "llm")
+    assert (second.stats()["disk_hits"], second.stats()["memory_hits"]) == (1, 1)
+
+    second.clear()
+    assert AnswerCache(max_entries=10, ttl_s=60, db_path=db_path).get("k") is None
+
+
+def test_key_changes_with_template_version():
+    base = make_cache_key("sta mi treba za pasos", "documents", "pasos", "v1")
+    assert base == make_cache_key("sta mi treba za pasos", "documents", "pasos", "v1")
+    assert base != make_cache_key("sta mi treba za pasos", "documents", "pasos", "v2")
+    assert base != make_cache_key("sta mi treba za pasos", "documents", None, "v1")
+
+
+def test_default_sqlite_tier_lives_in_cache_home(tmp_path, monkeypatch):
+    monkeypatch.delenv("AI_ANSWER_CACHE_DB")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    reset_answer_cache()
+
+    cache = get_answer_cache()
+    cache.put("k", "odgovor", "llm")
+
+    assert cache.persistent
+    assert (tmp_path / "dms_portal" / "answer_cache.db").exists()
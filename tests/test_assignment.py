@@ -0,0 +1,101 @@
+import pytest
+
+from dms_core import assignment as assignment_module
+from dms_core.assignment import get_officer_profiles, reconcile_officer_load, set_officer_profile
+from dms_core.models import DmsRequest, OfficerLoad, RequestStatus, RequestType
+
+
+STAFF = ["sluzbenik_a", "sluzbenik_b", "sluzbenik_c"]
+
+
+@pytest.fixture
+def manager(dms_manager, monkeypatch):
+    monkeypatch.setattr(assignment_module, "get_staff_usernames", lambda: list(STAFF))
+    return dms_manager
+
+
+def _submit(manager, request_type=RequestType.PASOS, user_id="podnosilac"):
+    return manager.submit_full_request(
+        request_type=request_type,
+        user_id=user_id,
+        user_email="p@example.com",
+        user_city="Podgorica",
+        reason="Test",
+    )
+
+
+def _loads(manager):
+    return {officer: profile["active"] for officer, profile in get_officer_profiles(manager.db).items()}
+
+
+def test_round_robin_by_load_and_counter_follows_status(manager):
+    requests = [_submit(manager) for _ in range(4)]
+
+    assert [r.assigned_to for r in requests] == ["sluzbenik_a", "sluzbenik_b", "sluzbenik_c", "sluzbenik_a"]
+    assert _loads(manager) == {"sluzbenik_a": 2, "sluzbenik_b": 1, "sluzbenik_c": 1}
+
+    manager.reject_request(requests[0].id, "Nepotpuno", "sluzbenik_a")
+    assert _loads(manager)["sluzbenik_a"] == 1
+    assert reconcile_officer_load(manager.db) == {}
+
+
+def test_capacity_and_skills_limit_candidates(manager):
+    set_officer_profile(manager.db, "sluzbenik_a", capacity=1)
+    set_officer_profile(manager.db, "sluzbenik_b", skills=[RequestType.VIZA.name])
+
+    assigned = [_submit(manager).assigned_to for _ in range(3)]
+    assert assigned == ["sluzbenik_a", "sluzbenik_c", "sluzbenik_c"]
+
+    assert _submit(manager, RequestType.VIZA).assigned_to == "sluzbenik_b"
+
+
+def test_full_capacity_leaves_request_submitted(manager):
+    for officer in STAFF:
+        set_officer_profile(manager.db, officer, capacity=1)
+    for _ in range(3):
+        _submit(manager)
+
+    overflow = _submit(manager)
+    assert overflow.status == RequestStatus.SUBMITTED
+    assert overflow.assigned_to is None
+
+
+def test_rolled_back_submission_does_not_consume_capacity(manager, monkeypatch):
+    set_officer_profile(manager.db, "sluzbenik_a", capacity=1)
+
+    def _broken(*args, **kwargs):
+        raise RuntimeError("upis dokumenta neuspio")
+
+    with monkeypatch.context() as patch, pytest.raises(RuntimeError):
+        patch.setattr(manager, "add_documents", _broken)
+        manager.submit_full_request(
+            request_type=RequestType.PASOS,
+            user_id="podnosilac",
+            user_email="p@example.com",
+            user_city="Podgorica",
+            documents=[{"filename": "x.pdf"}],
+        )
+    assert manager.db.query(DmsRequest).count() == 0
+
+    assert _submit(manager).assigned_to == "sluzbenik_a"
+
+
+def test_submitter_is_skipped_unless_only_option(manager, monkeypatch):
+    assert _submit(manager, user_id="sluzbenik_a").assigned_to == "sluzbenik_b"
+
+    monkeypatch.setattr(assignment_module, "get_staff_usernames", lambda: ["sluzbenik_a"])
+    assignment_module.get_balancer(manager.db).invalidate()
+    assert _submit(manager, user_id="sluzbenik_a").assigned_to == "sluzbenik_a"
+
+
+def test_reconcile_repairs_drift(manager):
+    request = _submit(manager)
+    manager.db.query(OfficerLoad).update({"active": 7})
+    manager.db.add(OfficerLoad(officer="bivsi", active=3))
+    manager.db.commit()
+
+    drift = reconcile_officer_load(manager.db)
+
+    assert drift == {request.assigned_to: (7, 1), "bivsi": (3, 0)}
+    assert manager.db.query(DmsRequest).count() == 1
+    assert _loads(manager) == {request.assigned_to: 1, "bivsi": 0}
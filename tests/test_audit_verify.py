@@ -0,0 +1,85 @@
+import pytest
+
+from dms_core.audit_verify import list_broken_chains, verify_audit_archive
+from dms_core.models import AuditCheckpoint, RequestStatus, RequestStatusHistory, RequestType
+
+
+@pytest.fixture
+def env(dms_engine, dms_manager):
+    engine, manager = dms_engine, dms_manager
+    ids = []
+    for idx in range(5):
+        request = manager.create_request(
+            request_type=RequestType.PASOS,
+            user_id=f"gradjanin_{idx}",
+            user_email=f"g{idx}@example.com",
+            user_city="Podgorica",
+        )
+        manager._change_status(request.id, RequestStatus.SUBMITTED, changed_by=request.user_id)
+        manager._change_status(request.id, RequestStatus.UNDER_REVIEW, changed_by="sluzbenik")
+        ids.append(request.id)
+    return engine, manager, ids
+
+
+def test_archive_matches_single_request_verifier(env):
+    engine, manager, ids = env
+    total = manager.db.query(RequestStatusHistory).count()
+
+    report = verify_audit_archive(engine, workers=0, chunk_size=3)
+
+    assert report["broken"] == []
+    assert report["requests"] == len(ids)
+    assert report["entries"] == total
+    assert all(manager.verify_audit_chain(request_id)["valid"] for request_id in ids)
+    last_ids = dict(
+        manager.db.query(RequestStatusHistory.request_id, RequestStatusHistory.id)
+        .order_by(RequestStatusHistory.id)
+        .all()
+    )
+    checkpoints = {row.request_id: row.verified_up_to for row in manager.db.query(AuditCheckpoint)}
+    assert checkpoints == last_ids
+
+
+def test_incremental_run_only_hashes_new_entries(env):
+    engine, manager, ids = env
+    verify_audit_archive(engine, workers=0)
+
+    assert verify_audit_archive(engine, workers=0)["entries"] == 0
+
+    manager._change_status(ids[2], RequestStatus.PENDING_USER, changed_by="sluzbenik", reason="Dopuna")
+    report = verify_audit_archive(engine, workers=0)
+    assert (report["requests"], report["entries"], report["broken"]) == (1, 1, [])
+
+
+def test_tampered_entry_is_reported_until_fixed(env):
+    engine, manager, ids = env
+    verify_audit_archive(engine, workers=0)
+    manager._change_status(ids[1], RequestStatus.PENDING_USER, changed_by="sluzbenik", reason="Dopuna")
+    tampered = (
+        manager.db.query(RequestStatusHistory)
+        .filter_by(request_id=ids[1])
+        .order_by(RequestStatusHistory.id.desc())
+        .first()
+    )
+    tampered.reason = "Izmijenjeno naknadno"
+    manager.db.commit()
+
+    expected = [{"request_id": ids[1], "broken_at": tampered.id}]
+    assert verify_audit_archive(engine, workers=0)["broken"] == expected
+    assert verify_audit_archive(engine, workers=0)["broken"] == expected
+    assert [item["broken_at"] for item in list_broken_chains(engine)] == [tampered.id]
+    assert manager.verify_audit_chain(ids[1])["broken_at"] == tampered.id
+
+    assert verify_audit_archive(engine, workers=0, full=True)["broken"] == expected
+
+
+def test_process_pool_gives_same_report(env, dms_engine_factory, tmp_path):
+    engine, manager, ids = env
+    file_engine = dms_engine_factory(f"sqlite:///{tmp_path / 'dms.db'}")
+    with engine.connect() as src, file_engine.begin() as dst:
+        rows = [dict(row._mapping) for row in src.execute(RequestStatusHistory.__table__.select())]
+        dst.execute(RequestStatusHistory.__table__.insert(), rows)
+
+    report = verify_audit_archive(file_engine, workers=1, chunk_size=4)
+
+    assert (report["requests"], report["entries"], report["broken"]) == (len(ids), len(rows), [])
@@ -0,0 +1,19 @@
+from database.database import SCHEMA_VERSION, get_schema_version, init_db
+from dms_core.init_dms import DMS_SCHEMA_VERSION, get_dms_schema_version, init_dms_database
+from dms_core.models import SessionLocal
+
+
+def test_init_db_is_noop_once_schema_version_is_current():
+    init_db()
+    assert get_schema_version() == SCHEMA_VERSION
+    assert init_db() is False
+
+
+def test_init_dms_database_is_noop_once_schema_version_is_current():
+    session = SessionLocal()
+    try:
+        init_dms_database(session)
+        assert get_dms_schema_version(session) == DMS_SCHEMA_VERSION
+        assert init_dms_database(session) is False
+    finally:
+        session.close()
@@ -0,0 +1,117 @@
+from sqlalchemy import event
+
+from database.database import get_conn
+from dms_core import manager as manager_module
+from dms_core.models import RequestComment, RequestStatus, RequestType
+from dms_core.notifications import notify_many
+from dms_core.rollups import check_consistency
+
+
+def _submitted_requests(manager, count):
+    ids = []
+    for idx in range(count):
+        request = manager.create_request(
+            request_type=RequestType.PASOS,
+            user_id=f"bulk_user_{idx}",
+            user_email=f"bulk_{idx}@example.com",
+            user_city="Podgorica",
+        )
+        manager._change_status(request.id, RequestStatus.SUBMITTED, changed_by=request.user_id)
+        ids.append(request.id)
+    return ids
+
+
+def test_bulk_transition_runs_in_one_transaction(dms_manager, monkeypatch):
+    manager = dms_manager
+    session = manager.db
+    ids = _submitted_requests(manager, 4)
+    draft = manager.create_request(
+        request_type=RequestType.PASOS, user_id="bulk_draft", user_email="d@example.com", user_city="Bar"
+    )
+    sent = []
+    monkeypatch.setattr(manager_module, "notify_many", lambda items: sent.extend(items))
+    commits = []
+    event.listen(session, "after_commit", lambda _: commits.append(1))
+
+    result = manager.bulk_manage_requests(
+        ids + [draft.id, 999_999],
+        changed_by="sluzbenik",
+        new_status=RequestStatus.UNDER_REVIEW,
+        assign_to="sluzbenik",
+    )
+
+    assert len(commits) == 1
+    assert result["processed"] == 6
+    assert result["updated"] == 4
+    assert result["transitioned"] == 4
+    assert [item["request_id"] for item in result["failed"]] == [draft.id, 999_999]
+    assert "Nedozvoljena tranzicija" in result["failed"][0]["error"]
+    assert draft.assigned_to == "sluzbenik"  # dodjela ostaje kao i ranije
+    assert [item["request_id"] for item in sent] == ids
+    for request_id in ids:
+        assert manager.verify_audit_chain(request_id)["valid"]
+    assert check_consistency(session) == []
+
+
+def test_bulk_refreshes_inbox_for_resolved_unique_ids(dms_manager):
+    manager = dms_manager
+    ids = _submitted_requests(manager, 2)
+    refreshed = []
+    refresh = manager.refresh_inbox_scores
+    manager.refresh_inbox_scores = lambda request_ids=None, **kwargs: (
+        refreshed.append(request_ids) or refresh(request_ids, **kwargs)
+    )
+
+    manager.bulk_manage_requests([str(ids[0]), ids[0], ids[1], 999_999], changed_by="sluzbenik", assign_to="sluzbenik")
+
+    assert refreshed == [ids]
+
+
+def test_bulk_pending_user_adds_public_comments(dms_manager, monkeypatch):
+    manager = dms_manager
+    session = manager.db
+    ids = _submitted_requests(manager, 2)
+    monkeypatch.setattr(manager_module, "notify_many", lambda items: None)
+    manager.bulk_manage_requests(ids, changed_by="sluzbenik", new_status=RequestStatus.UNDER_REVIEW)
+
+    manager.bulk_manage_requests(ids, changed_by="sluzbenik", new_status=RequestStatus.PENDING_USER, reason="Dopuna")
+
+    comments = session.query(RequestComment).filter(RequestComment.request_id.in_(ids)).all()
+    assert sorted(c.request_id for c in comments) == ids
+    assert {(c.content, c.is_internal) for c in comments} == {("Dopuna", False)}
+    for request_id in ids:
+        assert manager.verify_audit_chain(request_id) == {
+            "valid": True, "total_entries": 3, "broken_at": None, "legacy": False,
+        }
+
+
+def test_notify_many_links_outbox_rows(monkeypatch):
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", "2525")
+    monkeypatch.setenv("SMTP_FROM", "dms@example.org")
+    items = [
+        {"username": "bulk_notify_a", "title": "A", "body": "a", "request_id": 1, "email": "a@example.org"},
+        {"username": "bulk_notify_b", "title": "B", "body": "b", "request_id": 2, "email": None},
+        {"username": "bulk_notify_c", "title": "C", "body": "c", "request_id": 3, "email": "c@example.org"},
+    ]
+
+    ids = notify_many(items)
+
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            f"SELECT id, username FROM notifications WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids
+        ).fetchall()
+        outbox = conn.execute(
+            f"SELECT notification_id, to_email FROM email_outbox "
+            f"WHERE notification_id IN ({','.join('?' * len(ids))}) ORDER BY notification_id",
+            ids,
+        ).fetchall()
+        assert [row[1] for row in rows] == ["bulk_notify_a", "bulk_notify_b", "bulk_notify_c"]
+        assert outbox == [(ids[0], "a@example.org"), (ids[2], "c@example.org")]
+        with conn:
+            conn.execute(f"DELETE FROM email_outbox WHERE notification_id IN ({','.join('?' * len(ids))})", ids)
+            conn.execute(f"DELETE FROM notifications WHERE id IN ({','.join('?' * len(ids))})", ids)
+            conn.execute("DELETE FROM notification_counters WHERE username LIKE 'bulk_notify_%'")
+    finally:
+        conn.close()
@@ -0,0 +1,54 @@
+import threading
+
+from database.database import get_conn
+from database.pool import ConnectionPool
+
+
+def test_pool_reuses_connection_within_thread(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db")
+    first = pool.acquire()
+    first.close()
+    second = pool.acquire()
+    assert first.raw is second.raw
+
+
+def test_pool_connection_uses_wal_and_tuned_pragmas(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", busy_timeout_ms=2500)
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 2500
+
+
+def test_pool_gives_each_thread_its_own_connection(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db")
+    main_conn = pool.acquire().raw
+    seen = []
+
+    worker = threading.Thread(target=lambda: seen.append(pool.acquire().raw))
+    worker.start()
+    worker.join()
+
+    assert seen and seen[0] is not main_conn
+
+
+def test_pool_hands_finished_thread_connection_to_next_thread(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db")
+    seen = []
+
+    for _ in range(2):
+        worker = threading.Thread(target=lambda: seen.append(pool.acquire().raw))
+        worker.start()
+        worker.join()
+
+    assert seen[0] is seen[1]
+
+
+def test_close_rolls_back_uncommitted_work_but_keeps_connection_open():
+    conn = get_conn()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS pool_probe (value INTEGER)")
+    conn.execute("INSERT INTO pool_probe (value) VALUES (1)")
+    conn.close()
+
+    reused = get_conn()
+    assert reused.execute("SELECT COUNT(*) FROM pool_probe").fetchone()[0] == 0
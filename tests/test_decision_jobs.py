@@ -0,0 +1,145 @@
+import hashlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from dms_core import manager as manager_module
+from dms_core import signature
+from dms_core.decision_jobs import DecisionWorker, requeue_decision, resume_pending_decisions
+from dms_core.models import DecisionJob, DmsRequest, RequestStatus, RequestType
+
+
+@pytest.fixture
+def env(dms_manager, dms_session_factory, tmp_path):
+    dms_manager.decision_worker = DecisionWorker(0, session_factory=dms_session_factory, output_dir=tmp_path)
+    return dms_manager, dms_session_factory
+
+
+def _create_under_review(manager, idx=0):
+    request = manager.create_request(
+        request_type=RequestType.PASOS,
+        user_id=f"rjesenje_user_{idx}",
+        user_email=f"r{idx}@example.com",
+        user_city="Kotor",
+    )
+    manager._change_status(request.id, RequestStatus.SUBMITTED, changed_by=request.user_id)
+    manager._change_status(request.id, RequestStatus.UNDER_REVIEW, changed_by="sluzbenik")
+    return request.id
+
+
+def _approve(manager):
+    request_id = _create_under_review(manager)
+    manager.transition_request(
+        request_id=request_id,
+        new_status=RequestStatus.APPROVED,
+        changed_by="sluzbenik",
+        actor_role="admin",
+        reason="Uredna dokumentacija",
+    )
+    return request_id
+
+
+def test_approval_without_decision_job_is_rolled_back(env, monkeypatch):
+    manager, factory = env
+    request_id = _create_under_review(manager)
+
+    def _broken(*args, **kwargs):
+        raise RuntimeError("disk pun")
+
+    monkeypatch.setattr(manager_module, "enqueue_decision", _broken)
+    with pytest.raises(RuntimeError):
+        manager.transition_request(request_id, RequestStatus.APPROVED, changed_by="sluzbenik")
+
+    db = factory()
+    assert db.get(DmsRequest, request_id).status == RequestStatus.UNDER_REVIEW
+    assert db.get(DecisionJob, request_id) is None
+    db.close()
+
+
+def test_job_is_claimed_by_one_worker_and_fresh_rendering_is_not_resumed(env, tmp_path):
+    manager, factory = env
+    request_id = _create_under_review(manager)
+    other = DecisionWorker(0, session_factory=factory, output_dir=tmp_path)
+    manager.decision_worker.submit = lambda ids: []  # odobri bez rendera
+    manager.transition_request(request_id, RequestStatus.APPROVED, changed_by="sluzbenik")
+
+    assert len(other._start([request_id])) == 1
+    assert manager.decision_worker._start([request_id]) == []
+
+    assert resume_pending_decisions(worker=other) == 0
+    db = factory()
+    assert db.get(DecisionJob, request_id).status == "rendering"
+    db.close()
+
+    later = datetime.now() + timedelta(hours=1)
+    assert resume_pending_decisions(worker=other, now=later) == 1
+    db = factory()
+    job = db.get(DecisionJob, request_id)
+    assert (job.status, job.attempts) == ("ready", 2)
+    db.close()
+
+
+def test_approval_renders_decision_out_of_band(env, tmp_path):
+    manager, factory = env
+    request_id = _approve(manager)
+
+    request = manager.db.get(DmsRequest, request_id)
+    manager.db.refresh(request)
+    assert request.decision_status == "ready"
+    path = Path(request.signed_pdf_path)
+    assert path.parent == tmp_path and path.exists()
+    assert request.signature_hash == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_failed_render_is_marked_and_can_be_requeued(env, monkeypatch):
+    manager, factory = env
+
+    def _boom(**kwargs):
+        raise RuntimeError("disk pun")
+
+    monkeypatch.setattr(signature, "generate_signed_decision", _boom)
+    request_id = _approve(manager)
+
+    db = factory()
+    job = db.get(DecisionJob, request_id)
+    assert (job.status, job.attempts, job.error) == ("failed", 1, "disk pun")
+    db.close()
+
+    monkeypatch.undo()
+    assert requeue_decision(request_id, worker=manager.decision_worker)
+    db = factory()
+    job = db.get(DecisionJob, request_id)
+    assert (job.status, job.attempts) == ("ready", 2)
+    db.close()
+
+
+def test_bulk_approval_renders_in_chunks_on_process_pool(env, tmp_path, monkeypatch):
+    manager, factory = env
+    manager.decision_worker = DecisionWorker(1, session_factory=factory, output_dir=tmp_path)
+    manager.decision_worker.chunk_size = 2
+    chunks = []
+    submit = manager.decision_worker._pool().submit
+    monkeypatch.setattr(
+        manager.decision_worker._executor,
+        "submit",
+        lambda fn, payloads: chunks.append(len(payloads)) or submit(fn, payloads),
+    )
+    sessions = []
+    manager.decision_worker.session_factory = lambda: sessions.append(1) or factory()
+    ids = [_create_under_review(manager, idx) for idx in range(3)]
+    try:
+        result = manager.bulk_manage_requests(
+            ids, changed_by="sluzbenik", new_status=RequestStatus.APPROVED, reason="Uredno"
+        )
+        assert result["transitioned"] == 3
+        assert manager.decision_worker.wait(timeout=60)
+    finally:
+        manager.decision_worker.shutdown()
+
+    assert chunks == [2, 1]
+    assert len(sessions) == 3  # jedno preuzimanje serije + upis po chunk-u
+    db = factory()
+    assert {db.get(DecisionJob, request_id).status for request_id in ids} == {"ready"}
+    db.close()
+    assert len(list(tmp_path.glob("rjesenje_*.pdf"))) == 3
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from dms_core.manager import DmsManager
+from dms_core.models import DmsRequest, RequestStatus, RequestType
+
+
+def _add(session, status, submitted=None, completed=None, estimated=None):
+    session.add(
+        DmsRequest(
+            request_type=RequestType.PASOS,
+            user_id="stats",
+            user_email="stats@example.com",
+            user_city="Podgorica",
+            status=status,
+            submitted_at=submitted,
+            completed_at=completed,
+            estimated_completion=estimated,
+        )
+    )
+
+
+def _reference_statistics(session):
+    """Stara implementacija (COUNT po statusu + obrada u Pythonu)."""
+    requests = session.query(DmsRequest).all()
+    completed = [
+        r for r in requests
+        if r.status == RequestStatus.COMPLETED and r.completed_at and r.submitted_at
+    ]
+    now = datetime.now()
+    return {
+        "total_requests": len(requests),
+        "by_status": {s.value: sum(1 for r in requests if r.status == s) for s in RequestStatus},
+        "avg_completion_days": (
+            sum((r.completed_at - r.submitted_at).days for r in completed) / len(completed)
+            if completed else 0
+        ),
+        "overdue_count": sum(
+            1 for r in requests
+            if r.estimated_completion and r.estimated_completion < now
+            and r.status not in (RequestStatus.COMPLETED, RequestStatus.REJECTED)
+        ),
+    }
+
+
+def test_get_statistics_on_empty_database(dms_session):
+    session = dms_session
+    stats = DmsManager(session).get_statistics()
+    assert stats == {
+        "total_requests": 0,
+        "by_status": {s.value: 0 for s in RequestStatus},
+        "avg_completion_days": 0,
+        "overdue_count": 0,
+    }
+
+
+def test_get_statistics_matches_per_row_reference(dms_session):
+    session = dms_session
+    base = datetime(2024, 3, 1, 9, 30, 15, 123456)
+    past = datetime.now() - timedelta(days=3)
+    future = datetime.now() + timedelta(days=3)
+
+    # Trajanja oko granice dana i negativno trajanje (floor kao timedelta.days)
+    for delta in (
+        timedelta(days=2),
+        timedelta(days=2, microseconds=-1000),
+        timedelta(hours=23, minutes=59),
+        timedelta(days=14, hours=5),
+        timedelta(hours=-3),
+    ):
+        _add(session, RequestStatus.COMPLETED, submitted=base, completed=base + delta, estimated=past)
+    _add(session, RequestStatus.COMPLETED, submitted=None, completed=base)
+    _add(session, RequestStatus.UNDER_REVIEW, submitted=base, estimated=past)
+    _add(session, RequestStatus.SUBMITTED, submitted=base, estimated=future)
+    _add(session, RequestStatus.PENDING_USER, submitted=base, estimated=past)
+    _add(session, RequestStatus.REJECTED, submitted=base, estimated=past)
+    _add(session, RequestStatus.DRAFT)
+    session.commit()
+
+    manager = DmsManager(session)
+    stats = manager.get_statistics()
+
+    assert stats == _reference_statistics(session)
+    assert stats["overdue_count"] == 2
+    assert stats["avg_completion_days"] == manager._calculate_avg_completion_time()
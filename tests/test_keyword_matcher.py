@@ -0,0 +1,59 @@
+import random
+
+from dms_core.dms_ai import normalize_text as _normalize
+from dms_core.keyword_matcher import AhoCorasick, RequestTypeMatcher
+
+
+def _reference_best_match(templates, normalized_query):
+    """Originalna petlja iz DmsAiAssistant._detect_request_type."""
+    query_tokens = set(normalized_query.split())
+    best_match, best_score = None, 0.0
+    for request_type, keywords in templates.items():
+        score = 0.0
+        request_name = _normalize(request_type.replace("_", " "))
+        if request_name and request_name in normalized_query:
+            score += 2.0
+        for keyword in keywords:
+            if keyword and keyword in normalized_query:
+                score += min(2.0, 1.0 + len(keyword.split()) * 0.3)
+        for token in query_tokens:
+            if token in request_name.split():
+                score += 0.4
+        if score > best_score:
+            best_score, best_match = score, request_type
+    return best_match, best_score
+
+
+def _synthetic_templates(rng, count):
+    vocabulary = ["pasos", "licna", "karta", "vozacka", "dozvola", "turizam", "stan", "kuca",
+                  "registracija", "licenca", "izgubljena", "nova", "produzenje", "taksa", "pas"]
+    templates = {}
+    for idx in range(count):
+        name_tokens = rng.sample(vocabulary, rng.randint(1, 3))
+        request_type = "_".join(name_tokens) + f"_{idx % 7}"
+        keywords = {" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(rng.randint(2, 8))}
+        keywords.update(name_tokens)
+        templates[request_type] = sorted(keywords)
+    return templates
+
+
+def test_aho_corasick_finds_overlapping_substrings():
+    automaton = AhoCorasick(["he", "she", "his", "hers", "pas", "pasos"])
+    assert {automaton.patterns[i] for i in automaton.find_all("ushers pasosi")} == {"he", "she", "hers", "pas", "pasos"}
+
+
+def test_matcher_scores_identically_to_reference_loop():
+    rng = random.Random(11)
+    templates = _synthetic_templates(rng, 150)
+    matcher = RequestTypeMatcher(templates, _normalize)
+    words = ["pasos", "licnu", "kartu", "vozacka", "dozvola", "turizam", "stan", "taksa", "sta", "mi", "treba", "0"]
+
+    for _ in range(500):
+        query = _normalize(" ".join(rng.choice(words) for _ in range(rng.randint(0, 10))))
+        assert matcher.best_match(query) == _reference_best_match(templates, query)
+
+
+def test_matcher_resolves_request_type_by_normalized_name():
+    matcher = RequestTypeMatcher({"licna_karta": ["licna"], "pasos": ["pasos"]}, _normalize)
+    assert matcher.request_type_for_name("licna karta") == "licna_karta"
+    assert matcher.request_type_for_name("nepostojeci") is None
@@ -0,0 +1,112 @@
+import random
+from datetime import datetime, timedelta
+
+from dms_core.manager import DmsManager
+from dms_core.models import DmsRequest, RequestStatus, RequestStatusHistory, RequestType
+
+
+OFFICERS = ["sluzbenik_a", "sluzbenik_b", " sluzbenik_c "]
+
+
+def _seed(session, seed=7, count=120):
+    rng = random.Random(seed)
+    now = datetime.now()
+
+    for _ in range(count):
+        submitted = now - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+        req = DmsRequest(
+            request_type=RequestType.PASOS,
+            user_id="kpi",
+            user_email="kpi@example.com",
+            user_city="Podgorica",
+            status=rng.choice(list(RequestStatus)),
+            submitted_at=submitted if rng.random() > 0.1 else None,
+            completed_at=submitted + timedelta(days=rng.randint(1, 20)),
+            estimated_completion=now + timedelta(days=rng.randint(-10, 10)),
+            assigned_to=rng.choice(OFFICERS + [None, ""]),
+        )
+        session.add(req)
+        session.flush()
+
+        for _ in range(rng.randint(0, 3)):
+            changed_at = submitted + timedelta(hours=rng.uniform(-5, 200))
+            session.add(
+                RequestStatusHistory(
+                    request_id=req.id,
+                    from_status=RequestStatus.SUBMITTED,
+                    to_status=rng.choice([RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER]),
+                    changed_by=rng.choice([o.strip() for o in OFFICERS] + [None]),
+                    changed_at=changed_at,
+                )
+            )
+    session.flush()
+    # Prelaz bez changed_at — stari upit ga je vraćao kao "prvi" i preskakao zahtjev
+    session.query(RequestStatusHistory).filter(RequestStatusHistory.id % 17 == 0).update(
+        {RequestStatusHistory.changed_at: None}
+    )
+    session.commit()
+    return session
+
+
+def _first_review(session, request_id, officer=None):
+    query = session.query(RequestStatusHistory).filter(
+        RequestStatusHistory.request_id == request_id,
+        RequestStatusHistory.to_status == RequestStatus.UNDER_REVIEW,
+    )
+    if officer is not None:
+        query = query.filter(RequestStatusHistory.changed_by == officer)
+    return query.order_by(RequestStatusHistory.changed_at.asc()).first()
+
+
+def _reference_avg_first_review_hours(session):
+    hours = []
+    for req in session.query(DmsRequest).filter(DmsRequest.submitted_at != None).all():
+        first = _first_review(session, req.id)
+        if first and req.submitted_at and first.changed_at:
+            hours.append(max((first.changed_at - req.submitted_at).total_seconds() / 3600, 0))
+    return round(sum(hours) / len(hours), 2) if hours else 0
+
+
+def _reference_workload(session, days=30):
+    since = datetime.now() - timedelta(days=days)
+    active = {RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER}
+    officers = {}
+    for req in session.query(DmsRequest).filter(DmsRequest.assigned_to != None).all():
+        officer = (req.assigned_to or "").strip()
+        if not officer:
+            continue
+        bucket = officers.setdefault(officer, {
+            "officer": officer, "active": 0, "overdue_active": 0,
+            "completed_last_30_days": 0, "first_review_samples": 0, "avg_first_review_hours": 0.0,
+        })
+        if req.status in active:
+            bucket["active"] += 1
+            if req.estimated_completion and req.estimated_completion < datetime.now():
+                bucket["overdue_active"] += 1
+        if req.status == RequestStatus.COMPLETED and req.completed_at and req.completed_at >= since:
+            bucket["completed_last_30_days"] += 1
+        first = _first_review(session, req.id, officer)
+        if first and req.submitted_at and first.changed_at:
+            delta = (first.changed_at - req.submitted_at).total_seconds() / 3600
+            if delta >= 0:
+                n = bucket["first_review_samples"]
+                bucket["avg_first_review_hours"] = round(
+                    ((bucket["avg_first_review_hours"] * n) + delta) / (n + 1), 2
+                )
+                bucket["first_review_samples"] += 1
+    result = sorted(officers.values(), key=lambda row: (row["active"], row["overdue_active"]), reverse=True)
+    for row in result:
+        row.pop("first_review_samples")
+    return result
+
+
+def test_kpi_first_review_average_matches_per_request_lookup(dms_session):
+    session = _seed(dms_session)
+    metrics = DmsManager(session).get_kpi_metrics()
+    assert metrics["avg_first_review_hours"] == _reference_avg_first_review_hours(session)
+    assert metrics["avg_first_review_hours"] > 0
+
+
+def test_officer_workload_matches_per_request_lookup(dms_session):
+    session = _seed(dms_session)
+    assert DmsManager(session).get_officer_workload() == _reference_workload(session)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from dms_core.models import DmsRequest, KpiRollup, RequestStatus, RequestType
+from dms_core.rollups import check_consistency, rebuild, rollup_kpi_metrics, rollup_statistics
+
+
+def _create(manager, idx):
+    return manager.create_request(
+        request_type=RequestType.PASOS if idx % 2 else RequestType.LICNA_KARTA,
+        user_id=f"rollup_user_{idx}",
+        user_email=f"rollup_{idx}@example.com",
+        user_city="Podgorica",
+    )
+
+
+def _run_workflows(manager):
+    flows = [
+        [],
+        [RequestStatus.SUBMITTED],
+        [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW],
+        [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER, RequestStatus.UNDER_REVIEW],
+        [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.APPROVED, RequestStatus.COMPLETED],
+        [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.REJECTED],
+    ]
+    for idx, flow in enumerate(flows):
+        req = _create(manager, idx)
+        for status in flow:
+            if status == RequestStatus.SUBMITTED:
+                req.submitted_at = datetime.now() - timedelta(days=idx)
+            if status == RequestStatus.UNDER_REVIEW:
+                req.assigned_to = "rollup_officer"
+            if status in (RequestStatus.COMPLETED, RequestStatus.REJECTED):
+                req.completed_at = datetime.now()
+            manager._change_status(req.id, status, changed_by="rollup_officer", reason="test")
+    return manager
+
+
+def _rollup_rows(session):
+    return sorted(
+        (row.bucket_day, row.cohort_week, row.request_type, row.officer, row.metric, row.count, round(row.value_sum, 6))
+        for row in session.query(KpiRollup).all()
+    )
+
+
+def test_incremental_rollups_match_raw_dashboard_queries(dms_manager):
+    session = dms_manager.db
+    manager = _run_workflows(dms_manager)
+
+    assert check_consistency(session) == []
+    stats = rollup_statistics(session)
+    assert stats["total_requests"] == 6
+    assert stats["by_status"]["completed"] == 1
+    assert rollup_kpi_metrics(session)["correction_rate_percent"] == manager.get_kpi_metrics()["correction_rate_percent"]
+
+
+def test_rebuild_reproduces_incrementally_maintained_rollups(dms_engine, dms_manager):
+    engine, session = dms_engine, dms_manager.db
+    _run_workflows(dms_manager)
+    incremental = _rollup_rows(session)
+    session.commit()
+
+    assert rebuild(engine) == 6
+    session.expire_all()
+    assert _rollup_rows(session) == incremental
+
+
+def test_rollup_state_follows_reassignment_outside_status_change(dms_manager):
+    session = dms_manager.db
+    manager = _run_workflows(dms_manager)
+    request = session.query(DmsRequest).filter(DmsRequest.status == RequestStatus.UNDER_REVIEW).first()
+
+    manager.bulk_manage_requests([request.id], changed_by="admin", assign_to="drugi_sluzbenik")
+
+    officers = {row.officer for row in session.query(KpiRollup).filter(KpiRollup.metric == "status:UNDER_REVIEW")}
+    assert "drugi_sluzbenik" in officers
+    assert check_consistency(session) == []
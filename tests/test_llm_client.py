@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dms_core.answer_cache import answer_cache_stats, reset_answer_cache
+from dms_core.dms_ai import get_dms_aware_response_stream
+from dms_core.llm_client import CircuitBreaker, LlmUnavailable, get_llm_client, reset_llm_client
+from dms_core.models import SessionLocal
+
+
+TOKENS = ["Za ", "pasos ", "trebate ", "licnu ", "kartu."]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.server.requests += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.server.mode == "slow":
+            time.sleep(self.server.delay_s)
+
+        if not body.get("stream"):
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(TOKENS)}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for token in TOKENS:
+            chunk = {
+                "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.server.token_gap_s)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # klijent je odustao (timeout) prije odgovora
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    server = _StubServer(("127.0.0.1", 0), _StubHandler)
+    server.mode = "stream"
+    server.delay_s = 0.6
+    server.token_gap_s = 0.05
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setenv("LLM_READ_TIMEOUT_S", "0.3")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "0")
+    monkeypatch.setenv("LLM_BREAKER_FAILURES", "2")
+    monkeypatch.setenv("LLM_BREAKER_RESET_S", "60")
+    monkeypatch.setenv("AI_ANSWER_CACHE_DB", "off")
+    reset_llm_client()
+    reset_answer_cache()
+    try:
+        yield server
+    finally:
+        reset_llm_client()
+        reset_answer_cache()
+        server.shutdown()
+        server.server_close()
+
+
+def test_stream_returns_at_first_token_before_full_answer(stub_llm):
+    client = get_llm_client()
+    assert client is get_llm_client()
+
+    started = time.monotonic()
+    chunks = client.stream_chat([{"role": "user", "content": "pasos"}])
+    time_to_first_token = time.monotonic() - started
+    answer = "".join(chunks)
+    total = time.monotonic() - started
+
+    assert answer == "".join(TOKENS)
+    assert time_to_first_token < total
+    assert total - time_to_first_token >= stub_llm.token_gap_s * (len(TOKENS) - 2)
+
+
+def test_slow_endpoint_opens_breaker_and_fails_fast(stub_llm):
+    stub_llm.mode = "slow"
+    client = get_llm_client()
+
+    for _ in range(2):
+        with pytest.raises(LlmUnavailable):
+            client.complete([{"role": "user", "content": "pasos"}])
+    assert client.breaker.state == "open"
+
+    requests_before = stub_llm.requests
+    started = time.monotonic()
+    with pytest.raises(LlmUnavailable):
+        client.stream_chat([{"role": "user", "content": "pasos"}])
+    fallback_latency = time.monotonic() - started
+
+    assert fallback_latency < 0.05
+    assert stub_llm.requests == requests_before
+
+
+def test_assistant_streams_llm_answer_and_falls_back_when_breaker_is_open(stub_llm):
+    db = SessionLocal()
+    try:
+        chunks, source = get_dms_aware_response_stream("Sta mi treba za pasos", db)
+        assert source == "llm"
+        assert "".join(chunks) == "".join(TOKENS)
+
+        # Ponovljeno pitanje ide iz keša, bez poziva prema LLM-u
+        requests_before = stub_llm.requests
+        chunks, source = get_dms_aware_response_stream("Šta mi treba za  pasoš?", db)
+        assert (source, "".join(chunks)) == ("llm", "".join(TOKENS))
+        assert stub_llm.requests == requests_before
+        assert answer_cache_stats()["memory_hits"] == 1
+
+        get_llm_client().breaker.record_failure()
+        get_llm_client().breaker.record_failure()
+        started = time.monotonic()
+        chunks, source = get_dms_aware_response_stream("Koja dokumenta trebaju za pasos", db)
+        assert source == "fallback"
+        assert "pasos" in "".join(chunks).lower()
+        assert time.monotonic() - started < 0.5
+    finally:
+        db.close()
+
+
+def test_breaker_half_open_allows_single_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    now[0] = 11.0
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
@@ -0,0 +1,173 @@
+import smtplib
+import socketserver
+import threading
+
+import pytest
+
+from database.database import get_conn
+from database.migrations import CORE_COMPONENT, CORE_MIGRATIONS, migrate
+from database.pool import ConnectionPool
+from dms_core.mail_dispatcher import MailDispatcher, SmtpSettings, enqueue_email
+from dms_core.notifications import notify
+
+
+class _FakeSmtp:
+    sessions = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_next = 0
+        _FakeSmtp.sessions.append(self)
+
+    def noop(self):
+        return (250, b"OK")
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, sender, recipients, message):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise smtplib.SMTPServerDisconnected("veza prekinuta")
+        self.sent.append((sender, recipients))
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", "2525")
+    monkeypatch.setenv("SMTP_FROM", "dms@example.org")
+    pool = ConnectionPool(tmp_path / "mail.db")
+    conn = pool.acquire()
+    migrate(conn, CORE_COMPONENT, CORE_MIGRATIONS)
+    conn.close()
+    _FakeSmtp.sessions = []
+    yield pool
+    pool.close_all()
+
+
+def _enqueue(pool, count, now=0.0):
+    conn = pool.acquire()
+    with conn:
+        for idx in range(count):
+            enqueue_email(conn, f"user{idx}@example.org", "Status", "Tijelo", now=now)
+    conn.close()
+
+
+def _statuses(pool):
+    conn = pool.acquire()
+    try:
+        return conn.execute("SELECT status, attempts FROM email_outbox ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_batches_reuse_one_smtp_session(outbox):
+    dispatcher = MailDispatcher(SmtpSettings.from_env(), pool=outbox, smtp_factory=_FakeSmtp, batch_size=2)
+    _enqueue(outbox, 5)
+
+    assert dispatcher.drain() == {"sent": 5, "retried": 0, "dead": 0}
+    assert len(_FakeSmtp.sessions) == 1
+    assert len(_FakeSmtp.sessions[0].sent) == 5
+    assert {status for status, _ in _statuses(outbox)} == {"sent"}
+
+
+def test_failed_send_backs_off_then_dead_letters(outbox):
+    now = [1000.0]
+    dispatcher = MailDispatcher(
+        SmtpSettings.from_env(),
+        pool=outbox,
+        smtp_factory=_FakeSmtp,
+        max_attempts=2,
+        backoff_base_s=30,
+        clock=lambda: now[0],
+    )
+    _enqueue(outbox, 1, now=now[0])
+
+    dispatcher._session().fail_next = 1
+    assert dispatcher.dispatch_once() == {"sent": 0, "retried": 1, "dead": 0}
+    assert dispatcher.dispatch_once() == {"sent": 0, "retried": 0, "dead": 0}  # backoff još traje
+
+    now[0] += 31
+    dispatcher._session().fail_next = 1
+    assert dispatcher.dispatch_once() == {"sent": 0, "retried": 0, "dead": 1}
+    assert _statuses(outbox) == [("dead", 2)]
+
+
+def test_notify_only_enqueues(monkeypatch):
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", "2525")
+    monkeypatch.setenv("SMTP_FROM", "dms@example.org")
+    monkeypatch.setattr(smtplib, "SMTP", None)  # bilo kakav SMTP poziv bi pukao
+
+    notification_id = notify("outbox_test_user", "Naslov", "Tijelo", email="korisnik@example.org")
+
+    conn = get_conn()
+    try:
+        row = conn.execute(
+            "SELECT status, to_email FROM email_outbox WHERE notification_id = ?", (notification_id,)
+        ).fetchone()
+        assert row == ("pending", "korisnik@example.org")
+        with conn:
+            conn.execute("DELETE FROM email_outbox WHERE notification_id = ?", (notification_id,))
+            conn.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
+            conn.execute("DELETE FROM notification_counters WHERE username = 'outbox_test_user'")
+    finally:
+        conn.close()
+
+
+class _SmtpStubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b"220 stub\r\n")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    self.server.messages += 1
+                    self.wfile.write(b"250 queued\r\n")
+                continue
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                self.wfile.write(b"250 stub\r\n")
+            elif verb == b"DATA":
+                in_data = True
+                self.wfile.write(b"354 go\r\n")
+            elif verb == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+def test_dispatcher_against_local_smtp_server(outbox, monkeypatch):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpStubHandler)
+    server.daemon_threads = True
+    server.connections = server.messages = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("SMTP_PORT", str(server.server_address[1]))
+    monkeypatch.setenv("SMTP_STARTTLS", "0")
+    try:
+        dispatcher = MailDispatcher(SmtpSettings.from_env(), pool=outbox, batch_size=3)
+        _enqueue(outbox, 4)
+        assert dispatcher.drain()["sent"] == 4
+        _enqueue(outbox, 2)
+        assert dispatcher.drain()["sent"] == 2
+        dispatcher._close_session()
+
+        assert server.messages == 6
+        assert server.connections == 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+from database.migrations import (
+    AddColumn,
+    Migration,
+    MigrationError,
+    Sql,
+    applied_migrations,
+    migrate,
+    read_schema_version,
+)
+
+
+MIGRATIONS = [
+    Migration(1, "items", (Sql("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"),)),
+    Migration(2, "items_note", (AddColumn("items", "note", "TEXT"),)),
+]
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_migrate_applies_pending_and_records_ledger(tmp_path):
+    conn = sqlite3.connect(tmp_path / "m.db")
+
+    plan = migrate(conn, "test", MIGRATIONS)
+
+    assert [item["version"] for item in plan] == [1, 2]
+    assert _columns(conn, "items") == ["id", "name", "note"]
+    assert read_schema_version(conn, "test") == 2
+    assert set(applied_migrations(conn, "test")) == {1, 2}
+    assert migrate(conn, "test", MIGRATIONS) == []
+
+
+def test_dry_run_reports_plan_without_changes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "m.db")
+
+    plan = migrate(conn, "test", MIGRATIONS[:1], dry_run=True)
+
+    assert plan[0]["statements"] == ["CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"]
+    assert read_schema_version(conn, "test") == 0
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'items'").fetchone() is None
+
+
+def test_add_column_is_skipped_when_column_exists(tmp_path):
+    conn = sqlite3.connect(tmp_path / "m.db")
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, note TEXT)")
+    conn.commit()
+
+    plan = migrate(conn, "test", MIGRATIONS[1:], dry_run=True)
+    assert plan[0]["statements"] == []
+
+    migrate(conn, "test", MIGRATIONS[1:])
+    assert _columns(conn, "items") == ["id", "name", "note"]
+
+
+def test_failed_migration_rolls_back_whole_batch(tmp_path):
+    conn = sqlite3.connect(tmp_path / "m.db")
+    broken = MIGRATIONS + [Migration(3, "broken", (Sql("ALTER TABLE missing ADD COLUMN x TEXT"),))]
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn, "test", broken)
+
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'items'").fetchone() is None
+    assert read_schema_version(conn, "test") == 0
+
+
+def test_checksum_drift_of_applied_migration_is_rejected(tmp_path):
+    conn = sqlite3.connect(tmp_path / "m.db")
+    migrate(conn, "test", MIGRATIONS)
+
+    edited = [Migration(1, "items", (Sql("CREATE TABLE items (id INTEGER PRIMARY KEY)"),)), MIGRATIONS[1]]
+    with pytest.raises(MigrationError):
+        migrate(conn, "test", edited, dry_run=True)
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.migrations import CORE_COMPONENT, CORE_MIGRATIONS, migrate
+from database.pool import ConnectionPool
+from dms_core.notification_retention import archive_read_notifications, load_archived
+
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "retention.db")
+    conn = pool.acquire()
+    migrate(conn, CORE_COMPONENT, CORE_MIGRATIONS)
+    conn.close()
+    yield pool
+    pool.close_all()
+
+
+def _insert(pool, username, age_days, read):
+    created_at = (NOW - timedelta(days=age_days)).isoformat()
+    conn = pool.acquire()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO notifications (username, request_id, title, body, created_at, read_at) "
+            "VALUES (?, NULL, ?, 'tijelo', ?, ?)",
+            (username, f"{username}-{age_days}", created_at, created_at if read else None),
+        )
+    conn.close()
+    return cur.lastrowid
+
+
+def _remaining_ids(pool):
+    conn = pool.acquire()
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM notifications ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_archives_only_old_read_rows_in_bounded_batches(pool):
+    old_read = [_insert(pool, user, 200 + idx, read=True) for idx, user in enumerate(["ana", "ana", "marko", "ana", "marko"])]
+    keep = [_insert(pool, "ana", 200, read=False), _insert(pool, "marko", 10, read=True)]
+
+    first = archive_read_notifications(retention_days=90, batch_size=2, max_batches=1, pause_s=0, pool=pool, now=NOW)
+    assert first == {"archived": 2, "batches": 1}
+
+    rest = archive_read_notifications(retention_days=90, batch_size=2, pause_s=0, pool=pool, now=NOW)
+    assert rest == {"archived": 3, "batches": 2}
+    assert _remaining_ids(pool) == keep
+
+    archived = load_archived("ana", pool=pool)
+    assert [item["id"] for item in archived] == sorted([old_read[0], old_read[1], old_read[3]], reverse=True)
+    assert archived[0]["title"].startswith("ana-")
+    assert [item["id"] for item in load_archived("marko", pool=pool)] == [old_read[4], old_read[2]]
+
+
+def test_batches_under_write_lock_do_not_scan_recent_rows(pool):
+    old_read = [_insert(pool, "ana", 200, read=True) for _ in range(3)]
+    recent = [_insert(pool, "ana", 1, read=True) for _ in range(5)]
+    conn = pool.acquire()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    conn.close()
+
+    try:
+        result = archive_read_notifications(retention_days=90, batch_size=2, pause_s=0, pool=pool, now=NOW)
+    finally:
+        conn.set_trace_callback(None)
+
+    assert result == {"archived": 3, "batches": 2}
+    assert _remaining_ids(pool) == recent
+    locked = [sql for sql in statements if sql.startswith("SELECT id, username")]
+    assert locked and all(f"id <= {old_read[-1]}" in sql for sql in locked)
+    conn = pool.acquire()
+    try:
+        plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {locked[-1]}"))
+    finally:
+        conn.close()
+    assert "rowid>? AND rowid<?" in plan
+
+
+def test_feed_and_unread_queries_use_new_indexes(pool):
+    conn = pool.acquire()
+    try:
+        feed_plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id, title FROM notifications WHERE username = ? AND id < ? "
+                "ORDER BY id DESC LIMIT 50",
+                ("ana", 100),
+            )
+        )
+        unread_plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN UPDATE notifications SET read_at = 'x' WHERE username = ? AND read_at IS NULL",
+                ("ana",),
+            )
+        )
+    finally:
+        conn.close()
+    assert "idx_notifications_username_id" in feed_plan and "TEMP B-TREE" not in feed_plan
+    assert "idx_notifications_unread" in unread_plan
@@ -0,0 +1,60 @@
+import pytest
+
+from database.database import get_conn
+from dms_core import notifications
+from dms_core.notifications import list_notifications, mark_all_read, notify, unread_count
+
+USER = "notif_cache_test_user"
+
+
+@pytest.fixture(autouse=True)
+def _cleanup():
+    yield
+    conn = get_conn()
+    try:
+        with conn:
+            conn.execute("DELETE FROM notifications WHERE username = ?", (USER,))
+            conn.execute("DELETE FROM notification_counters WHERE username = ?", (USER,))
+    finally:
+        conn.close()
+    notifications.invalidate_notification_cache(USER)
+
+
+def test_unread_count_is_cached_and_invalidated_by_writes(monkeypatch):
+    assert unread_count(USER) == 0
+    notify(USER, "Prva")
+    notify(USER, "Druga")
+    assert unread_count(USER) == 2
+    feed = list_notifications(USER)
+
+    def _no_disk():
+        raise AssertionError("sidebar ne smije ići na disk dok je keš svjež")
+
+    monkeypatch.setattr(notifications, "_get_conn", _no_disk)
+    assert unread_count(USER) == 2
+    assert list_notifications(USER) == feed
+    monkeypatch.undo()
+
+    assert mark_all_read(USER) == 2
+    assert unread_count(USER) == 0
+    conn = get_conn()
+    try:
+        assert conn.execute(
+            "SELECT unread FROM notification_counters WHERE username = ?", (USER,)
+        ).fetchone() == (0,)
+    finally:
+        conn.close()
+
+
+def test_keyset_pagination_walks_feed_without_gaps():
+    ids = [notify(USER, f"Poruka {idx}") for idx in range(5)]
+
+    seen, after_id = [], None
+    while True:
+        page = list_notifications(USER, limit=2, after_id=after_id)
+        if not page:
+            break
+        seen.extend(item["id"] for item in page)
+        after_id = page[-1]["id"]
+
+    assert seen == sorted(ids, reverse=True)
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from dms_core.models import DmsRequest, RequestPriority, RequestStatus, RequestType
+
+STATUSES = [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER, RequestStatus.COMPLETED]
+PRIORITIES = list(RequestPriority)
+
+
+def _legacy_score(req, now, pending_user_days=3):
+    """Raniji Python izračun iz get_priority_inbox (referenca)."""
+    score = 0
+    if req.estimated_completion and req.estimated_completion < now:
+        score += 3 + min(4, max(0, (now - req.estimated_completion).days))
+    if req.status == RequestStatus.PENDING_USER and req.updated_at:
+        if (now - req.updated_at).days >= pending_user_days:
+            score += 3
+    if req.status == RequestStatus.SUBMITTED and not req.assigned_to:
+        score += 2
+    return score + {RequestPriority.URGENT: 3, RequestPriority.HIGH: 2, RequestPriority.MEDIUM: 1}.get(req.priority, 0)
+
+
+@pytest.fixture
+def manager(dms_manager):
+    session = dms_manager.db
+    now = datetime.now()
+    for idx in range(60):
+        session.add(
+            DmsRequest(
+                request_type=RequestType.PASOS,
+                user_id=f"inbox{idx}",
+                user_email="i@example.com",
+                user_city="Bar",
+                status=STATUSES[idx % 4],
+                priority=PRIORITIES[idx % 4],
+                assigned_to=None if idx % 3 == 0 else "sluzbenik",
+                created_at=now - timedelta(days=20, minutes=idx),
+                updated_at=now - timedelta(days=idx % 6, hours=1),
+                estimated_completion=None if idx % 11 == 0 else now + timedelta(days=(idx % 13) - 9, hours=2),
+            )
+        )
+    session.commit()
+    return dms_manager
+
+
+def test_stored_score_matches_python_reference(manager):
+    now = datetime.now()
+    updated_before = {req.id: req.updated_at for req in manager.db.query(DmsRequest)}
+    manager.refresh_inbox_scores(now=now)
+
+    for req in manager.db.query(DmsRequest):
+        assert req.updated_at == updated_before[req.id]
+        if req.status == RequestStatus.COMPLETED:
+            assert req.inbox_score is None and not req.is_overdue
+        else:
+            assert req.inbox_score == _legacy_score(req, now), req.id
+
+    top = manager.get_priority_inbox(limit=10)
+    assert len(top) == 10
+    keys = [(row["score"], row["request"].created_at) for row in top]
+    assert keys == sorted(keys, reverse=True)
+    assert top[0]["score"] == max(
+        req.inbox_score for req in manager.db.query(DmsRequest) if req.inbox_score is not None
+    )
+
+
+def test_boolean_filters_and_status_change_refresh(manager):
+    manager.refresh_inbox_scores()
+    unassigned = manager.get_priority_inbox(limit=100, only_unassigned=True)
+    assert unassigned and all(
+        row["request"].status == RequestStatus.SUBMITTED and not row["request"].assigned_to for row in unassigned
+    )
+    assert all(row["is_overdue"] for row in manager.get_priority_inbox(limit=100, only_overdue=True))
+
+    target = unassigned[0]["request"]
+    manager.start_review(target.id, assigned_to="sluzbenik")
+    manager.db.refresh(target)
+    assert target.is_unassigned is False
+    assert target.id not in {row["request"].id for row in manager.get_priority_inbox(limit=100, only_unassigned=True)}
+
+
+def test_reading_inbox_does_not_write(manager):
+    manager.refresh_inbox_scores()
+    pending = manager.db.query(DmsRequest).first()
+    pending.notes = "nesačuvana izmjena"
+    writes = []
+    event.listen(
+        manager.db.get_bind(), "before_cursor_execute",
+        lambda conn, cursor, statement, *args: writes.append(statement)
+        if not statement.lstrip().upper().startswith("SELECT") else None,
+    )
+    commits = []
+    event.listen(manager.db, "after_commit", lambda _: commits.append(1))
+
+    manager.get_priority_inbox(limit=10)
+
+    assert commits == []
+    assert not any(statement.lstrip().upper().startswith("UPDATE DMS_REQUESTS SET INBOX") for statement in writes)
+    manager.db.rollback()
+
+
+def test_top_k_comes_from_partial_index(manager):
+    plan = manager.db.execute(
+        text(
+            "EXPLAIN QUERY PLAN SELECT id FROM dms_requests WHERE inbox_score IS NOT NULL AND is_overdue = 1 "
+            "ORDER BY inbox_score DESC, created_at DESC, id DESC LIMIT 25"
+        )
+    ).fetchall()
+    detail = " ".join(row[-1] for row in plan)
+    assert "idx_dms_requests_inbox_overdue" in detail
+    assert "TEMP B-TREE" not in detail
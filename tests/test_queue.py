@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dms_core.models import DmsRequest, RequestPriority, RequestStatus, RequestType
+
+STATUSES = [RequestStatus.SUBMITTED, RequestStatus.UNDER_REVIEW, RequestStatus.PENDING_USER, RequestStatus.COMPLETED]
+
+
+@pytest.fixture
+def manager(dms_manager):
+    session = dms_manager.db
+    base = datetime(2025, 1, 1, 8, 0)
+    now = datetime.now()
+    for idx in range(40):
+        session.add(
+            DmsRequest(
+                request_type=RequestType.PASOS if idx % 2 else RequestType.LICNA_KARTA,
+                user_id=f"q{idx}",
+                user_email="q@example.com",
+                user_city="Bar" if idx % 3 else "Kotor",
+                status=STATUSES[idx % 4],
+                priority=RequestPriority.URGENT if idx % 5 == 0 else RequestPriority.MEDIUM,
+                assigned_to=None if idx % 4 == 0 else f"sluzbenik_{idx % 2}",
+                # parovi sa istim created_at provjeravaju id kao drugi ključ
+                created_at=base + timedelta(hours=idx // 2),
+                estimated_completion=None if idx % 7 == 0 else now + timedelta(days=(idx % 9) - 4),
+            )
+        )
+    session.commit()
+    return dms_manager
+
+
+def _walk(manager, limit=7, **kwargs):
+    seen, cursor = [], None
+    while True:
+        page = manager.query_queue(after=cursor, limit=limit, **kwargs)
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("sort", ["oldest", "newest", "deadline"])
+def test_keyset_walk_matches_full_sort(manager, sort):
+    active = manager.db.query(DmsRequest).filter(DmsRequest.status != RequestStatus.COMPLETED).all()
+    column = "estimated_completion" if sort == "deadline" else "created_at"
+    expected = sorted(
+        active,
+        key=lambda req: (getattr(req, column) is not None, getattr(req, column), req.id),
+        reverse=sort == "newest",
+    )
+
+    assert [req.id for req in _walk(manager, sort=sort)] == [req.id for req in expected]
+
+
+def test_server_side_filters(manager):
+    now = datetime.now()
+    unassigned = _walk(manager, unassigned=True)
+    assert unassigned and all(req.assigned_to is None for req in unassigned)
+
+    rows = _walk(manager, sort="deadline", request_type=RequestType.PASOS, city="Bar", overdue=True)
+    assert rows
+    assert all(
+        req.request_type == RequestType.PASOS and req.user_city == "Bar" and req.estimated_completion < now
+        for req in rows
+    )
+
+    urgent = _walk(manager, priority=RequestPriority.URGENT, statuses=[RequestStatus.UNDER_REVIEW])
+    assert all(req.status == RequestStatus.UNDER_REVIEW and req.priority == RequestPriority.URGENT for req in urgent)
+    assert manager.count_queue(assigned_to="sluzbenik_1") == len(_walk(manager, assigned_to="sluzbenik_1"))
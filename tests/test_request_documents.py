@@ -0,0 +1,64 @@
+import json
+import sqlite3
+
+from sqlalchemy import event
+
+from database.migrations import migrate
+from dms_core.migrations import DMS_COMPONENT, DMS_MIGRATIONS
+from dms_core.models import RequestType
+
+
+def test_multi_file_upload_is_one_insert_and_feeds_audit_pack(dms_manager, dms_engine, tmp_path):
+    manager, engine = dms_manager, dms_engine
+    for name in ("0.pdf", "1.pdf", "2.pdf", "lk.pdf"):
+        (tmp_path / name).write_bytes(b"%PDF-1.4\n")
+    request = manager.create_request(
+        request_type=RequestType.PASOS, user_id="dok_user", user_email="d@example.com", user_city="Budva"
+    )
+    other = manager.create_request(
+        request_type=RequestType.PASOS, user_id="dok_user", user_email="d@example.com", user_city="Budva"
+    )
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    added = manager.add_documents(
+        request.id,
+        [
+            {"name": f"sken_{idx}.pdf", "path": str(tmp_path / f"{idx}.pdf"), "sha256": f"{idx:064x}", "size": 100 + idx}
+            for idx in range(3)
+        ],
+    )
+
+    assert added == 3
+    assert len([sql for sql in statements if sql.startswith("INSERT INTO request_documents")]) == 1
+    assert manager.upload_document(other.id, "lk.pdf", str(tmp_path / "lk.pdf"), sha256="ab" * 32, size=5)
+
+    by_request = manager.get_documents_for_requests([request.id, other.id])
+    assert [doc["name"] for doc in by_request[request.id]] == ["sken_0.pdf", "sken_1.pdf", "sken_2.pdf"]
+    assert by_request[other.id][0]["file_path"] == str(tmp_path / "lk.pdf")
+    assert request.documents_metadata is None  # JSON blob se više ne prepisuje
+
+    pack = manager.build_audit_pack(request.id)
+    assert [doc["size"] for doc in pack["request"]["documents_metadata"]] == [100, 101, 102]
+
+
+def test_migration_backfills_documents_from_json(tmp_path):
+    conn = sqlite3.connect(tmp_path / "dms.db")
+    before = [migration for migration in DMS_MIGRATIONS if migration.name != "request_documents"]
+    migrate(conn, DMS_COMPONENT, before)
+    legacy = [
+        {"name": "lk.pdf", "file_path": "documents/1/lk.pdf", "uploaded_at": "2025-03-01T10:00:00", "status": "approved"},
+        {"name": "bez_putanje.pdf"},
+    ]
+    with conn:
+        conn.execute(
+            "INSERT INTO dms_requests (id, request_type, user_id, user_email, user_city, status, documents_metadata) "
+            "VALUES (1, 'PASOS', 'u', 'u@example.com', 'Bar', 'SUBMITTED', ?)",
+            (json.dumps(legacy),),
+        )
+
+    migrate(conn, DMS_COMPONENT, DMS_MIGRATIONS)
+
+    assert conn.execute(
+        "SELECT request_id, name, path, status, uploaded_at FROM request_documents"
+    ).fetchall() == [(1, "lk.pdf", "documents/1/lk.pdf", "approved", "2025-03-01 10:00:00")]
@@ -0,0 +1,75 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from dms_core import signature
+from dms_core.signature import HashingWriter, generate_signed_decision
+
+
+def _generate(tmp_path, **kwargs):
+    return generate_signed_decision(
+        request_id=7,
+        request_type="Pasos",
+        citizen_name="gradjanin",
+        officer_name="Službenik",
+        decision_text="Zahtjev je odobren.",
+        output_dir=tmp_path,
+        **kwargs,
+    )
+
+
+def test_hash_is_computed_while_writing(tmp_path, monkeypatch):
+    def _no_reread(self):
+        raise AssertionError("dokument se ne smije ponovo čitati radi hash-a")
+
+    monkeypatch.setattr(Path, "read_bytes", _no_reread)
+    path, sig_hash = _generate(tmp_path)
+    monkeypatch.undo()
+
+    assert Path(path) == tmp_path / "rjesenje_7.pdf"
+    assert sig_hash == hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_content_addressed_path(tmp_path):
+    path, sig_hash = _generate(tmp_path, content_addressed=True)
+    assert Path(path) == tmp_path / "sha256" / sig_hash[:2] / f"{sig_hash}.pdf"
+    assert hashlib.sha256(Path(path).read_bytes()).hexdigest() == sig_hash
+
+
+def test_html_fallback_uses_same_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(signature, "_try_generate_pdf", lambda output, *args: output.write(b"%PDF-") and False)
+    path, sig_hash = _generate(tmp_path)
+
+    assert Path(path).suffix == ".html"
+    assert not (tmp_path / "rjesenje_7.pdf").exists()  # polovični PDF je odbačen
+    assert sig_hash == hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def test_writer_discards_on_error(tmp_path):
+    with pytest.raises(RuntimeError):
+        with HashingWriter(tmp_path / "x.pdf") as writer:
+            writer.write(b"abc")
+            raise RuntimeError("prekid")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_render_builds_styles_once(tmp_path):
+    signature._pdf_kit.cache_clear()
+    payloads = [
+        dict(
+            request_id=idx,
+            request_type="Turizam Registracija",
+            citizen_name=f"gradjanin_{idx}",
+            officer_name="Službenik",
+            decision_text="Odobreno.",
+            output_dir=tmp_path,
+        )
+        for idx in range(4)
+    ]
+
+    results = signature.generate_signed_decisions(payloads, workers=0)
+
+    assert [Path(path).name for path, _ in results] == [f"rjesenje_{idx}.pdf" for idx in range(4)]
+    assert signature._pdf_kit.cache_info().misses == 1
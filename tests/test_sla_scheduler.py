@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from dms_core.manager import DmsManager
+from dms_core.models import (
+    DmsRequest,
+    RequestPriority,
+    RequestStatus,
+    RequestType,
+    SchedulerLease,
+    SlaEscalationLog,
+)
+from dms_core.sla_scheduler import SLA_LEASE, SlaScheduler, acquire_lease, last_sla_run
+
+
+NOW = datetime(2026, 3, 2, 12, 0, 0)
+
+
+def _add(db, late_days, priority=RequestPriority.MEDIUM, status=RequestStatus.UNDER_REVIEW):
+    request = DmsRequest(
+        request_type=RequestType.PASOS,
+        user_id="gradjanin",
+        user_email="g@example.com",
+        user_city="Podgorica",
+        status=status,
+        priority=priority,
+        estimated_completion=NOW - timedelta(days=late_days),
+        created_at=NOW - timedelta(days=30),
+    )
+    db.add(request)
+    db.flush()
+    return request.id
+
+
+def test_escalation_is_set_based_and_logged(dms_session_factory):
+    db = dms_session_factory()
+    ids = {
+        "late_2": _add(db, 2),
+        "late_7": _add(db, 7),
+        "late_10_urgent": _add(db, 10, RequestPriority.URGENT),
+        "late_3_urgent": _add(db, 3, RequestPriority.URGENT),
+        "not_late": _add(db, -1),
+        "completed": _add(db, 20, status=RequestStatus.COMPLETED),
+    }
+    db.commit()
+
+    updates = []
+    event.listen(
+        db.get_bind(), "before_cursor_execute",
+        lambda conn, cursor, statement, *args: updates.append(statement)
+        if statement.startswith("UPDATE dms_requests SET priority") else None,
+    )
+    result = DmsManager(db).apply_sla_escalation(now=NOW, run_by="test")
+
+    assert len(updates) == 2
+    assert result == {"checked_overdue": 4, "escalated": 3, "escalated_high": 2, "escalated_urgent": 1}
+    priorities = {name: db.get(DmsRequest, request_id).priority for name, request_id in ids.items()}
+    assert priorities == {
+        "late_2": RequestPriority.HIGH,
+        "late_7": RequestPriority.URGENT,
+        "late_10_urgent": RequestPriority.URGENT,
+        "late_3_urgent": RequestPriority.HIGH,
+        "not_late": RequestPriority.MEDIUM,
+        "completed": RequestPriority.MEDIUM,
+    }
+    log = {(row.request_id, row.from_priority, row.to_priority) for row in db.query(SlaEscalationLog)}
+    assert log == {
+        (ids["late_2"], RequestPriority.MEDIUM, RequestPriority.HIGH),
+        (ids["late_7"], RequestPriority.MEDIUM, RequestPriority.URGENT),
+        (ids["late_3_urgent"], RequestPriority.URGENT, RequestPriority.HIGH),
+    }
+    assert db.get(DmsRequest, ids["late_2"]).inbox_score is not None
+
+    assert DmsManager(db).apply_sla_escalation(now=NOW)["escalated"] == 0
+    db.close()
+
+
+def test_lease_allows_one_process_per_interval(dms_session_factory):
+    first = SlaScheduler(interval_s=60, session_factory=dms_session_factory, owner="proces_a")
+    second = SlaScheduler(interval_s=60, session_factory=dms_session_factory, owner="proces_b")
+
+    assert first.run_once(now=NOW) is not None
+    assert second.run_once(now=NOW + timedelta(seconds=30)) is None
+    assert first.run_once(now=NOW + timedelta(seconds=30)) is not None
+    assert second.run_once(now=NOW + timedelta(seconds=91)) is not None
+
+    db = dms_session_factory()
+    assert db.get(SchedulerLease, SLA_LEASE).owner == "proces_b"
+    assert last_sla_run(db) == NOW + timedelta(seconds=91)
+    db.close()
+
+
+def test_stop_releases_lease(dms_session_factory):
+    scheduler = SlaScheduler(interval_s=60, session_factory=dms_session_factory, owner="proces_a")
+    scheduler.run_once(now=NOW)
+    scheduler.stop()
+
+    db = dms_session_factory()
+    assert acquire_lease(db, SLA_LEASE, "proces_b", 60, now=NOW + timedelta(seconds=1))
+    db.close()
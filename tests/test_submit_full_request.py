@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import event
+
+from dms_core import assignment as assignment_module
+from dms_core.models import DmsRequest, RequestComment, RequestStatus, RequestType
+from dms_core.rollups import check_consistency
+
+
+@pytest.fixture
+def blob(tmp_path):
+    path = tmp_path / "lk.pdf"
+    path.write_bytes(b"%PDF-1.4\n")
+    return path
+
+
+@pytest.fixture
+def env(dms_manager, sent_notifications, mirrored_submissions, monkeypatch):
+    monkeypatch.setattr(assignment_module, "get_staff_usernames", lambda: ["sluzbenik_a", "sluzbenik_b"])
+    return dms_manager, sent_notifications, mirrored_submissions
+
+
+def _submit(manager, blob, **kwargs):
+    return manager.submit_full_request(
+        request_type=RequestType.PASOS,
+        user_id="podnosilac",
+        user_email="p@example.com",
+        user_city="Podgorica",
+        reason="Istekao pasoš",
+        documents=[{"name": "lk.pdf", "path": str(blob), "sha256": "ab" * 32, "size": 10}],
+        comment="Zahtjev je podnesen preko građanskog portala.",
+        **kwargs,
+    )
+
+
+def test_submission_is_one_transaction(env, blob):
+    manager, sent, mirrored = env
+    commits = []
+    event.listen(manager.db, "after_commit", lambda _: commits.append(1))
+
+    request = _submit(manager, blob)
+
+    assert len(commits) == 1
+    assert request.status == RequestStatus.UNDER_REVIEW
+    assert request.assigned_to == "sluzbenik_a"
+    assert [doc["name"] for doc in manager.get_documents(request.id)] == ["lk.pdf"]
+    assert manager.db.query(RequestComment).filter_by(request_id=request.id).count() == 1
+    assert manager.verify_audit_chain(request.id)["valid"]
+    assert check_consistency(manager.db) == []
+    assert [item["username"] for item in sent] == ["podnosilac"]
+    assert mirrored == [(request.id, "podnosilac", "pasos", "under_review")]
+
+
+def test_failure_mid_way_leaves_no_draft(env, blob, monkeypatch):
+    manager, sent, mirrored = env
+
+    def _broken(*args, **kwargs):
+        raise RuntimeError("disk pun")
+
+    monkeypatch.setattr(manager, "add_documents", _broken)
+    with pytest.raises(RuntimeError):
+        _submit(manager, blob)
+
+    assert manager.db.query(DmsRequest).count() == 0
+    assert sent == [] and mirrored == []
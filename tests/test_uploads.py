@@ -0,0 +1,138 @@
+import io
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from dms_core import assignment as assignment_module
+from dms_core.manager import DmsManager
+from dms_core.models import DmsRequest, RequestDocument, RequestType
+from dms_core.uploads import UploadRejected, discard_unreferenced, ingest_upload, validate_upload
+
+PDF = b"%PDF-1.4\n" + b"x" * 200_000
+
+
+class _Upload(io.BytesIO):
+    """Isti interfejs kao Streamlit UploadedFile (BytesIO + name/size)."""
+
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+        self.size = len(content)
+
+    def getbuffer(self):
+        raise AssertionError("upload se ne smije kopirati cijeli u memoriju")
+
+
+def test_validation_reads_only_the_header():
+    assert validate_upload(_Upload("sken.pdf", PDF)) is None
+    assert "validan format" in validate_upload(_Upload("sken.png", PDF))
+    assert "nije dozvoljenog" in validate_upload(_Upload("sken.exe", PDF))
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    first = ingest_upload(_Upload("lk.pdf", PDF), "lk.pdf", blobs_dir=tmp_path, chunk_size=4096)
+    second = ingest_upload(_Upload("lk_kopija.pdf", PDF), "lk_kopija.pdf", blobs_dir=tmp_path)
+
+    assert first.path == second.path
+    assert first.size == len(PDF)
+    assert Path(first.path).read_bytes() == PDF
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == [Path(first.path)]
+
+
+def test_oversized_stream_is_rejected_without_leftovers(tmp_path):
+    with pytest.raises(UploadRejected):
+        ingest_upload(_Upload("velik.pdf", PDF), "velik.pdf", blobs_dir=tmp_path, max_bytes=10_000)
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+
+def test_failed_submission_removes_only_its_new_unreferenced_blobs(dms_session, tmp_path):
+    db = dms_session
+
+    existing = ingest_upload(_Upload("lk.pdf", PDF), "lk.pdf", blobs_dir=tmp_path)
+    request = DmsRequest(request_type=RequestType.PASOS, user_id="u", user_email="u@example.com", user_city="Bar")
+    db.add(request)
+    db.flush()
+    db.add(RequestDocument(request_id=request.id, name="lk.pdf", path=existing.path, sha256=existing.sha256))
+    db.commit()
+
+    # Novo podnošenje: isti sken (već u skladištu) + novi fajl, pa transakcija padne
+    reused = ingest_upload(_Upload("lk.pdf", PDF), "lk.pdf", blobs_dir=tmp_path)
+    fresh = ingest_upload(_Upload("uvjerenje.pdf", PDF + b"1"), "uvjerenje.pdf", blobs_dir=tmp_path)
+    assert existing.created and not reused.created and fresh.created
+
+    assert discard_unreferenced(db, [reused, fresh]) == 1
+    assert Path(existing.path).exists()
+    assert not Path(fresh.path).exists()
+
+
+@pytest.fixture
+def two_submissions(dms_engine_factory, dms_notify_capture, tmp_path, monkeypatch):
+    """Dvije sesije nad istom DMS bazom na disku (zaseban write lock po konekciji)."""
+    factory = sessionmaker(bind=dms_engine_factory(f"sqlite:///{tmp_path / 'dms.db'}"))
+    monkeypatch.setattr(assignment_module, "get_staff_usernames", lambda: ["sluzbenik_a"])
+    blobs = tmp_path / "blobs"
+    # A je prvi upisao blob, B je isti sadržaj zatekao u skladištu
+    first = ingest_upload(_Upload("lk.pdf", PDF), "lk.pdf", blobs_dir=blobs)
+    second = ingest_upload(_Upload("lk.pdf", PDF), "lk.pdf", blobs_dir=blobs)
+    assert first.created and not second.created
+    return factory, first, second
+
+
+def _submit_with(manager, stored):
+    return manager.submit_full_request(
+        request_type=RequestType.PASOS,
+        user_id="podnosilac",
+        user_email="p@example.com",
+        user_city="Bar",
+        documents=[{"name": stored.name, "path": stored.path, "sha256": stored.sha256, "size": stored.size}],
+    )
+
+
+def test_cleanup_waits_for_concurrent_submission_of_same_blob(two_submissions):
+    factory, first, second = two_submissions
+    submitter = DmsManager(factory())
+    holding, release = threading.Event(), threading.Event()
+    refresh = submitter.refresh_inbox_scores
+
+    def _pause_before_commit(*args, **kwargs):
+        holding.set()  # red dokumenta je upisan, write lock je kod B
+        release.wait(5)
+        return refresh(*args, **kwargs)
+
+    submitter.refresh_inbox_scores = _pause_before_commit
+    submitted = threading.Thread(target=_submit_with, args=(submitter, second))
+    submitted.start()
+    assert holding.wait(5)
+
+    removed = []
+    cleanup_db = factory()
+    cleanup = threading.Thread(target=lambda: removed.append(discard_unreferenced(cleanup_db, [first])))
+    cleanup.start()
+    time.sleep(0.3)
+    assert cleanup.is_alive()  # čeka write lock umjesto da obriše blob
+
+    release.set()
+    submitted.join(5)
+    cleanup.join(5)
+    assert removed == [0]
+    assert Path(second.path).exists()
+    assert cleanup_db.query(RequestDocument).filter_by(sha256=second.sha256).count() == 1
+    cleanup_db.close()
+    submitter.db.close()
+
+
+def test_submission_after_cleanup_fails_instead_of_pointing_to_missing_blob(two_submissions):
+    factory, first, second = two_submissions
+    cleanup_db = factory()
+    assert discard_unreferenced(cleanup_db, [first]) == 1
+    cleanup_db.close()
+
+    submitter = DmsManager(factory())
+    with pytest.raises(FileNotFoundError):
+        _submit_with(submitter, second)
+    assert submitter.db.query(DmsRequest).count() == 0
+    assert submitter.db.query(RequestDocument).count() == 0
+    submitter.db.close()